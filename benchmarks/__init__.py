@@ -0,0 +1,26 @@
+"""Benchmarks for the vendor management system.
+
+Run them from the project root as modules, for example
+`python -m benchmarks.indexes --help`. Each benchmark works on its own SQLite
+database file so it never touches db.sqlite3.
+"""
+import os
+
+
+def setup_django(database=None, settings_module='vendor_management.settings'):
+    """Configure Django, optionally pointing the default database at `database`."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+
+    from django.conf import settings
+    if database is not None:
+        settings.DATABASES['default']['NAME'] = str(database)
+
+    import django
+    django.setup()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return 0
+    return values[min(int(len(values) * fraction), len(values) - 1)]
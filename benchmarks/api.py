@@ -0,0 +1,337 @@
+"""Latency, throughput and queries per request of every REST endpoint.
+
+    python -m benchmarks.api --vendors 1000 --pos-per-vendor 100 --output results.json
+    python -m benchmarks.api ... --compare baseline.json
+
+Generates a database (see benchmarks/data.py for the knobs) and drives each
+endpoint of vendor_management_app/urls.py in-process, through Django's test
+client or, with `--client asgi`, through the ASGI handler. For each scenario
+it reports p50/p95/p99 latency, requests/s and the number of SQL queries per
+request. Per-request setup such as creating the row a DELETE removes is not
+timed. Cached endpoints are measured warm, after the first request.
+
+`--output` writes the results as JSON. `--compare` checks them against an
+earlier file and exits with status 1 when a scenario's p95 latency grew by
+more than `--threshold` or it runs more queries than before.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from benchmarks import percentile, setup_django
+
+
+class Scenario:
+    """One endpoint call. `request(ctx, i)` returns (method, path, options); `setup(ctx, i)` runs untimed first."""
+
+    def __init__(self, name, route, request, setup=None):
+        self.name = name
+        self.route = route
+        self.request = request
+        self.setup = setup
+
+
+def _vendor_body(ctx, i):
+    return {
+        'name': f'Benchmark vendor {i}', 'contact_details': 'bench@example.com', 'address': '1 Benchmark Street',
+        'vendor_code': f'API-{ctx["run"]}-{i}', 'on_time_delivery_rate': 0, 'quality_rating_avg': 0,
+        'average_response_time': 0, 'fulfillment_rate': 0,
+    }
+
+
+def _purchase_order_body(ctx, i, **changes):
+    now = datetime.now(timezone.utc).isoformat()
+    body = {
+        'po_number': f'API-{ctx["run"]}-{i}', 'vendor': ctx['vendor_id'], 'order_date': now, 'delivery_date': now,
+        'items': [{'sku': 'SKU-00001', 'quantity': 1}], 'quantity': 1, 'status': 'pending', 'quality_rating': None,
+        'issue_date': now, 'acknowledgment_date': None,
+    }
+    body.update(changes)
+    return body
+
+
+def _json(body):
+    return {'data': json.dumps(body), 'content_type': 'application/json'}
+
+
+def _create_vendor(ctx, i):
+    from vendor_management_app.models import Vendor
+    ctx['target'] = Vendor.objects.create(**_vendor_body(ctx, f'setup-{i}')).id
+
+
+def _create_purchase_order(ctx, i):
+    from vendor_management_app.services.commands import create_purchase_order
+    body = _purchase_order_body(ctx, f'setup-{i}', vendor=ctx['vendor'])
+    ctx['target'] = create_purchase_order(**{**body, 'order_date': ctx['now'], 'delivery_date': ctx['now'], 'issue_date': ctx['now']}).id
+
+
+def _bulk_body(ctx, i):
+    rows = []
+    for row in range(ctx['bulk_rows']):
+        body = _purchase_order_body(ctx, f'bulk-{i}-{row}')
+        del body['vendor']
+        rows.append(json.dumps({**body, 'vendor_code': ctx['vendor_code']}))
+    return {'data': '\n'.join(rows), 'content_type': 'application/x-ndjson'}
+
+
+SCENARIOS = [
+    Scenario('vendor list', 'vendors/', lambda ctx, i: ('get', '/api/vendors/', {})),
+    Scenario('vendor list, deep page', 'vendors/', lambda ctx, i: ('get', ctx['vendor_cursor_url'], {})),
+    Scenario('vendor export ndjson', 'vendors/', lambda ctx, i: ('get', '/api/vendors/?export=ndjson', {})),
+    Scenario('vendor create', 'vendors/', lambda ctx, i: ('post', '/api/vendors/', _json(_vendor_body(ctx, i)))),
+    Scenario('vendor detail', 'vendors/<int:vendor_id>/', lambda ctx, i: ('get', f'/api/vendors/{ctx["vendor_id"]}/', {})),
+    Scenario('vendor update', 'vendors/<int:vendor_id>/',
+             lambda ctx, i: ('put', f'/api/vendors/{ctx["target"]}/', _json(_vendor_body(ctx, f'update-{i}'))), _create_vendor),
+    Scenario('vendor delete', 'vendors/<int:vendor_id>/',
+             lambda ctx, i: ('delete', f'/api/vendors/{ctx["target"]}/', {}), _create_vendor),
+    Scenario('vendor ranking top 10', 'vendors/ranking/',
+             lambda ctx, i: ('get', '/api/vendors/ranking/?ordering=-quality_rating_avg&count=10&skip_count=true', {})),
+    Scenario('vendor standing', 'vendors/<int:vendor_id>/ranking/', lambda ctx, i: ('get', f'/api/vendors/{ctx["vendor_id"]}/ranking/', {})),
+    Scenario('purchase order list', 'purchase_orders/', lambda ctx, i: ('get', '/api/purchase_orders/', {})),
+    Scenario('purchase order list, expand vendor', 'purchase_orders/',
+             lambda ctx, i: ('get', '/api/purchase_orders/?expand=vendor&count=1000&skip_count=true', {})),
+    Scenario('purchase orders overdue of vendor', 'purchase_orders/',
+             lambda ctx, i: ('get', f'/api/purchase_orders/?vendor={ctx["vendor_id"]}&overdue=true&acknowledged=false', {})),
+    Scenario('purchase orders of vendor', 'purchase_orders/', lambda ctx, i: ('get', f'/api/purchase_orders/?vendor_id={ctx["vendor_id"]}', {})),
+    Scenario('purchase order create', 'purchase_orders/', lambda ctx, i: ('post', '/api/purchase_orders/', _json(_purchase_order_body(ctx, i)))),
+    Scenario('purchase order bulk import', 'purchase_orders/bulk/', lambda ctx, i: ('post', '/api/purchase_orders/bulk/', _bulk_body(ctx, i))),
+    Scenario('purchase order batch, 100 updates', 'purchase_orders/batch/',
+             lambda ctx, i: ('post', '/api/purchase_orders/batch/', _json({'operations': [
+                 {'op': 'update', 'id': po_id, 'data': {'status': ('pending', 'completed')[i % 2]}} for po_id in ctx['batch_ids']
+             ]}))),
+    Scenario('purchase order detail', 'purchase_orders/<int:po_id>/', lambda ctx, i: ('get', f'/api/purchase_orders/{ctx["po_id"]}/', {})),
+    Scenario('purchase order update', 'purchase_orders/<int:po_id>/',
+             lambda ctx, i: ('put', f'/api/purchase_orders/{ctx["target"]}/', _json(_purchase_order_body(ctx, f'update-{i}', status='completed'))),
+             _create_purchase_order),
+    Scenario('purchase order delete', 'purchase_orders/<int:po_id>/',
+             lambda ctx, i: ('delete', f'/api/purchase_orders/{ctx["target"]}/', {}), _create_purchase_order),
+    Scenario('purchase order acknowledge', 'purchase_orders/<int:po_id>/acknowledge/',
+             lambda ctx, i: ('post', f'/api/purchase_orders/{ctx["target"]}/acknowledge/', {}), _create_purchase_order),
+    Scenario('purchase orders with SKU', 'purchase_orders/',
+             lambda ctx, i: ('get', f'/api/purchase_orders/?sku={ctx["sku"]}&skip_count=true', {})),
+    Scenario('change feed', 'changes/', lambda ctx, i: ('get', '/api/changes/?count=100', {})),
+    Scenario('SKU search', 'skus/', lambda ctx, i: ('get', f'/api/skus/?search={ctx["sku"][:-2]}&skip_count=true', {})),
+    Scenario('SKU totals', 'skus/<str:sku>/', lambda ctx, i: ('get', f'/api/skus/{ctx["sku"]}/', {})),
+    Scenario('performance history', 'vendors/<int:vendor_id>/performance',
+             lambda ctx, i: ('get', f'/api/vendors/{ctx["vendor_id"]}/performance', {})),
+    Scenario('performance series (day)', 'vendors/<int:vendor_id>/performance',
+             lambda ctx, i: ('get', f'/api/vendors/{ctx["vendor_id"]}/performance?granularity=day', {})),
+]
+
+
+def uncovered_routes():
+    from vendor_management_app.urls import urlpatterns
+    covered = {scenario.route for scenario in SCENARIOS}
+    return [str(pattern.pattern) for pattern in urlpatterns if str(pattern.pattern) not in covered]
+
+
+def make_client(kind):
+    """A callable (method, path, options) -> response backed by the test client or the ASGI handler."""
+    if kind == 'asgi':
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncClient
+        client = AsyncClient()
+
+        def call(method, path, options):
+            response = async_to_sync(getattr(client, method))(path, **options)
+            if response.streaming and not response.is_async:
+                for _ in response.streaming_content:
+                    pass
+            elif response.streaming:
+                async def drain():
+                    async for _ in response.streaming_content:
+                        pass
+                async_to_sync(drain)()
+            return response
+        return call
+
+    from django.test import Client
+    client = Client()
+
+    def call(method, path, options):
+        response = getattr(client, method)(path, **options)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response
+    return call
+
+
+def measure(scenario, call, ctx, requests, warmup):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    counter = itertools.count()
+    query_counts, statuses = [], set()
+    for _ in range(warmup):
+        i = next(counter)
+        if scenario.setup:
+            scenario.setup(ctx, i)
+        with CaptureQueriesContext(connection) as queries:
+            response = call(*scenario.request(ctx, i))
+        query_counts.append(len(queries))
+        statuses.add(response.status_code)
+
+    latencies = []
+    for _ in range(requests):
+        i = next(counter)
+        if scenario.setup:
+            scenario.setup(ctx, i)
+        method, path, options = scenario.request(ctx, i)
+        start = time.perf_counter()
+        response = call(method, path, options)
+        latencies.append(time.perf_counter() - start)
+        statuses.add(response.status_code)
+
+    return {
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'mean_ms': sum(latencies) / len(latencies) * 1000,
+        'requests_per_second': len(latencies) / sum(latencies),
+        'queries': query_counts[-1] if query_counts else None,
+        'status_codes': sorted(statuses),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print the change against `baseline` and return the names of regressed scenarios."""
+    regressions = []
+    print(f"\n{'scenario':<32} {'p95 before':>11} {'p95 now':>9} {'change':>8} {'queries':>9}")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:<32} {'(new)':>11}")
+            continue
+        change = result['p95_ms'] / before['p95_ms'] - 1 if before['p95_ms'] else 0
+        more_queries = (result['queries'] or 0) > (before['queries'] or 0)
+        regressed = change > threshold or more_queries
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<32} {before['p95_ms']:9.2f}ms {result['p95_ms']:7.2f}ms {change:+8.0%} "
+              f"{before['queries']!s:>4}->{result['queries']!s:<4}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _status_mix(value):
+    mix = {}
+    for part in value.split(','):
+        status, _, weight = part.partition('=')
+        mix[status.strip()] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default='/tmp/vms_api.sqlite3')
+    parser.add_argument('--vendors', type=int, default=1000)
+    parser.add_argument('--pos-per-vendor', type=int, default=100)
+    parser.add_argument('--snapshots-per-vendor', type=int, default=48)
+    parser.add_argument('--status-mix', type=_status_mix, default=None, help="e.g. completed=0.6,pending=0.3,canceled=0.1")
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--date-skew', type=float, default=1.0, help="1 spreads issue dates evenly, higher favours recent dates.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--client', choices=['test', 'asgi'], default='test')
+    parser.add_argument('--requests', type=int, default=200, help="Timed requests per scenario.")
+    parser.add_argument('--warmup', type=int, default=5, help="Untimed requests per scenario, also used to count queries.")
+    parser.add_argument('--bulk-rows', type=int, default=100, help="Rows per bulk import request.")
+    parser.add_argument('--only', action='append', help="Run the scenarios whose name contains this text.")
+    parser.add_argument('--output', help="Write the results to this JSON file.")
+    parser.add_argument('--compare', help="JSON results of an earlier run to compare against.")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Allowed relative p95 increase in --compare.")
+    args = parser.parse_args()
+
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(args.db + suffix):
+            os.remove(args.db + suffix)
+    setup_django(args.db)
+
+    import django
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.test.utils import setup_test_environment
+    from django.utils import timezone as django_timezone
+    from vendor_management_app.models import Vendor, PurchaseOrder, PurchaseOrderItem
+    from vendor_management_app.services.commands import rebuild_vendor_rankings
+    from benchmarks.data import generate
+
+    # Writes recompute metrics in the request, so their cost shows up in the numbers.
+    settings.VENDOR_METRICS_QUEUE = {'BACKEND': 'sync'}
+    setup_test_environment()
+    call_command('migrate', verbosity=0)
+    counts = generate(args.vendors, args.pos_per_vendor, args.snapshots_per_vendor, status_mix=args.status_mix,
+                      seed=args.seed, days=args.days, date_skew=args.date_skew)
+    rebuild_vendor_rankings()
+
+    vendor = Vendor.objects.order_by('id').first()
+    call = make_client(args.client)
+    ctx = {
+        'run': int(time.time()),
+        'now': django_timezone.now(),
+        'vendor': vendor,
+        'vendor_id': vendor.id,
+        'vendor_code': vendor.vendor_code,
+        'po_id': PurchaseOrder.objects.filter(vendor=vendor).values_list('id', flat=True).first(),
+        'sku': PurchaseOrderItem.objects.filter(purchase_order__vendor=vendor).values_list('sku', flat=True).first(),
+        'bulk_rows': args.bulk_rows,
+        'batch_ids': list(PurchaseOrder.objects.filter(vendor=vendor).order_by('id').values_list('id', flat=True)[:100]),
+    }
+    # Follow `next` half way through the vendor list.
+    url = '/api/vendors/?count=100&skip_count=true'
+    for _ in range(args.vendors // 200):
+        url = call('get', url, {}).json()['next'] or url
+    ctx['vendor_cursor_url'] = url
+
+    missing = uncovered_routes()
+    if missing:
+        print(f"warning: no scenario for {', '.join(missing)}", file=sys.stderr)
+
+    print(f"{counts['vendors']:,} vendors, {counts['purchase_orders']:,} purchase orders, {args.client} client\n")
+    print(f"{'scenario':<32} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>8} {'queries':>8}  status")
+    results = {}
+    for scenario in SCENARIOS:
+        if args.only and not any(text in scenario.name for text in args.only):
+            continue
+        result = results[scenario.name] = measure(scenario, call, ctx, args.requests, args.warmup)
+        print(f"{scenario.name:<32} {result['p50_ms']:8.2f} {result['p95_ms']:8.2f} {result['p99_ms']:8.2f} "
+              f"{result['requests_per_second']:8.0f} {result['queries']!s:>8}  {','.join(map(str, result['status_codes']))}")
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({
+                'meta': {
+                    'commit': _git_commit(),
+                    'created_at': datetime.now(timezone.utc).isoformat(),
+                    'python': platform.python_version(),
+                    'django': django.get_version(),
+                    'args': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+                },
+                'results': results,
+            }, output, indent=2)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        for key in ('vendors', 'pos_per_vendor', 'client', 'date_skew', 'status_mix'):
+            if baseline['meta']['args'].get(key) != getattr(args, key):
+                print(f"warning: --{key.replace('_', '-')} differs from the baseline run", file=sys.stderr)
+        regressions = compare(results, baseline['results'], args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""EXPLAIN plans and timings of the PurchaseOrder / HistoricalPerformance hot paths with and without their indexes.
+
+    python -m benchmarks.indexes --vendors 10000 --pos-per-vendor 100 --db /tmp/vms_indexes.sqlite3
+
+The default sizes build the 1M purchase order / 10k vendor fixture. Pass
+--reuse to skip regenerating the database on later runs.
+"""
+import argparse
+import json
+import os
+import random
+import time
+from benchmarks import percentile, setup_django
+
+
+def hot_path_queries(now):
+    from vendor_management_app.models import PurchaseOrder, HistoricalPerformance
+    from vendor_management_app.services.metrics import _metric_aggregates
+
+    return {
+        'vendor metrics aggregate': lambda vendor_id: (
+            PurchaseOrder.objects.filter(vendor_id=vendor_id).values('vendor_id').annotate(**_metric_aggregates(now)).order_by()
+        ),
+        'completed on time for vendor': lambda vendor_id: (
+            PurchaseOrder.objects.filter(vendor_id=vendor_id, status='completed', delivery_date__lte=now).values('id')
+        ),
+        'unacknowledged for vendor': lambda vendor_id: (
+            PurchaseOrder.objects.filter(vendor_id=vendor_id, acknowledgment_date__isnull=True).order_by('issue_date').values('id')[:50]
+        ),
+        'overdue pending, fleet-wide': lambda vendor_id: (
+            PurchaseOrder.objects.filter(status='pending', delivery_date__lt=now).order_by('delivery_date').values('id')[:100]
+        ),
+        'latest performance snapshot': lambda vendor_id: (
+            HistoricalPerformance.objects.filter(vendor_id=vendor_id).order_by('-date').values('id')[:1]
+        ),
+    }
+
+
+def set_indexes(enabled):
+    from django.db import connection
+    from vendor_management_app.models import PurchaseOrder, HistoricalPerformance
+
+    with connection.schema_editor() as schema_editor:
+        for model in (PurchaseOrder, HistoricalPerformance):
+            for index in model._meta.indexes:
+                if enabled:
+                    schema_editor.add_index(model, index)
+                else:
+                    schema_editor.remove_index(model, index)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def database_size():
+    from django.db import connection
+    if connection.vendor != 'sqlite':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA page_count')
+        page_count = cursor.fetchone()[0]
+        cursor.execute('PRAGMA freelist_count')
+        page_count -= cursor.fetchone()[0]
+        cursor.execute('PRAGMA page_size')
+        return page_count * cursor.fetchone()[0]
+
+
+def measure(queries, vendor_ids, repeat):
+    results = {}
+    for name, build in queries.items():
+        timings = []
+        for vendor_id in vendor_ids:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(build(vendor_id))
+                timings.append((time.perf_counter() - start) * 1000)
+        results[name] = {
+            'plan': build(vendor_ids[0]).explain(),
+            'p50_ms': percentile(timings, 0.5),
+            'p95_ms': percentile(timings, 0.95),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default='/tmp/vms_indexes.sqlite3')
+    parser.add_argument('--vendors', type=int, default=10000)
+    parser.add_argument('--pos-per-vendor', type=int, default=100)
+    parser.add_argument('--snapshots-per-vendor', type=int, default=24)
+    parser.add_argument('--sample', type=int, default=50, help="Number of random vendors each query is timed for.")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--reuse', action='store_true', help="Reuse an existing --db instead of regenerating it.")
+    parser.add_argument('--json', help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    if not args.reuse and os.path.exists(args.db):
+        os.remove(args.db)
+    setup_django(args.db)
+
+    from django.core.management import call_command
+    from django.utils import timezone
+    from vendor_management_app.models import Vendor
+    from benchmarks.data import generate
+
+    if not args.reuse:
+        call_command('migrate', verbosity=0)
+        start = time.perf_counter()
+        counts = generate(args.vendors, args.pos_per_vendor, args.snapshots_per_vendor)
+        print(f"Generated {counts} in {time.perf_counter() - start:.1f}s")
+
+    vendor_ids = list(Vendor.objects.values_list('id', flat=True))
+    vendor_ids = random.Random(0).sample(vendor_ids, min(args.sample, len(vendor_ids)))
+    queries = hot_path_queries(timezone.now())
+
+    report = {}
+    for label, enabled in (('without indexes', False), ('with indexes', True)):
+        set_indexes(enabled)
+        report[label] = {'database_bytes': database_size(), 'queries': measure(queries, vendor_ids, args.repeat)}
+
+    for name in queries:
+        print(f"\n== {name}")
+        for label, result in report.items():
+            query = result['queries'][name]
+            print(f"-- {label}: p50 {query['p50_ms']:.2f} ms, p95 {query['p95_ms']:.2f} ms")
+            print(query['plan'])
+    print()
+    for label, result in report.items():
+        if result['database_bytes'] is not None:
+            print(f"Database size {label}: {result['database_bytes'] / 2 ** 20:.1f} MiB")
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(report, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Time to compute the metrics of every vendor, per engine.
+
+    python -m benchmarks.metrics --vendors 10000 --pos-per-vendor 100
+
+Compares one compute_vendor_metrics call per vendor (the request path, timed
+on `--sample` vendors and extrapolated) with compute_metrics_for_vendors over
+the whole fleet in chunks of `--chunk-size` vendors: the 'sql' engine with and
+without the response time percentiles, and the 'numpy' engine when NumPy is
+installed.
+"""
+import argparse
+import os
+import random
+import time
+from importlib.util import find_spec
+from benchmarks import setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default='/tmp/vms_metrics.sqlite3')
+    parser.add_argument('--vendors', type=int, default=10000)
+    parser.add_argument('--pos-per-vendor', type=int, default=100)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--sample', type=int, default=200, help="Vendors timed for the per-vendor loop.")
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    setup_django(args.db)
+
+    from django.core.management import call_command
+    from vendor_management_app.models import Vendor
+    from vendor_management_app.services.metrics import compute_vendor_metrics, compute_metrics_for_vendors
+    from benchmarks.data import generate
+
+    call_command('migrate', verbosity=0)
+    counts = generate(vendors=args.vendors, pos_per_vendor=args.pos_per_vendor)
+    print(f"{counts['vendors']:,} vendors, {counts['purchase_orders']:,} purchase orders\n")
+    vendor_ids = list(Vendor.objects.order_by('id').values_list('id', flat=True))
+
+    sample = random.Random(0).sample(vendor_ids, min(args.sample, len(vendor_ids)))
+    start = time.perf_counter()
+    for vendor_id in sample:
+        compute_vendor_metrics(vendor_id, percentiles=True)
+    elapsed = (time.perf_counter() - start) / len(sample) * len(vendor_ids)
+    print(f"{'per-vendor loop (extrapolated)':<35} {elapsed:8.2f} s")
+
+    has_numpy = find_spec('numpy') is not None
+    engines = [('sql', True), ('sql', False)] + ([('numpy', True)] if has_numpy else [])
+    for engine, percentiles in engines:
+        start = time.perf_counter()
+        for offset in range(0, len(vendor_ids), args.chunk_size):
+            compute_metrics_for_vendors(vendor_ids[offset:offset + args.chunk_size], percentiles=percentiles, engine=engine)
+        label = f"{engine} batch{'' if percentiles else ', no percentiles'}"
+        print(f"{label:<35} {time.perf_counter() - start:8.2f} s")
+    if not has_numpy:
+        print("numpy batch: skipped, NumPy is not installed")
+
+
+if __name__ == '__main__':
+    main()
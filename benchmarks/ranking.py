@@ -0,0 +1,64 @@
+"""Latency of the vendor ranking queries: top-N listings and rank / percentile lookups.
+
+    python -m benchmarks.ranking --vendors 10000
+
+Prints the query plan of each query (they should all read a covering
+ranking_*_idx index) and its p50 / p95 latency over `--repeat` runs.
+"""
+import argparse
+import os
+import random
+import time
+from benchmarks import percentile, setup_django
+
+
+def measure(label, query, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        query()
+        timings.append((time.perf_counter() - start) * 1000)
+    print(f"{label:<45} p50 {percentile(timings, 0.5):7.2f} ms   p95 {percentile(timings, 0.95):7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default='/tmp/vms_ranking.sqlite3')
+    parser.add_argument('--vendors', type=int, default=10000)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    setup_django(args.db)
+
+    from django.core.management import call_command
+    from django.db import connection
+    from vendor_management_app.models import VendorRanking
+    from vendor_management_app.services.commands import rebuild_vendor_rankings
+    from vendor_management_app.services.metrics import METRIC_FIELDS
+    from vendor_management_app.services.queries import get_vendor_rankings, get_vendor_standing
+    from benchmarks.data import generate
+
+    call_command('migrate', verbosity=0)
+    generate(vendors=args.vendors, pos_per_vendor=20)
+    rebuild_vendor_rankings()
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+    vendor_ids = list(VendorRanking.objects.values_list('vendor_id', flat=True))
+    print(f"{len(vendor_ids):,} ranked vendors\n")
+
+    for field in METRIC_FIELDS:
+        top = get_vendor_rankings().order_by(f'-{field}', '-vendor_id')[:args.top]
+        print(f"top {args.top} by {field}:\n  {top.explain()}")
+        measure(f"top {args.top} by {field}", lambda: list(top.all()), args.repeat)
+
+    standing_count = VendorRanking.objects.filter(on_time_delivery_rate__gt=50)
+    print(f"\nrank count:\n  {standing_count.explain()}")
+    measure("rank + percentile of one vendor (all metrics)", lambda: get_vendor_standing(random.choice(vendor_ids)), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Rows/sec of the DRF OutputSerializer classes against the values()-based RowSerializer path.
+
+    python -m benchmarks.serializers --rows 100000
+
+Both paths include fetching the page from the database and rendering it to
+JSON bytes, which is what a list endpoint does per request.
+"""
+import argparse
+import os
+import time
+from benchmarks import setup_django
+
+
+def run(label, serialize, rows, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        serialize()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<45} {best * 1000:9.1f} ms  {rows / best:12,.0f} rows/s")
+    return rows / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default='/tmp/vms_serializers.sqlite3')
+    parser.add_argument('--rows', type=int, default=100000, help="Page size, also the number of purchase orders generated.")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    setup_django(args.db)
+
+    from django.core.management import call_command
+    from rest_framework.renderers import JSONRenderer
+    from vendor_management_app.models import Vendor, PurchaseOrder
+    from vendor_management_app.row_serializers import vendor_rows, purchase_order_rows
+    from vendor_management_app.views import VendorApi, PurchaseOrderApi
+    from benchmarks.data import generate
+
+    call_command('migrate', verbosity=0)
+    generate(vendors=args.rows // 100, pos_per_vendor=100)
+    render = JSONRenderer().render
+
+    purchase_orders = PurchaseOrder.objects.order_by('order_date', 'id')[:args.rows]
+    vendors = Vendor.objects.order_by('id')
+    vendor_count = vendors.count()
+
+    print(f"Purchase orders ({args.rows:,} rows)")
+    drf = run("DRF OutputSerializer", lambda: render(PurchaseOrderApi.OutputSerializer(purchase_orders, many=True).data), args.rows, args.repeat)
+    fast = run("RowSerializer", lambda: render(purchase_order_rows.to_dicts(purchase_order_rows.values_list(purchase_orders))), args.rows, args.repeat)
+    print(f"speedup: {fast / drf:.1f}x\n")
+
+    print(f"Vendors ({vendor_count:,} rows)")
+    drf = run("DRF OutputSerializer", lambda: render(VendorApi.OutputSerializer(vendors, many=True).data), vendor_count, args.repeat)
+    fast = run("RowSerializer", lambda: render(vendor_rows.to_dicts(vendor_rows.values_list(vendors))), vendor_count, args.repeat)
+    print(f"speedup: {fast / drf:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
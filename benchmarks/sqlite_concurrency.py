@@ -0,0 +1,119 @@
+"""Write throughput and "database is locked" rate of N parallel writer processes.
+
+    python -m benchmarks.sqlite_concurrency --writers 8 --ops 200
+
+Each writer updates random purchase orders through update_purchase_order with
+the 'sync' metrics queue (an update that loses the race against another
+writer's update of the same PO is counted as a version conflict), so every write also recomputes the vendor's metrics
+and upserts its HistoricalPerformance / VendorRanking rows, like a request
+does. The same workload runs against the stock Django SQLite configuration
+and against the tuned profile from settings.py (WAL, synchronous=NORMAL,
+IMMEDIATE transactions, 20s busy timeout).
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import time
+from benchmarks import percentile
+
+PROFILES = {
+    'stock': lambda name: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': name},
+    'tuned': None,  # DATABASES['default'] from settings.py
+}
+
+
+def configure(profile, database):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vendor_management.settings')
+    from django.conf import settings
+    if PROFILES[profile] is None:
+        settings.DATABASES['default']['NAME'] = database
+    else:
+        settings.DATABASES['default'] = PROFILES[profile](database)
+    settings.VENDOR_METRICS_QUEUE = {'BACKEND': 'sync'}
+
+    import django
+    django.setup()
+
+
+def prepare(profile, database, vendors, pos_per_vendor):
+    configure(profile, database)
+    from django.core.management import call_command
+    from benchmarks.data import generate
+    call_command('migrate', verbosity=0)
+    generate(vendors=vendors, pos_per_vendor=pos_per_vendor)
+
+
+def write(profile, database, ops, seed):
+    configure(profile, database)
+    from django.db import OperationalError
+    from vendor_management_app.models import PurchaseOrder
+    from vendor_management_app.services.commands import VersionConflict, update_purchase_order
+
+    rng = random.Random(seed)
+    po_ids = list(PurchaseOrder.objects.values_list('id', flat=True))
+    fields = ['po_number', 'vendor', 'order_date', 'delivery_date', 'items', 'quantity', 'quality_rating', 'issue_date', 'acknowledgment_date']
+
+    # Only counts are returned: exceptions must not cross the process boundary.
+    latencies, locked, conflicts = [], 0, 0
+    for _ in range(ops):
+        start = time.perf_counter()
+        try:
+            purchase_order = PurchaseOrder.objects.get(id=rng.choice(po_ids))
+            status = 'pending' if purchase_order.status == 'completed' else 'completed'
+            update_purchase_order(purchase_order, status=status, **{field: getattr(purchase_order, field) for field in fields})
+        except OperationalError as exc:
+            if 'locked' not in str(exc):
+                raise
+            locked += 1
+            continue
+        except VersionConflict:
+            conflicts += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+    return latencies, locked, conflicts
+
+
+def run(profile, database, args):
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1) as pool:
+        pool.apply(prepare, (profile, database, args.vendors, args.pos_per_vendor))
+
+    with context.Pool(args.writers) as pool:
+        start = time.perf_counter()
+        results = pool.starmap(write, [(profile, database, args.ops, seed) for seed in range(args.writers)])
+        elapsed = time.perf_counter() - start
+
+    latencies = [latency for writer_latencies, _, _ in results for latency in writer_latencies]
+    locked = sum(writer_locked for _, writer_locked, _ in results)
+    conflicts = sum(writer_conflicts for _, _, writer_conflicts in results)
+    attempts = args.writers * args.ops
+    print(
+        f"{profile:<6} {len(latencies) / elapsed:9.1f} writes/s   "
+        f"locked {locked:5d} ({100 * locked / attempts:5.1f}%)   "
+        f"conflicts {conflicts:5d} ({100 * conflicts / attempts:5.1f}%)   "
+        f"p50 {percentile(latencies, 0.5) * 1000:7.1f} ms   p95 {percentile(latencies, 0.95) * 1000:7.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db-dir', default='/tmp')
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--ops', type=int, default=200, help="Writes attempted per writer.")
+    parser.add_argument('--vendors', type=int, default=50)
+    parser.add_argument('--pos-per-vendor', type=int, default=20)
+    parser.add_argument('--profile', choices=PROFILES, action='append', help="Default: all profiles.")
+    args = parser.parse_args()
+
+    print(f"{args.writers} writers x {args.ops} writes")
+    for profile in args.profile or PROFILES:
+        database = os.path.join(args.db_dir, f'vms_concurrency_{profile}.sqlite3')
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(database + suffix):
+                os.remove(database + suffix)
+        run(profile, database, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Worker startup cost per settings profile: import time, first request and memory.
+
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --settings vendor_management.settings_api --top 20
+
+Starts `--runs` fresh interpreters per settings module with `python -X
+importtime`, each of which sets Django up and serves one request through the
+WSGI handler, as a gunicorn worker would after a fork. Reports the median
+django.setup() time, first request time, import time (from -X importtime),
+peak RSS and number of loaded modules, then the packages that took the most
+import time.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import Counter
+from benchmarks import setup_django
+
+SETTINGS = ['vendor_management.settings', 'vendor_management.settings_api']
+
+# Runs in each child interpreter; `print` is the only output on stdout.
+CHILD = """
+import json, os, resource, sys, time
+start = time.perf_counter()
+from django.conf import settings
+settings.DATABASES['default']['NAME'] = os.environ['STARTUP_DB']
+import django
+django.setup()
+setup = time.perf_counter()
+
+from django.core.wsgi import get_wsgi_application
+from io import BytesIO
+statuses = []
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': '/api/vendors/', 'QUERY_STRING': 'count=1&skip_count=true',
+    'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'wsgi.url_scheme': 'http', 'wsgi.input': BytesIO(), 'wsgi.errors': sys.stderr,
+}
+b''.join(get_wsgi_application()(environ, lambda status, headers: statuses.append(status)))
+end = time.perf_counter()
+
+print(json.dumps({
+    'status': statuses[0], 'setup': setup - start, 'first_request': end - setup,
+    'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024, 'modules': len(sys.modules),
+}))
+"""
+
+
+def parse_importtime(stderr):
+    """(total import time in seconds, self time by top-level package) from `-X importtime` output."""
+    total, packages = 0, Counter()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        packages[name.strip().split('.')[0]] += int(self_us) / 1e6
+        if not name.startswith('  '):
+            # Top-level imports only, their cumulative time includes the nested ones.
+            total += int(cumulative_us) / 1e6
+    return total, packages
+
+
+def run(settings_module, db, runs):
+    results, packages = [], Counter()
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings_module, 'STARTUP_DB': db, 'PYTHONDONTWRITEBYTECODE': '1'}
+    for _ in range(runs):
+        child = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', CHILD], env=env, capture_output=True, text=True, check=True,
+        )
+        result = json.loads(child.stdout)
+        result['imports'], run_packages = parse_importtime(child.stderr)
+        packages.update({name: seconds / runs for name, seconds in run_packages.items()})
+        results.append(result)
+    if any(not result['status'].startswith('200') for result in results):
+        raise SystemExit(f"{settings_module}: first request answered {results[0]['status']}")
+    summary = {key: statistics.median(result[key] for result in results) for key in ('setup', 'first_request', 'imports', 'rss', 'modules')}
+    return summary, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default='/tmp/vms_startup.sqlite3')
+    parser.add_argument('--settings', action='append', help=f"Settings module to measure, repeatable. Default: {', '.join(SETTINGS)}.")
+    parser.add_argument('--runs', type=int, default=5, help="Fresh interpreters per settings module; medians are reported.")
+    parser.add_argument('--top', type=int, default=10, help="Packages listed by import time.")
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    setup_django(args.db)
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+    print(f"{'settings':<32} {'setup':>8} {'1st req':>8} {'imports':>8} {'RSS':>8} {'modules':>8}")
+    slowest = {}
+    for settings_module in args.settings or SETTINGS:
+        summary, packages = run(settings_module, args.db, args.runs)
+        slowest[settings_module] = packages.most_common(args.top)
+        print(
+            f"{settings_module:<32} {summary['setup'] * 1000:6.0f}ms {summary['first_request'] * 1000:6.0f}ms "
+            f"{summary['imports'] * 1000:6.0f}ms {summary['rss'] / 2 ** 20:6.1f}MB {summary['modules']:8.0f}"
+        )
+    for settings_module, packages in slowest.items():
+        print(f"\n{settings_module}, import time by package:")
+        for name, seconds in packages:
+            print(f"  {name:<30} {seconds * 1000:6.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
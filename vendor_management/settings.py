@@ -43,6 +43,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'vendor_management_app.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,10 +77,30 @@ WSGI_APPLICATION = 'vendor_management.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# SQLite tuned for concurrent writers (see vendor_management/sqlite3/base.py):
+# WAL lets readers run alongside the writer, IMMEDIATE transactions make writers
+# wait up to `timeout` seconds for the lock instead of failing with "database
+# is locked", and connections are reused across requests.
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',     # durable at WAL checkpoints, safe against corruption
+    'mmap_size': 256 * 2 ** 20,  # bytes
+    'cache_size': -64000,        # negative is KiB, i.e. 64 MB per connection
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'vendor_management.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': SQLITE_PRAGMAS,
+        },
     }
 }
 
@@ -120,7 +141,53 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Vendor metrics
+# 'full' recomputes a vendor's metrics from all of its purchase orders on every
+# PO write, 'incremental' maintains running counters per vendor instead. Run
+# `python manage.py reconcile_vendor_metrics` after switching to 'incremental'.
+
+VENDOR_METRICS_MODE = 'full'
+
+# Metrics are recomputed after the PO write commits. BACKEND is 'sync' (in the
+# request thread), 'thread' (in-process thread pool) or 'database' (a queue table
+# drained by `python manage.py process_metrics_queue --forever`). Marks for the
+# same vendor within COALESCE_WINDOW seconds result in a single recompute. The
+# database backend retries a failed recompute up to MAX_ATTEMPTS times.
+
+VENDOR_METRICS_QUEUE = {
+    'BACKEND': 'thread',
+    'WORKERS': 2,
+    'COALESCE_WINDOW': 0.5,
+    'MAX_ATTEMPTS': 5,
+}
+
+# Cache
+# Vendor detail and performance responses are cached per vendor and invalidated
+# by the write commands in services/commands.py. Point VENDOR_CACHE_ALIAS at a
+# shared backend (Redis, Memcached) when running more than one process.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+VENDOR_CACHE_ALIAS = 'default'
+VENDOR_CACHE_TIMEOUT = 300
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Per-request instrumentation (vendor_management_app/instrumentation.py): query
+# count, DB / serialization / service time in a Server-Timing header, Prometheus
+# metrics at /metrics (local addresses only) and warnings for slow requests and
+# N+1 query patterns. Off by default; the middleware removes itself when disabled.
+
+VENDOR_INSTRUMENTATION = {
+    'ENABLED': False,
+    'SLOW_REQUEST_MS': 500,
+    'N_PLUS_ONE_THRESHOLD': 10,
+    'METRICS_ALLOWED_IPS': ['127.0.0.1', '::1'],
+}
@@ -0,0 +1,37 @@
+"""
+API-only settings for the JSON API workers (gunicorn / uvicorn) and management commands.
+
+    DJANGO_SETTINGS_MODULE=vendor_management.settings_api gunicorn vendor_management.wsgi
+
+Same database, cache and vendor settings as settings.py, without what only the
+admin and the browsable API need: the admin, sessions, messages, static files
+and django_extensions apps, their middleware and templates, and DRF's session
+authentication and HTML renderer. Workers then import and set up less at
+startup; compare with `python -m benchmarks.startup`.
+"""
+
+from vendor_management.settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    'vendor_management_app',
+]
+
+MIDDLEWARE = [
+    'vendor_management_app.instrumentation.InstrumentationMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+ROOT_URLCONF = 'vendor_management.urls_api'
+
+TEMPLATES = []
+
+# The API is unauthenticated, as with the default settings, but DRF isn't asked
+# to look for a session or to build an AnonymousUser on every request.
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [],
+    'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.AllowAny'],
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+    'DEFAULT_PARSER_CLASSES': ['rest_framework.parsers.JSONParser'],
+    'UNAUTHENTICATED_USER': None,
+}
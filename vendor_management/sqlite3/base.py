@@ -0,0 +1,42 @@
+"""SQLite backend with per-connection PRAGMAs and IMMEDIATE write transactions.
+
+Use it as ENGINE 'vendor_management.sqlite3'. On top of the stock backend's
+OPTIONS it understands:
+
+- 'pragmas': {name: value} applied to every new connection, e.g.
+  {'journal_mode': 'WAL', 'synchronous': 'NORMAL'}.
+- 'transaction_mode': 'DEFERRED' (SQLite's default), 'IMMEDIATE' or
+  'EXCLUSIVE', used by every atomic() block.
+
+With DEFERRED transactions a block that reads before it writes has to upgrade
+its lock mid-transaction, and SQLite fails that upgrade with "database is
+locked" right away instead of waiting for the busy timeout. IMMEDIATE takes the
+write lock at BEGIN, so concurrent writers queue on the timeout instead.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        options = self.settings_dict['OPTIONS']
+        self.pragmas = options.get('pragmas', {})
+        self.transaction_mode = options.get('transaction_mode', 'DEFERRED').upper()
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(f"transaction_mode must be one of {', '.join(TRANSACTION_MODES)}.")
+
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        params.pop('transaction_mode', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
@@ -16,8 +16,11 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from vendor_management_app.instrumentation import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/async/', include('vendor_management_app.async_urls')),
     path('api/', include('vendor_management_app.urls')),
+    path('metrics', metrics_view),
 ]
@@ -0,0 +1,9 @@
+"""URL configuration of the API-only settings profile (settings_api.py): the API without the admin."""
+from django.urls import path, include
+from vendor_management_app.instrumentation import metrics_view
+
+urlpatterns = [
+    path('api/async/', include('vendor_management_app.async_urls')),
+    path('api/', include('vendor_management_app.urls')),
+    path('metrics', metrics_view),
+]
@@ -1,6 +1,56 @@
 from django.contrib import admin
+from django.db import transaction
+from django.db.models import F
 from .models import Vendor, PurchaseOrder, HistoricalPerformance
+from .services.commands import create_purchase_order, update_purchase_order, delete_purchase_order
 
-admin.site.register(Vendor),
-admin.site.register(PurchaseOrder),
-admin.site.register(HistoricalPerformance)
+
+class VersionedAdmin(admin.ModelAdmin):
+    # Admin edits bump the optimistic concurrency version, so API clients holding the old one get a 409.
+    readonly_fields = ['version']
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            obj.version = F('version') + 1
+        super().save_model(request, obj, form, change)
+
+
+@admin.register(Vendor)
+class VendorAdmin(VersionedAdmin):
+    list_display = ['vendor_code', 'name', 'on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate']
+    search_fields = ['vendor_code', 'name']
+
+
+# __str__ of purchase orders and snapshots reads the vendor's name: join it into the changelist query.
+@admin.register(PurchaseOrder)
+class PurchaseOrderAdmin(VersionedAdmin):
+    list_display = ['po_number', 'vendor', 'order_date', 'delivery_date', 'status', 'quality_rating']
+    list_filter = ['status']
+    list_select_related = ['vendor']
+    raw_id_fields = ['vendor']
+    search_fields = ['po_number']
+
+    # Writes go through the service commands, which keep the line items, change feed,
+    # caches, metric counters and recomputes in step with the purchase order.
+    def save_model(self, request, obj, form, change):
+        if change:
+            update_purchase_order(PurchaseOrder.objects.get(pk=obj.pk), **{name: form.cleaned_data[name] for name in form.changed_data})
+            return
+        purchase_order = create_purchase_order(**form.cleaned_data)
+        obj.pk, obj._state.adding = purchase_order.pk, False
+
+    def delete_model(self, request, obj):
+        delete_purchase_order(obj)
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        for purchase_order in queryset:
+            delete_purchase_order(purchase_order)
+
+
+@admin.register(HistoricalPerformance)
+class HistoricalPerformanceAdmin(admin.ModelAdmin):
+    list_display = ['vendor', 'date', 'granularity', 'on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate']
+    list_filter = ['granularity']
+    list_select_related = ['vendor']
+    raw_id_fields = ['vendor']
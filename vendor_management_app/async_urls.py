@@ -0,0 +1,18 @@
+from django.urls import path
+from vendor_management_app.lazy_views import lazy_view
+
+
+def async_view(name):
+    return lazy_view(f'vendor_management_app.async_views.{name}', is_async=True)
+
+
+urlpatterns = [
+    path('vendors/', async_view('AsyncVendorApi')),
+    path('vendors/<int:vendor_id>/', async_view('AsyncVendorApi')),
+    path('purchase_orders/', async_view('AsyncPurchaseOrderApi')),
+    path('purchase_orders/<int:po_id>/', async_view('AsyncPurchaseOrderApi')),
+    path('purchase_orders/<int:po_id>/acknowledge/', async_view('AsyncAcknowledgePurchaseOrder')),
+    path('vendors/<int:vendor_id>/performance', async_view('AsyncHistoricalPerformanceApi')),
+    path('changes/', async_view('AsyncPurchaseOrderChangeApi')),
+    path('changes/stream/', async_view('AsyncPurchaseOrderChangeStream')),
+]
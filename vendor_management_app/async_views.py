@@ -0,0 +1,297 @@
+import asyncio
+import json
+import time
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework import serializers
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.utils.encoders import JSONEncoder
+from vendor_management_app.models import Vendor, PurchaseOrder
+from vendor_management_app.pagination import KeysetPagination
+from vendor_management_app.row_serializers import (
+    vendor_rows, purchase_order_rows, historical_performance_rows, purchase_order_vendor_rows, historical_performance_vendor_rows
+)
+from vendor_management_app.views import AcknowledgePurchaseOrder, VendorApi, PurchaseOrderApi, PurchaseOrderChangeApi, HistoricalPerformanceApi, parse_expand
+from vendor_management_app.services.commands import (
+    acreate_vendor, aupdate_vendor, adelete_vendor,
+    acreate_purchase_order, aupdate_purchase_order, adelete_purchase_order, aacknowledge_purchase_order
+)
+from vendor_management_app.services.cache import aget_or_set_vendor_entry, request_entry_name
+from vendor_management_app.services.queries import (
+    get_vendors, get_purchase_orders, get_historical_performances, aget_vendor_detail, aget_performance_series
+)
+
+# Async counterparts of the endpoints in views.py, mounted under /api/async/.
+# They are plain Django views: DRF's APIView is sync only. Input is validated
+# with the same serializers and output matches the sync API. Streaming exports
+# and the bulk import stay on the sync API.
+
+# Change feed: how often waiting requests and streams look for new entries,
+# how often an idle stream sends a comment to keep proxies from closing it,
+# and how long a stream lasts before the client reconnects from its last id.
+CHANGE_POLL_INTERVAL = 1.0
+CHANGE_HEARTBEAT_INTERVAL = 15.0
+CHANGE_STREAM_DURATION = 300.0
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, encoder=JSONEncoder, safe=False)
+
+
+def not_found(message="Not found."):
+    return json_response({"detail": message}, status=404)
+
+
+def conditional_json_response(request, data, etag):
+    if_none_match = request.headers.get('If-None-Match', '')
+    client_etags = [value.strip().removeprefix('W/') for value in if_none_match.split(',')]
+    if etag in client_etags or '*' in client_etags:
+        response = HttpResponse(status=304)
+    else:
+        response = json_response(data)
+    response['ETag'] = etag
+    return response
+
+
+class AsyncApiView(View):
+    http_method_names = ['get', 'post', 'put', 'delete']
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Exempt like DRF's APIView. Set directly: csrf_exempt() would hide that the view is async on Django 4.2.
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        # DRF's APIView turns APIExceptions (e.g. NotFound for a bad cursor, VersionConflict) into responses, this view has to do it itself.
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            # Same body as DRF's exception handler.
+            data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+            return json_response(data, status=exc.status_code)
+
+    def parse_body(self, request):
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+
+    async def validate(self, serializer):
+        # ModelSerializer validation queries the database (related fields, unique checks).
+        return await sync_to_async(serializer.is_valid)()
+
+
+class AsyncVendorApi(AsyncApiView):
+    ordering = VendorApi.ordering
+
+    async def get(self, request, vendor_id=None):
+        if vendor_id:
+            entry = await aget_vendor_detail(vendor_id)
+            if entry is None:
+                return not_found()
+            return conditional_json_response(request, *entry)
+
+        paginator = KeysetPagination(ordering=self.ordering)
+        result_page = await paginator.apaginate_queryset(vendor_rows.values_list(get_vendors()), request)
+        return json_response(paginator.get_paginated_data(vendor_rows.to_dicts(result_page)))
+
+    async def post(self, request):
+        serializer = VendorApi.InputSerializer(data=self.parse_body(request))
+        if not await self.validate(serializer):
+            return json_response(serializer.errors, status=400)
+        serializer.validated_data.pop('version', None)
+        vendor = await acreate_vendor(**serializer.validated_data)
+        return json_response(VendorApi.OutputSerializer(vendor).data, status=201)
+
+    async def put(self, request, vendor_id):
+        vendor = await Vendor.objects.filter(id=vendor_id).afirst()
+        if vendor is None:
+            return not_found()
+        serializer = VendorApi.InputSerializer(instance=vendor, data=self.parse_body(request), partial=True)
+        if not await self.validate(serializer):
+            return json_response(serializer.errors, status=400)
+        vendor = await aupdate_vendor(vendor=vendor, **serializer.validated_data)
+        return json_response(VendorApi.OutputSerializer(vendor).data, status=202)
+
+    async def delete(self, request, vendor_id):
+        vendor = await Vendor.objects.filter(id=vendor_id).afirst()
+        if vendor is None:
+            return not_found()
+        await adelete_vendor(vendor=vendor)
+        return HttpResponse(status=204)
+
+
+class AsyncPurchaseOrderApi(AsyncApiView):
+    async def get(self, request, po_id=None):
+        po_id = po_id or request.GET.get('po_id')
+        vendor_id = request.GET.get('vendor_id')
+
+        if po_id:
+            row = await purchase_order_rows.values_list(PurchaseOrder.objects.filter(id=po_id)).afirst()
+            if row is None:
+                return not_found()
+            return json_response(purchase_order_rows.to_dict(row))
+
+        try:
+            expand = parse_expand(request.GET)
+            filters, ordering = PurchaseOrderApi.list_params(request.GET)
+        except ValidationError as exc:
+            return json_response(exc.detail, status=400)
+        rows = purchase_order_vendor_rows if 'vendor' in expand else purchase_order_rows
+        purchase_orders = get_purchase_orders(expand, filters)
+
+        if vendor_id:
+            values = rows.values_list(purchase_orders.filter(vendor__id=vendor_id).order_by(*ordering))
+            return json_response(rows.to_dicts([row async for row in values]))
+
+        paginator = KeysetPagination(ordering=ordering)
+        result_page = await paginator.apaginate_queryset(rows.values_list(purchase_orders), request)
+        return json_response(paginator.get_paginated_data(rows.to_dicts(result_page)))
+
+    async def post(self, request):
+        serializer = PurchaseOrderApi.InputSerializer(data=self.parse_body(request))
+        if not await self.validate(serializer):
+            return json_response(serializer.errors, status=400)
+        serializer.validated_data.pop('version', None)
+        vendor = serializer.validated_data.pop('vendor', None)
+        purchase_order = await acreate_purchase_order(vendor=vendor, **serializer.validated_data)
+        return json_response(PurchaseOrderApi.OutputSerializer(purchase_order).data, status=201)
+
+    async def put(self, request, po_id):
+        purchase_order = await PurchaseOrder.objects.filter(id=po_id).afirst()
+        if purchase_order is None:
+            return not_found()
+        serializer = PurchaseOrderApi.InputSerializer(instance=purchase_order, data=self.parse_body(request), partial=True)
+        if not await self.validate(serializer):
+            return json_response(serializer.errors, status=400)
+        purchase_order = await aupdate_purchase_order(purchase_order=purchase_order, **serializer.validated_data)
+        return json_response(PurchaseOrderApi.OutputSerializer(purchase_order).data, status=202)
+
+    async def delete(self, request, po_id):
+        purchase_order = await PurchaseOrder.objects.filter(id=po_id).afirst()
+        if purchase_order is None:
+            return not_found()
+        await adelete_purchase_order(purchase_order=purchase_order)
+        return HttpResponse(status=204)
+
+
+class AsyncAcknowledgePurchaseOrder(AsyncApiView):
+    async def post(self, request, po_id):
+        purchase_order = await PurchaseOrder.objects.filter(id=po_id).afirst()
+        if purchase_order is None:
+            return not_found()
+        # The body is optional, only a JSON one can carry the version.
+        body = self.parse_body(request) if request.content_type == 'application/json' else {}
+        serializer = AcknowledgePurchaseOrder.InputSerializer(data=body)
+        if not serializer.is_valid():
+            return json_response(serializer.errors, status=400)
+
+        await aacknowledge_purchase_order(purchase_order, **serializer.validated_data)
+        return json_response({"detail": "Purchase order acknowledged successfully."})
+
+
+class AsyncHistoricalPerformanceApi(AsyncApiView):
+    ordering = HistoricalPerformanceApi.ordering
+
+    async def get(self, request, vendor_id):
+        if 'granularity' in request.GET:
+            serializer = HistoricalPerformanceApi.RangeSerializer(data=request.GET)
+            if not serializer.is_valid():
+                return json_response(serializer.errors, status=400)
+            series_range = serializer.validated_data
+
+            async def load():
+                if not await Vendor.objects.filter(id=vendor_id).aexists():
+                    return None
+                series = await aget_performance_series(vendor_id, series_range['granularity'], series_range['from'], series_range['to'])
+                return HistoricalPerformanceApi.series_data(vendor_id, series_range, series)
+
+            entry = await aget_or_set_vendor_entry(vendor_id, request_entry_name('performance', request), load)
+            if entry is None:
+                return not_found()
+            return conditional_json_response(request, *entry)
+
+        try:
+            expand = parse_expand(request.GET)
+        except ValidationError as exc:
+            return json_response(exc.detail, status=400)
+        rows = historical_performance_vendor_rows if 'vendor' in expand else historical_performance_rows
+
+        async def load():
+            historical_performances = get_historical_performances(vendor_id, expand)
+            if not await historical_performances.aexists():
+                return None
+            paginator = KeysetPagination(ordering=self.ordering)
+            result_page = await paginator.apaginate_queryset(rows.values_list(historical_performances), request)
+            return paginator.get_paginated_data(rows.to_dicts(result_page))
+
+        entry = await aget_or_set_vendor_entry(vendor_id, request_entry_name('performance', request), load)
+        if entry is None:
+            if not await Vendor.objects.filter(id=vendor_id).aexists():
+                return not_found()
+            return json_response({"error": f"No historical performances found for vendor with ID {vendor_id}."}, status=404)
+        return conditional_json_response(request, *entry)
+
+
+class AsyncPurchaseOrderChangeApi(AsyncApiView):
+    http_method_names = ['get']
+
+    class FilterSerializer(PurchaseOrderChangeApi.FilterSerializer):
+        wait = serializers.FloatField(required=False, default=0, min_value=0, max_value=30,
+                                      help_text="Seconds to wait for a change when there is none yet (long-poll).")
+
+    async def get(self, request):
+        serializer = self.FilterSerializer(data=request.GET)
+        if not serializer.is_valid():
+            return json_response(serializer.errors, status=400)
+        params = serializer.validated_data
+
+        deadline = time.monotonic() + params['wait']
+        while True:
+            rows = [row async for row in PurchaseOrderChangeApi.rows(params)]
+            remaining = deadline - time.monotonic()
+            if rows or remaining <= 0:
+                return json_response(PurchaseOrderChangeApi.batch(params, rows))
+            await asyncio.sleep(min(CHANGE_POLL_INTERVAL, remaining))
+
+
+class AsyncPurchaseOrderChangeStream(AsyncApiView):
+    """Server-Sent Events: one `id: <seq>` event per change, named after its action.
+
+    Resumes from the `Last-Event-ID` header that EventSource sends when it
+    reconnects, or from `?since=`.
+    """
+    http_method_names = ['get']
+
+    async def get(self, request):
+        params = request.GET.dict()
+        if request.headers.get('Last-Event-ID'):
+            params['since'] = request.headers['Last-Event-ID']
+        serializer = PurchaseOrderChangeApi.FilterSerializer(data=params)
+        if not serializer.is_valid():
+            return json_response(serializer.errors, status=400)
+        response = StreamingHttpResponse(self.events(dict(serializer.validated_data)), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def events(self, params):
+        # Django 4.2 doesn't stop the iteration when the client goes away: streams
+        # end after CHANGE_STREAM_DURATION and EventSource reconnects.
+        started = last_sent = time.monotonic()
+        yield f'retry: {int(CHANGE_POLL_INTERVAL * 1000)}\n\n'
+        while time.monotonic() - started < CHANGE_STREAM_DURATION:
+            batch = PurchaseOrderChangeApi.batch(params, [row async for row in PurchaseOrderChangeApi.rows(params)])
+            for change in batch['results']:
+                yield f"id: {change['seq']}\nevent: {change['action']}\ndata: {json.dumps(change, cls=JSONEncoder)}\n\n"
+            params['since'] = batch['last_seq']
+            if batch['results']:
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= CHANGE_HEARTBEAT_INTERVAL:
+                yield ': keep-alive\n\n'
+                last_sent = time.monotonic()
+            if not batch['has_more']:
+                await asyncio.sleep(CHANGE_POLL_INTERVAL)
@@ -0,0 +1,329 @@
+"""Opt-in per-request instrumentation: query counts, DB / serialization / service
+time, N+1 detection and Prometheus metrics.
+
+Enabled with settings.VENDOR_INSTRUMENTATION['ENABLED']. When disabled the
+middleware removes itself and the decorators and timers return straight away.
+"""
+import functools
+import inspect
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.signals import setting_changed
+from django.db import connection
+from django.dispatch import receiver
+from django.http import Http404, HttpResponse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    'ENABLED': False,
+    'SLOW_REQUEST_MS': 500,
+    # The same statement (literals stripped) this many times in one request is reported as N+1.
+    'N_PLUS_ONE_THRESHOLD': 10,
+    'METRICS_ALLOWED_IPS': ['127.0.0.1', '::1'],
+}
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_options = None
+_profile = ContextVar('vendor_request_profile', default=None)
+
+
+def instrumentation_settings() -> dict:
+    global _options
+    if _options is None:
+        _options = {**DEFAULT_SETTINGS, **getattr(settings, 'VENDOR_INSTRUMENTATION', {})}
+    return _options
+
+
+@receiver(setting_changed)
+def _reset_settings(setting, **kwargs):
+    global _options
+    if setting == 'VENDOR_INSTRUMENTATION':
+        _options = None
+
+
+def instrumentation_enabled() -> bool:
+    return instrumentation_settings()['ENABLED']
+
+
+# Quoted strings, numbers and DB-API placeholders.
+_LITERALS = re.compile(r"'(?:[^']|'')*'|%s|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)')
+
+
+def fingerprint(sql: str) -> str:
+    """The statement with its literals replaced by '?', so repeats of one query compare equal."""
+    return _IN_LISTS.sub('(?)', _LITERALS.sub('?', sql))
+
+
+class RequestProfile:
+    """What one request (or `profile()` block) spent its time on."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialization_time = 0.0
+        self.services = defaultdict(lambda: [0, 0.0])
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook, see django/db/backends/utils.py.
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.statements[fingerprint(sql)] += 1
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def n_plus_one(self, threshold: int) -> list:
+        return [(statement, count) for statement, count in self.statements.most_common() if count >= threshold]
+
+    def server_timing(self) -> str:
+        entries = [
+            f'total;dur={self.elapsed * 1000:.1f}',
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+            f'serialization;dur={self.serialization_time * 1000:.1f}',
+        ]
+        entries.extend(f'svc.{name};dur={duration * 1000:.1f}' for name, (_, duration) in self.services.items())
+        return ', '.join(entries)
+
+
+@contextmanager
+def profile():
+    """Profile the database queries and instrumented calls made inside the block."""
+    request_profile = RequestProfile()
+    token = _profile.set(request_profile)
+    try:
+        with connection.execute_wrapper(request_profile):
+            yield request_profile
+    finally:
+        _profile.reset(token)
+
+
+def _add_execute_wrapper(wrapper):
+    connection.execute_wrappers.append(wrapper)
+
+
+def _remove_execute_wrapper(wrapper):
+    connection.execute_wrappers.remove(wrapper)
+
+
+@asynccontextmanager
+async def aprofile():
+    """profile() for async code, whose queries run on the connection of the sync thread."""
+    request_profile = RequestProfile()
+    token = _profile.set(request_profile)
+    await sync_to_async(_add_execute_wrapper)(request_profile)
+    try:
+        yield request_profile
+    finally:
+        await sync_to_async(_remove_execute_wrapper)(request_profile)
+        _profile.reset(token)
+
+
+@contextmanager
+def serialization_timer():
+    request_profile = _profile.get()
+    if request_profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        request_profile.serialization_time += time.perf_counter() - start
+
+
+def _record_service(name, elapsed):
+    request_profile = _profile.get()
+    if request_profile is not None:
+        request_profile.services[name][0] += 1
+        request_profile.services[name][1] += elapsed
+    if instrumentation_enabled():
+        registry.inc('vms_service_calls_total', {'function': name})
+        registry.inc('vms_service_duration_seconds_total', {'function': name}, elapsed)
+
+
+def instrumented(func):
+    """Time calls to a service function, per request and in the Prometheus metrics."""
+    name = func.__name__
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            if not instrumentation_enabled():
+                return await func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _record_service(name, time.perf_counter() - start)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not instrumentation_enabled():
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _record_service(name, time.perf_counter() - start)
+    return wrapper
+
+
+class MetricsRegistry:
+    """Counters and histograms kept in process memory, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._histograms = {}
+
+    def inc(self, name, labels: dict, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name, tuple(sorted(labels.items()))] += value
+
+    def observe(self, name, labels: dict, value: float) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            buckets, total = self._histograms.get(key, ([0] * len(DURATION_BUCKETS), [0, 0.0]))
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    buckets[index] += 1
+            total[0] += 1
+            total[1] += value
+            self._histograms[key] = (buckets, total)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self) -> str:
+        lines, typed = [], set()
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                if name not in typed:
+                    lines.append(f'# TYPE {name} counter')
+                    typed.add(name)
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+            for (name, labels), (buckets, (count, total)) in sorted(self._histograms.items()):
+                if name not in typed:
+                    lines.append(f'# TYPE {name} histogram')
+                    typed.add(name)
+                for bound, bucket_count in zip(DURATION_BUCKETS, buckets):
+                    lines.append(f'{name}_bucket{_labels(labels + (("le", f"{bound:g}"),))} {bucket_count}')
+                lines.append(f'{name}_bucket{_labels(labels + (("le", "+Inf"),))} {count}')
+                lines.append(f'{name}_sum{_labels(labels)} {_number(total)}')
+                lines.append(f'{name}_count{_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels) -> str:
+    if not labels:
+        return ''
+    escaped = (f'{key}="{_escape(value)}"' for key, value in labels)
+    return '{' + ','.join(escaped) + '}'
+
+
+def _number(value) -> str:
+    return str(int(value)) if value == int(value) else repr(value)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
+
+
+class InstrumentationMiddleware:
+    """Profile each request: Server-Timing header, Prometheus metrics, slow request and N+1 warnings.
+
+    Runs in sync and async mode, so ASGI requests to the async views aren't
+    switched to a thread by this middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not instrumentation_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with profile() as request_profile:
+            response = self.get_response(request)
+        self.report(request, response, request_profile)
+        return response
+
+    async def __acall__(self, request):
+        async with aprofile() as request_profile:
+            response = await self.get_response(request)
+        self.report(request, response, request_profile)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook returns: that is the serialization time.
+        request_profile = _profile.get()
+        if request_profile is not None:
+            start = time.perf_counter()
+
+            def rendered(response):
+                request_profile.serialization_time += time.perf_counter() - start
+            response.add_post_render_callback(rendered)
+        return response
+
+    def report(self, request, response, request_profile):
+        options = instrumentation_settings()
+        match = request.resolver_match
+        route = match.route if match else 'unmatched'
+        labels = {'method': request.method, 'route': route}
+        elapsed = request_profile.elapsed
+
+        registry.inc('vms_requests_total', {**labels, 'status': str(response.status_code)})
+        registry.observe('vms_request_duration_seconds', labels, elapsed)
+        registry.inc('vms_request_db_queries_total', labels, request_profile.queries)
+        registry.inc('vms_request_db_duration_seconds_total', labels, request_profile.db_time)
+        registry.inc('vms_request_serialization_seconds_total', labels, request_profile.serialization_time)
+        response['Server-Timing'] = request_profile.server_timing()
+
+        for statement, count in request_profile.n_plus_one(options['N_PLUS_ONE_THRESHOLD']):
+            registry.inc('vms_n_plus_one_total', labels)
+            logger.warning("Possible N+1 in %s %s: %d x %s", request.method, request.path, count, statement)
+
+        if elapsed * 1000 >= options['SLOW_REQUEST_MS']:
+            logger.warning(
+                "Slow request %s %s: %.0f ms, %d queries in %.0f ms, serialization %.0f ms, services %s",
+                request.method, request.path, elapsed * 1000, request_profile.queries, request_profile.db_time * 1000,
+                request_profile.serialization_time * 1000,
+                {name: f'{duration * 1000:.0f} ms' for name, (_, duration) in request_profile.services.items()},
+            )
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, only answered for the local addresses in METRICS_ALLOWED_IPS."""
+    options = instrumentation_settings()
+    if not options['ENABLED'] or request.META.get('REMOTE_ADDR') not in options['METRICS_ALLOWED_IPS']:
+        raise Http404
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
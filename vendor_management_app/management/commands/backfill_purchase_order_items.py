@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from vendor_management_app.services.commands import backfill_purchase_order_items
+
+
+class Command(BaseCommand):
+    help = "Rebuild the PurchaseOrderItem SKU index from the items of every purchase order."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Number of purchase orders rebuilt per transaction.")
+        parser.add_argument('--start-id', type=int, default=0, help="Only rebuild purchase orders with a greater id, to resume a run.")
+
+    def handle(self, *args, **options):
+        processed = backfill_purchase_order_items(chunk_size=options['chunk_size'], start_id=options['start_id'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed the items of {processed} purchase order(s)."))
@@ -0,0 +1,21 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from vendor_management_app.services.commands import compact_historical_performance
+
+
+class Command(BaseCommand):
+    help = "Roll old hourly performance snapshots up into daily ones, and old daily snapshots into weekly ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hour-retention-days', type=int, default=2, help="Keep hourly snapshots for this many days.")
+        parser.add_argument('--day-retention-days', type=int, default=90, help="Keep daily snapshots for this many days.")
+
+    def handle(self, *args, **options):
+        compacted = compact_historical_performance(
+            hour_retention=timedelta(days=options['hour_retention_days']),
+            day_retention=timedelta(days=options['day_retention_days']),
+        )
+
+        for granularity, count in compacted.items():
+            self.stdout.write(f"{granularity}: {count} snapshot(s) rolled up")
+        self.stdout.write(self.style.SUCCESS("Performance history compacted."))
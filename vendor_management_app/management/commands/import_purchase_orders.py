@@ -0,0 +1,41 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from vendor_management_app.services.imports import FORMATS, import_purchase_orders, parse_purchase_order_stream
+from vendor_management_app.services.metrics_queue import flush_metrics_queue
+
+
+class Command(BaseCommand):
+    help = "Import purchase orders from a JSON Lines or CSV file, referencing vendors by vendor_code."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or - to read from stdin.")
+        parser.add_argument('--format', choices=FORMATS, help="Input format (default: guessed from the file extension).")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Rows validated and inserted per transaction.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format']
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1.")
+        if fmt is None:
+            fmt = 'csv' if path.endswith('.csv') else 'jsonl'
+
+        if path == '-':
+            report = self._import(sys.stdin, fmt, options['chunk_size'])
+        else:
+            try:
+                with open(path, newline='', encoding='utf-8') as stream:
+                    report = self._import(stream, fmt, options['chunk_size'])
+            except OSError as exc:
+                raise CommandError(exc)
+
+        for error in report['errors']:
+            self.stderr.write(f"row {error['row']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(f"Created {report['created']} purchase order(s), {report['failed']} row(s) failed."))
+
+        # The recomputes were only queued: with the thread backend they would die with this process.
+        if not flush_metrics_queue():
+            raise CommandError("Recomputing the metrics of the imported vendors failed, run `manage.py process_metrics_queue`.")
+
+    def _import(self, stream, fmt, chunk_size):
+        return import_purchase_orders(parse_purchase_order_stream(stream, fmt), chunk_size=chunk_size)
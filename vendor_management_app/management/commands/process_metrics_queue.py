@@ -0,0 +1,40 @@
+import time
+from django.core.management.base import BaseCommand
+from vendor_management_app.services.metrics_queue import DatabaseMetricsQueue, flush_metrics_queue, get_metrics_queue
+
+
+class Command(BaseCommand):
+    help = "Run pending vendor metric recomputes and wait for them to finish."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--forever', action='store_true', help="Keep polling the database-backed queue instead of exiting once it is empty.")
+        parser.add_argument('--interval', type=float, default=1.0, help="Seconds to sleep between polls with --forever.")
+        parser.add_argument('--timeout', type=float, default=None, help="Give up flushing after this many seconds.")
+        parser.add_argument(
+            '--requeue-failed', action='store_true', help="Retry the requests of the database-backed queue that failed MAX_ATTEMPTS times first.",
+        )
+
+    def handle(self, *args, **options):
+        queue = get_metrics_queue()
+        if options['requeue_failed']:
+            if not isinstance(queue, DatabaseMetricsQueue):
+                self.stderr.write("--requeue-failed needs VENDOR_METRICS_QUEUE['BACKEND'] set to 'database'.")
+                return
+            self.stdout.write(f"Requeued {queue.requeue_failed()} failed request(s).")
+
+        if not options['forever']:
+            if not flush_metrics_queue(options['timeout']):
+                self.stderr.write("The metrics queue is not empty: the timeout expired, or recomputes failed too many times.")
+                return
+            self.stdout.write(self.style.SUCCESS("Metrics queue flushed."))
+            return
+
+        if not isinstance(queue, DatabaseMetricsQueue):
+            self.stderr.write("--forever needs VENDOR_METRICS_QUEUE['BACKEND'] set to 'database'.")
+            return
+        while True:
+            processed = queue.process()
+            if processed:
+                self.stdout.write(f"Recomputed metrics for {processed} vendor(s).")
+            else:
+                time.sleep(options['interval'])
@@ -0,0 +1,128 @@
+import bisect
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_CHECKPOINT = os.path.join(tempfile.gettempdir(), 'recompute_vendor_metrics.json')
+
+
+# Workers are spawned processes: they import this module before Django is set
+# up, so the models and services are only imported inside the functions.
+def _init_worker(settings_module):
+    import django
+    os.environ['DJANGO_SETTINGS_MODULE'] = settings_module
+    django.setup()
+
+
+def _recompute_chunk(vendor_ids, now, engine):
+    from vendor_management_app.services.commands import recompute_vendor_metrics
+    return vendor_ids[0], vendor_ids[-1], recompute_vendor_metrics(vendor_ids, now=now, engine=engine)
+
+
+def _load_checkpoint(path):
+    try:
+        with open(path) as checkpoint:
+            state = json.load(checkpoint)
+    except FileNotFoundError:
+        return None
+    return {'now': datetime.fromisoformat(state['now']), 'done': [tuple(id_range) for id_range in state['done']]}
+
+
+def _pending(vendor_ids, done):
+    """The ids (in order) not inside any of the completed (first, last) ranges."""
+    done = sorted(done)
+    firsts = [first for first, _ in done]
+    pending = []
+    for vendor_id in vendor_ids:
+        index = bisect.bisect_right(firsts, vendor_id) - 1
+        if index < 0 or vendor_id > done[index][1]:
+            pending.append(vendor_id)
+    return pending
+
+
+def _save_checkpoint(path, state):
+    # Write then rename, so a crash mid-write leaves the previous checkpoint intact.
+    with open(f'{path}.tmp', 'w') as checkpoint:
+        json.dump({'now': state['now'].isoformat(), 'done': state['done']}, checkpoint)
+    os.replace(f'{path}.tmp', path)
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the metrics of every vendor: the Vendor columns, the current hour's "
+        "HistoricalPerformance snapshot and the rankings. Vendors are processed in chunks by a "
+        "pool of worker processes; completed chunks are checkpointed so an interrupted run resumes "
+        "where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help="Number of vendors aggregated and written per transaction.")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Worker processes, each with its own database connection. 1 runs the chunks in this process.")
+        parser.add_argument('--engine', choices=['sql', 'numpy'], default='sql', help="Aggregate in the database or in NumPy.")
+        parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT, help="File recording the completed chunks, removed once the run finishes.")
+        parser.add_argument('--restart', action='store_true', help="Ignore an existing checkpoint and recompute every vendor.")
+
+    def handle(self, *args, **options):
+        from django.db import connections
+        from django.utils import timezone
+        from vendor_management_app.models import Vendor
+
+        if options['chunk_size'] < 1 or options['workers'] < 1:
+            raise CommandError("--chunk-size and --workers must be at least 1.")
+        path = options['checkpoint']
+        state = None if options['restart'] else _load_checkpoint(path)
+        if state is None:
+            # Every chunk of a run, resumed or not, is computed as of the same instant.
+            state = {'now': timezone.now(), 'done': []}
+        else:
+            self.stdout.write(f"Resuming the run started at {state['now'].isoformat()} from {path}.")
+
+        vendor_ids = _pending(Vendor.objects.order_by('id').values_list('id', flat=True), state['done'])
+        chunks = [vendor_ids[offset:offset + options['chunk_size']] for offset in range(0, len(vendor_ids), options['chunk_size'])]
+        self.stdout.write(f"Recomputing {len(vendor_ids)} vendor(s) in {len(chunks)} chunk(s) with {options['workers']} worker(s).")
+
+        start = time.perf_counter()
+        recomputed = 0
+
+        def chunk_done(first, last, count):
+            nonlocal recomputed
+            recomputed += count
+            state['done'].append((first, last))
+            _save_checkpoint(path, state)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"{recomputed}/{len(vendor_ids)} vendors, {recomputed / elapsed if elapsed else 0:.0f} vendors/s")
+
+        if options['workers'] == 1:
+            for chunk in chunks:
+                chunk_done(*_recompute_chunk(chunk, state['now'], options['engine']))
+        elif chunks:
+            # Connections must not be shared with the workers, which open their own.
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=options['workers'], mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker, initargs=(settings.SETTINGS_MODULE,),
+            ) as pool:
+                futures = [pool.submit(_recompute_chunk, chunk, state['now'], options['engine']) for chunk in chunks]
+                failed = 0
+                for future in as_completed(futures):
+                    # Keep checkpointing the chunks that succeed, so a rerun only redoes the failed ones.
+                    try:
+                        chunk_done(*future.result())
+                    except Exception as exc:
+                        failed += 1
+                        self.stderr.write(f"Chunk failed: {exc!r}")
+            if failed:
+                raise CommandError(f"{failed} chunk(s) failed; rerun the command to resume from {path}.")
+
+        if os.path.exists(path):
+            os.remove(path)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomputed the metrics of {recomputed} vendor(s) in {elapsed:.1f} s ({recomputed / elapsed if elapsed else 0:.0f} vendors/s)."
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from vendor_management_app.services.metrics import rebuild_vendor_counters
+
+
+class Command(BaseCommand):
+    help = "Rebuild the incremental vendor metric counters from PurchaseOrder and report any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('vendor_ids', nargs='*', type=int, help="Only reconcile these vendors (default: all vendors).")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Number of vendors aggregated per query.")
+        parser.add_argument('--dry-run', action='store_true', help="Report drift without writing the counters.")
+
+    def handle(self, *args, **options):
+        drift = rebuild_vendor_counters(
+            vendor_ids=options['vendor_ids'] or None,
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+        )
+
+        for vendor_id, fields in sorted(drift.items()):
+            changes = ', '.join(f"{field}: {stored} -> {actual}" for field, (stored, actual) in fields.items())
+            self.stdout.write(f"vendor {vendor_id}: {changes}")
+
+        verb = "found" if options['dry_run'] else "fixed"
+        self.stdout.write(self.style.SUCCESS(f"Drift {verb} for {len(drift)} vendor(s)."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from vendor_management_app.services.commands import rebuild_vendor_rankings
+
+
+class Command(BaseCommand):
+    help = "Recompute the VendorRanking table of every vendor from its purchase orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Number of vendors aggregated per query.")
+        parser.add_argument('--engine', choices=['sql', 'numpy'], default='sql', help="Aggregate in the database or in NumPy.")
+
+    def handle(self, *args, **options):
+        refreshed = rebuild_vendor_rankings(chunk_size=options['chunk_size'], engine=options['engine'])
+        self.stdout.write(self.style.SUCCESS(f"Refreshed the ranking of {refreshed} vendor(s)."))
@@ -0,0 +1,77 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Vendor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('contact_details', models.TextField()),
+                ('address', models.TextField()),
+                ('vendor_code', models.CharField(max_length=50, unique=True)),
+                ('on_time_delivery_rate', models.FloatField(blank=True, null=True)),
+                ('quality_rating_avg', models.FloatField(blank=True, null=True)),
+                ('average_response_time', models.FloatField(blank=True, null=True)),
+                ('fulfillment_rate', models.FloatField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MetricsRecomputeRequest',
+            fields=[
+                ('vendor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='vendor_management_app.vendor')),
+                ('requested_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VendorMetricCounters',
+            fields=[
+                ('vendor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='metric_counters', serialize=False, to='vendor_management_app.vendor')),
+                ('total_count', models.IntegerField(default=0)),
+                ('completed_count', models.IntegerField(default=0)),
+                ('on_time_count', models.IntegerField(default=0)),
+                ('rating_sum', models.FloatField(default=0)),
+                ('rating_count', models.IntegerField(default=0)),
+                ('response_time_sum', models.FloatField(default=0)),
+                ('response_time_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PurchaseOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('po_number', models.CharField(max_length=50, unique=True)),
+                ('order_date', models.DateTimeField()),
+                ('delivery_date', models.DateTimeField()),
+                ('items', models.JSONField()),
+                ('quantity', models.IntegerField()),
+                ('status', models.CharField(default='pending', max_length=20)),
+                ('quality_rating', models.FloatField(blank=True, null=True)),
+                ('issue_date', models.DateTimeField()),
+                ('acknowledgment_date', models.DateTimeField(blank=True, null=True)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='vendor_management_app.vendor')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='HistoricalPerformance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateTimeField()),
+                ('on_time_delivery_rate', models.FloatField()),
+                ('quality_rating_avg', models.FloatField()),
+                ('average_response_time', models.FloatField()),
+                ('fulfillment_rate', models.FloatField()),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='vendor_management_app.vendor')),
+            ],
+        ),
+    ]
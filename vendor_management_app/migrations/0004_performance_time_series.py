@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:55
+
+from django.db import migrations, models
+
+
+def bucket_existing_snapshots(apps, schema_editor):
+    # Snapshots used to be a single row per vendor overwritten in place. Move each
+    # into its hour bucket, keeping the most recent one if several share a bucket.
+    HistoricalPerformance = apps.get_model('vendor_management_app', 'HistoricalPerformance')
+    seen = set()
+    for snapshot in HistoricalPerformance.objects.order_by('-date', '-id').iterator():
+        bucket = snapshot.date.replace(minute=0, second=0, microsecond=0)
+        if (snapshot.vendor_id, bucket) in seen:
+            snapshot.delete()
+            continue
+        seen.add((snapshot.vendor_id, bucket))
+        snapshot.date = bucket
+        snapshot.save(update_fields=['date'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_management_app', '0003_purchase_order_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalperformance',
+            name='granularity',
+            field=models.CharField(choices=[('hour', 'Hour'), ('day', 'Day'), ('week', 'Week')], default='hour', max_length=10),
+        ),
+        migrations.RunPython(bucket_existing_snapshots, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='historicalperformance',
+            index=models.Index(fields=['granularity', 'date'], name='hp_granularity_date_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='historicalperformance',
+            unique_together={('vendor', 'granularity', 'date')},
+        ),
+    ]
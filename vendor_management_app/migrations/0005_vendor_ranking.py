@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_management_app', '0004_performance_time_series'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorRanking',
+            fields=[
+                ('vendor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='vendor_management_app.vendor')),
+                ('on_time_delivery_rate', models.FloatField()),
+                ('quality_rating_avg', models.FloatField()),
+                ('average_response_time', models.FloatField()),
+                ('fulfillment_rate', models.FloatField()),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['on_time_delivery_rate', 'vendor'], name='ranking_on_time_idx'), models.Index(fields=['quality_rating_avg', 'vendor'], name='ranking_quality_idx'), models.Index(fields=['average_response_time', 'vendor'], name='ranking_response_time_idx'), models.Index(fields=['fulfillment_rate', 'vendor'], name='ranking_fulfillment_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_management_app', '0005_vendor_ranking'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='purchaseorder',
+            name='po_delivery_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['delivery_date', 'id'], name='po_delivery_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['vendor', 'order_date', 'id'], name='po_vendor_order_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['issue_date', 'id'], name='po_issue_date_id_idx'),
+        ),
+    ]
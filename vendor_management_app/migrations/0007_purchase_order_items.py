@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_management_app', '0006_purchase_order_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PurchaseOrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sku', models.CharField(max_length=100)),
+                ('quantity', models.IntegerField(blank=True, null=True)),
+                ('purchase_order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='line_items', to='vendor_management_app.purchaseorder')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['sku', 'purchase_order', 'quantity'], name='po_item_sku_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_management_app', '0007_purchase_order_items'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalperformance',
+            name='response_time_p50',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicalperformance',
+            name='response_time_p90',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_management_app', '0008_response_time_percentiles'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendor',
+            name='metrics_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
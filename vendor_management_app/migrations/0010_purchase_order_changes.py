@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_management_app', '0009_vendor_metrics_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PurchaseOrderChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('purchase_order_id', models.BigIntegerField()),
+                ('vendor_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted')], max_length=10)),
+                ('data', models.JSONField(null=True)),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['vendor_id', 'id'], name='po_change_vendor_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_management_app', '0010_purchase_order_changes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchaseorder',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
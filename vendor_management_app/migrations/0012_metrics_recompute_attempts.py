@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_management_app', '0011_optimistic_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='metricsrecomputerequest',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
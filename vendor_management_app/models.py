@@ -9,6 +9,10 @@ class Vendor(models.Model):
     quality_rating_avg = models.FloatField(null=True, blank=True)
     average_response_time = models.FloatField(null=True, blank=True)
     fulfillment_rate = models.FloatField(null=True, blank=True)
+    # Set whenever a recompute changes the metrics above, so clients and caches can key on it.
+    metrics_updated_at = models.DateTimeField(null=True, blank=True)
+    # Optimistic concurrency: bumped by every update through the API, not by metric recomputes.
+    version = models.PositiveIntegerField(default=1)
 
     def __str__(self):
         return self.name
@@ -24,17 +28,158 @@ class PurchaseOrder(models.Model):
     quality_rating = models.FloatField(null=True, blank=True)
     issue_date = models.DateTimeField()
     acknowledgment_date = models.DateTimeField(null=True, blank=True)
+    # Optimistic concurrency: bumped by every update, see services/commands.py
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            # Metric computation: vendor + status='completed', then delivery_date.
+            models.Index(fields=['vendor', 'status', 'delivery_date'], name='po_vendor_status_delivery_idx'),
+            # Fleet-wide status / overdue scans.
+            models.Index(fields=['status', 'delivery_date'], name='po_status_delivery_idx'),
+            models.Index(fields=['delivery_date', 'id'], name='po_delivery_date_id_idx'),
+            # Response times only look at acknowledged POs, the acknowledgment queue only at the others.
+            models.Index(fields=['vendor', 'acknowledgment_date', 'issue_date'], name='po_vendor_acknowledged_idx',
+                         condition=models.Q(acknowledgment_date__isnull=False)),
+            models.Index(fields=['vendor', 'issue_date'], name='po_vendor_unacknowledged_idx',
+                         condition=models.Q(acknowledgment_date__isnull=True)),
+            # Keyset pagination of the PO listing, on its own and filtered by vendor.
+            models.Index(fields=['order_date', 'id'], name='po_order_date_id_idx'),
+            models.Index(fields=['vendor', 'order_date', 'id'], name='po_vendor_order_date_id_idx'),
+            models.Index(fields=['issue_date', 'id'], name='po_issue_date_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.po_number} - {self.vendor.name}"
 
+class PurchaseOrderItem(models.Model):
+    """One line of a purchase order's `items`, kept in sync by the purchase order commands.
+
+    SKU lookups and per-SKU totals read this table through its index instead
+    of decoding the items JSON of every purchase order.
+    """
+    purchase_order = models.ForeignKey(PurchaseOrder, on_delete=models.CASCADE, related_name='line_items')
+    sku = models.CharField(max_length=100)
+    quantity = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Covers SKU search and per-SKU aggregates without reading the table.
+            models.Index(fields=['sku', 'purchase_order', 'quantity'], name='po_item_sku_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.sku} x {self.quantity} on purchase order {self.purchase_order_id}"
+
 class HistoricalPerformance(models.Model):
+    """A snapshot of a vendor's metrics for the time bucket starting at `date`.
+
+    Recomputes write 'hour' snapshots; compaction rolls old ones up into
+    'day' and then 'week' snapshots.
+    """
+    HOUR = 'hour'
+    DAY = 'day'
+    WEEK = 'week'
+    GRANULARITY_CHOICES = [(HOUR, 'Hour'), (DAY, 'Day'), (WEEK, 'Week')]
+
     vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE)
     date = models.DateTimeField()
+    granularity = models.CharField(max_length=10, choices=GRANULARITY_CHOICES, default=HOUR)
     on_time_delivery_rate = models.FloatField()
     quality_rating_avg = models.FloatField()
     average_response_time = models.FloatField()
     fulfillment_rate = models.FloatField()
+    # Nearest-rank response time percentiles in hours, null without acknowledged POs.
+    # Rolled-up snapshots hold the mean of the rolled-up percentiles.
+    response_time_p50 = models.FloatField(null=True, blank=True)
+    response_time_p90 = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['vendor', '-date'], name='hp_vendor_date_idx'),
+            # Compaction scans one granularity across all vendors.
+            models.Index(fields=['granularity', 'date'], name='hp_granularity_date_idx'),
+        ]
+        # One snapshot per vendor and bucket. unique_together rather than a UniqueConstraint:
+        # DRF's ModelSerializer can't introspect the latter on Django 4.2.
+        unique_together = [('vendor', 'granularity', 'date')]
+
+    def __str__(self):
+        return f"{self.vendor.name} - {self.date}"
+
+class VendorMetricCounters(models.Model):
+    """Running totals used to maintain vendor metrics incrementally.
+
+    Only kept up to date when settings.VENDOR_METRICS_MODE is 'incremental'.
+    """
+    vendor = models.OneToOneField(Vendor, on_delete=models.CASCADE, primary_key=True, related_name='metric_counters')
+    total_count = models.IntegerField(default=0)
+    completed_count = models.IntegerField(default=0)
+    on_time_count = models.IntegerField(default=0)
+    rating_sum = models.FloatField(default=0)
+    rating_count = models.IntegerField(default=0)
+    response_time_sum = models.FloatField(default=0)
+    response_time_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"Metric counters for vendor {self.vendor_id}"
+
+class MetricsRecomputeRequest(models.Model):
+    """A vendor whose metrics are waiting to be recomputed by the database-backed metrics queue."""
+    vendor = models.OneToOneField(Vendor, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    requested_at = models.DateTimeField(db_index=True)
+    # Failed recomputes so far. Requests that reach the queue's MAX_ATTEMPTS stay in the
+    # table as dead letters and are no longer picked up.
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    def __str__(self):
+        return f"Recompute metrics for vendor {self.vendor_id}"
+
+class VendorRanking(models.Model):
+    """The latest metrics of each vendor, refreshed on every metrics recompute.
+
+    Each metric has its own (metric, vendor) index, so top-N listings and rank /
+    percentile counts are served from the index alone.
+    """
+    vendor = models.OneToOneField(Vendor, on_delete=models.CASCADE, primary_key=True, related_name='ranking')
+    on_time_delivery_rate = models.FloatField()
+    quality_rating_avg = models.FloatField()
+    average_response_time = models.FloatField()
+    fulfillment_rate = models.FloatField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['on_time_delivery_rate', 'vendor'], name='ranking_on_time_idx'),
+            models.Index(fields=['quality_rating_avg', 'vendor'], name='ranking_quality_idx'),
+            models.Index(fields=['average_response_time', 'vendor'], name='ranking_response_time_idx'),
+            models.Index(fields=['fulfillment_rate', 'vendor'], name='ranking_fulfillment_idx'),
+        ]
+
+    def __str__(self):
+        return f"Ranking of vendor {self.vendor_id}"
+
+class PurchaseOrderChange(models.Model):
+    """One create, update or delete of a purchase order, appended by the purchase order commands.
+
+    The auto-incremented `id` is the change feed's sequence number: SQLite never
+    reuses it and serializes writers, so entries are numbered in commit order.
+    """
+    CREATED, UPDATED, DELETED = 'created', 'updated', 'deleted'
+    ACTIONS = [(CREATED, 'Created'), (UPDATED, 'Updated'), (DELETED, 'Deleted')]
+
+    # Plain columns, not foreign keys: the entries of a deleted purchase order or vendor are kept.
+    purchase_order_id = models.BigIntegerField()
+    vendor_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTIONS)
+    # The purchase order's API representation after the change, null for deletes.
+    data = models.JSONField(null=True)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['vendor_id', 'id'], name='po_change_vendor_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.vendor.name} - {self.date}"
\ No newline at end of file
+        return f"#{self.id} purchase order {self.purchase_order_id} {self.action}"
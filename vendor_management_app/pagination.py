@@ -0,0 +1,151 @@
+import base64
+import binascii
+import json
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def _query_params(request):
+    # DRF requests have query_params, the plain Django requests of the async views only GET.
+    return getattr(request, 'query_params', request.GET)
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination over a unique ordering such as ('id',) or ('order_date', 'id').
+
+    The cursor holds the ordering values of the last row of the previous page
+    and the next page is fetched with a `WHERE (a, b) > (x, y)` style filter,
+    so deep pages cost the same as the first one as long as the ordering is
+    backed by an index. The client picks the page size with `?count=`, capped
+    at `max_page_size`, and can pass `?skip_count=true` to leave out the total
+    row count.
+    """
+    page_size = 10
+    max_page_size = 1000
+    page_size_query_param = 'count'
+    cursor_query_param = 'cursor'
+    skip_count_query_param = 'skip_count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering=('id',)):
+        # The last field must be unique so that every row has a distinct position.
+        self.ordering = tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self._start(queryset, request)
+        if self._wants_count(request):
+            self.count = queryset.count()
+        return self._finish(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset, request):
+        """paginate_queryset for async views, using the async ORM."""
+        page_queryset = self._start(queryset, request)
+        if self._wants_count(request):
+            self.count = await queryset.acount()
+        return self._finish([row async for row in page_queryset])
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        response = {'next': self.get_next_link(), 'results': data}
+        if self.count is not None:
+            response = {'count': self.count, **response}
+        return response
+
+    def _start(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.count = None
+        position = self.decode_cursor(request, queryset.model)
+
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(position))
+        return queryset[:self.page_size + 1]
+
+    def _finish(self, page):
+        self.has_next = len(page) > self.page_size
+        page = page[:self.page_size]
+        self.next_position = self._position(page[-1]) if self.has_next else None
+        return page
+
+    def _wants_count(self, request):
+        return _query_params(request).get(self.skip_count_query_param) != 'true'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(_query_params(request)[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def encode_cursor(self, position):
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in position]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, request, model=None):
+        """The position in the cursor, its values converted by the ordering fields of `model`.
+
+        Raises NotFound for anything that isn't a cursor this paginator encoded.
+        """
+        encoded = _query_params(request).get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        except (binascii.Error, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            position = [self._to_python(model, field.lstrip('-'), value) for field, value in zip(self.ordering, position)]
+        except (ValidationError, TypeError, ValueError, OverflowError):
+            raise NotFound(self.invalid_cursor_message)
+        if any(value is None for value in position):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    @staticmethod
+    def _to_python(model, name, value):
+        # Follows `a__b` paths; orderings on annotations only accept plain JSON scalars.
+        field = None
+        try:
+            for part in name.split('__'):
+                field = model._meta.get_field(part)
+                model = field.related_model
+        except (AttributeError, FieldDoesNotExist):
+            field = None
+        if field is not None:
+            return field.to_python(value)
+        if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+            raise TypeError(value)
+        return value
+
+    def _position(self, row):
+        fields = [field.lstrip('-') for field in self.ordering]
+        if isinstance(row, dict):
+            return [row[field] for field in fields]
+        return [getattr(row, field) for field in fields]
+
+    def _after(self, position):
+        # (a, b, c) > (x, y, z)  <=>  a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
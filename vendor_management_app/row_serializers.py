@@ -0,0 +1,150 @@
+from django.utils import timezone
+from vendor_management_app.instrumentation import serialization_timer
+from vendor_management_app.models import Vendor, PurchaseOrder, HistoricalPerformance, PurchaseOrderChange
+
+
+def format_datetime(value, tz=None):
+    # Same output as DRF's DateTimeField: ISO 8601 in the current timezone, 'Z' for UTC.
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(tz or timezone.get_current_timezone())
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def _resolve_field(model, path: str):
+    # 'vendor__name' -> Vendor.name
+    *relations, name = path.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+class RowSerializer:
+    """Serialize querysets to plain dicts straight from `values_list()` tuples.
+
+    Produces the same output as the views' OutputSerializer classes without
+    instantiating models or DRF fields per row. `fields` maps output names to
+    model field names, or to a dict of the same shape for a nested object read
+    across a relation, e.g. `{'vendor': {'name': 'vendor__name'}}`. The tuple ->
+    dict conversion is compiled once into a single dict display, e.g.
+    `{'po_id': values[0], 'order_date': fmt(values[3]), ...}`.
+    """
+
+    def __init__(self, model, fields: dict):
+        self.model = model
+        self.names = list(fields)
+        self.sources = []
+        namespace = {}
+        exec(f"def to_dict(values, fmt, tz):\n    return {self._display(fields)}", namespace)
+        self._to_dict = namespace['to_dict']
+
+    def _display(self, fields: dict) -> str:
+        items = []
+        for name, source in fields.items():
+            if isinstance(source, dict):
+                value = self._display(source)
+            else:
+                value = f'values[{len(self.sources)}]'
+                if _resolve_field(self.model, source).get_internal_type() == 'DateTimeField':
+                    value = f'fmt({value}, tz)'
+                self.sources.append(source)
+            items.append(f'{name!r}: {value}')
+        return f"{{{', '.join(items)}}}"
+
+    def to_dict(self, values, tz=None) -> dict:
+        return self._to_dict(values, format_datetime, tz or timezone.get_current_timezone())
+
+    def instance_to_dict(self, instance) -> dict:
+        """Serialize a model instance like its row. Only for fields of the model itself, not across relations."""
+        return self.to_dict([getattr(instance, _resolve_field(self.model, source).attname) for source in self.sources])
+
+    def values_list(self, queryset):
+        """Narrow `queryset` to the serialized columns.
+
+        Rows are named tuples, so KeysetPagination can read the ordering fields
+        off them before they are passed to `to_dicts`.
+        """
+        return queryset.values_list(*self.sources, named=True)
+
+    def to_dicts(self, rows) -> list:
+        to_dict, tz = self._to_dict, timezone.get_current_timezone()
+        with serialization_timer():
+            return [to_dict(values, format_datetime, tz) for values in rows]
+
+    def iter_rows(self, queryset, chunk_size: int = 2000):
+        """Yield one dict per row while holding at most `chunk_size` rows in memory."""
+        to_dict, tz = self._to_dict, timezone.get_current_timezone()
+        for values in queryset.values_list(*self.sources).iterator(chunk_size=chunk_size):
+            yield to_dict(values, format_datetime, tz)
+
+
+# Vendor fields embedded in other resources with `?expand=vendor`.
+VENDOR_SUMMARY_FIELDS = {
+    'vendor_id': 'id',
+    'name': 'name',
+    'vendor_code': 'vendor_code',
+}
+
+vendor_rows = RowSerializer(Vendor, {
+    'vendor_id': 'id',
+    'name': 'name',
+    'contact_details': 'contact_details',
+    'address': 'address',
+    'vendor_code': 'vendor_code',
+    'on_time_delivery_rate': 'on_time_delivery_rate',
+    'quality_rating_avg': 'quality_rating_avg',
+    'average_response_time': 'average_response_time',
+    'fulfillment_rate': 'fulfillment_rate',
+    'metrics_updated_at': 'metrics_updated_at',
+    'version': 'version',
+})
+
+PURCHASE_ORDER_FIELDS = {
+    'po_id': 'id',
+    'po_number': 'po_number',
+    'vendor_id': 'vendor_id',
+    'order_date': 'order_date',
+    'delivery_date': 'delivery_date',
+    'items': 'items',
+    'quantity': 'quantity',
+    'status': 'status',
+    'quality_rating': 'quality_rating',
+    'issue_date': 'issue_date',
+    'acknowledgment_date': 'acknowledgment_date',
+    'version': 'version',
+}
+
+HISTORICAL_PERFORMANCE_FIELDS = {
+    'historical_performance_id': 'id',
+    'vendor_id': 'vendor_id',
+    'date': 'date',
+    'granularity': 'granularity',
+    'on_time_delivery_rate': 'on_time_delivery_rate',
+    'quality_rating_avg': 'quality_rating_avg',
+    'average_response_time': 'average_response_time',
+    'fulfillment_rate': 'fulfillment_rate',
+    'response_time_p50': 'response_time_p50',
+    'response_time_p90': 'response_time_p90',
+}
+
+purchase_order_rows = RowSerializer(PurchaseOrder, PURCHASE_ORDER_FIELDS)
+historical_performance_rows = RowSerializer(HistoricalPerformance, HISTORICAL_PERFORMANCE_FIELDS)
+
+
+# `?expand=vendor` variants, the vendor summary is read through the listing query's join.
+_vendor_summary = {name: f'vendor__{source}' for name, source in VENDOR_SUMMARY_FIELDS.items()}
+purchase_order_vendor_rows = RowSerializer(PurchaseOrder, {**PURCHASE_ORDER_FIELDS, 'vendor': _vendor_summary})
+historical_performance_vendor_rows = RowSerializer(HistoricalPerformance, {**HISTORICAL_PERFORMANCE_FIELDS, 'vendor': _vendor_summary})
+
+purchase_order_change_rows = RowSerializer(PurchaseOrderChange, {
+    'seq': 'id',
+    'action': 'action',
+    'po_id': 'purchase_order_id',
+    'vendor_id': 'vendor_id',
+    'created_at': 'created_at',
+    'data': 'data',
+})
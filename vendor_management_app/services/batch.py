@@ -0,0 +1,219 @@
+import logging
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import serializers
+from vendor_management_app.instrumentation import instrumented
+from vendor_management_app.models import Vendor, PurchaseOrder, PurchaseOrderChange
+from vendor_management_app.services.cache import invalidate_vendor
+from vendor_management_app.services.changes import record_purchase_order_changes
+from vendor_management_app.services.items import sync_line_items
+from vendor_management_app.services.metrics import incremental_metrics_enabled, rebuild_vendor_counters
+from vendor_management_app.services.metrics_queue import mark_vendor_dirty
+
+logger = logging.getLogger(__name__)
+
+OPERATIONS = ('create', 'update', 'delete', 'acknowledge')
+MAX_OPERATIONS = 1000
+CONFLICT_MESSAGE = "Conflicts with an existing purchase order."
+
+
+class OperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=OPERATIONS)
+    id = serializers.IntegerField(required=False)
+    version = serializers.IntegerField(required=False)
+    data = serializers.DictField(required=False)
+
+    def validate(self, attrs):
+        if attrs['op'] != 'create' and 'id' not in attrs:
+            raise serializers.ValidationError({'id': [f"Required for '{attrs['op']}'."]})
+        if attrs['op'] in ('create', 'update') and 'data' not in attrs:
+            raise serializers.ValidationError({'data': [f"Required for '{attrs['op']}'."]})
+        return attrs
+
+
+class PurchaseOrderDataSerializer(serializers.Serializer):
+    # Same fields as the PurchaseOrderApi input; vendor and po_number checks are done once per batch, not per operation.
+    po_number = serializers.CharField(max_length=50)
+    vendor = serializers.IntegerField()
+    order_date = serializers.DateTimeField()
+    delivery_date = serializers.DateTimeField()
+    items = serializers.JSONField()
+    quantity = serializers.IntegerField()
+    status = serializers.CharField(max_length=20, required=False, default='pending')
+    quality_rating = serializers.FloatField(required=False, allow_null=True, default=None)
+    issue_date = serializers.DateTimeField()
+    acknowledgment_date = serializers.DateTimeField(required=False, allow_null=True, default=None)
+
+    def validate(self, attrs):
+        if 'vendor' in attrs:
+            attrs['vendor_id'] = attrs.pop('vendor')
+        return attrs
+
+
+def _validate_operations(operations) -> tuple:
+    """(validated operations, errors by index), checking each operation on its own."""
+    validated, errors = [], {}
+    for index, operation in enumerate(operations):
+        serializer = OperationSerializer(data=operation)
+        if not serializer.is_valid():
+            errors[index] = serializer.errors
+            validated.append(None)
+            continue
+        operation = dict(serializer.validated_data)
+        if 'data' in operation:
+            data = PurchaseOrderDataSerializer(data=operation['data'], partial=operation['op'] == 'update')
+            if not data.is_valid():
+                errors[index] = {'data': data.errors}
+                validated.append(None)
+                continue
+            operation['data'] = dict(data.validated_data)
+        validated.append(operation)
+    return validated, errors
+
+
+def _check_references(operations, errors: dict, conflicts: set) -> dict:
+    """Look up the purchase orders, vendors and po numbers the operations refer to, in three queries.
+
+    Operations giving a `version` the purchase order is no longer at are added to `conflicts`.
+    """
+    purchase_orders = PurchaseOrder.objects.in_bulk({operation['id'] for operation in operations if operation and 'id' in operation})
+    vendor_ids = set(Vendor.objects.filter(
+        id__in={operation['data']['vendor_id'] for operation in operations if operation and 'vendor_id' in operation.get('data', {})}
+    ).values_list('id', flat=True))
+    taken = dict(PurchaseOrder.objects.filter(
+        po_number__in={operation['data']['po_number'] for operation in operations if operation and 'po_number' in operation.get('data', {})}
+    ).values_list('po_number', 'id'))
+
+    for index, operation in enumerate(operations):
+        if operation is None:
+            continue
+        if 'id' in operation and operation['id'] not in purchase_orders:
+            errors[index] = {'id': [f"Purchase order {operation['id']} does not exist."]}
+            continue
+        if 'version' in operation and operation['version'] != purchase_orders[operation['id']].version:
+            errors[index] = {'version': [f"Purchase order {operation['id']} is at version {purchase_orders[operation['id']].version}."]}
+            conflicts.add(index)
+            continue
+        data = operation.get('data', {})
+        if 'vendor_id' in data and data['vendor_id'] not in vendor_ids:
+            errors[index] = {'data': {'vendor': [f"Invalid pk \"{data['vendor_id']}\" - object does not exist."]}}
+            continue
+        if 'po_number' in data:
+            # Owned by the updated purchase order, or by the create operation's index.
+            owner = operation.get('id', f'create-{index}')
+            if taken.setdefault(data['po_number'], owner) != owner:
+                errors[index] = {'data': {'po_number': ["Purchase order with this po number already exists."]}}
+    return purchase_orders
+
+
+@instrumented
+def apply_purchase_order_batch(operations) -> dict:
+    """Apply create / update / delete / acknowledge operations on purchase orders, all or nothing.
+
+    Operations are applied in order to the same in-memory purchase orders, then
+    written in one transaction: a check that the purchase orders are still at
+    the versions read, one bulk_create, one bulk_update and one delete, plus one
+    INSERT into the change feed.
+    Metrics are recomputed once per affected vendor after the commit. Returns
+    {'results': [...], 'errors': [...], 'conflict': bool}; when there are errors
+    nothing was written, and `conflict` tells whether they are all version
+    conflicts, i.e. the batch may succeed once rebuilt from fresh reads.
+    """
+    operations, errors = _validate_operations(operations)
+    conflicts = set()
+    purchase_orders = _check_references(operations, errors, conflicts)
+
+    now = timezone.now()
+    results, created, updated, deleted = [], [], {}, {}
+    items_changed, affected_vendor_ids = set(), set()
+    for index, operation in enumerate(operations):
+        if index in errors:
+            continue
+        op, data = operation['op'], operation.get('data', {})
+        if op == 'create':
+            purchase_order = PurchaseOrder(**data)
+            created.append(purchase_order)
+            items_changed.add(id(purchase_order))
+            affected_vendor_ids.add(purchase_order.vendor_id)
+            results.append({'index': index, 'op': op, 'purchase_order': purchase_order})
+            continue
+
+        purchase_order = purchase_orders[operation['id']]
+        if purchase_order.pk in deleted:
+            errors[index] = {'id': [f"Purchase order {purchase_order.pk} is deleted earlier in the batch."]}
+            continue
+        affected_vendor_ids.add(purchase_order.vendor_id)
+        if op == 'delete':
+            deleted[purchase_order.pk] = purchase_order
+            updated.pop(purchase_order.pk, None)
+        elif op == 'acknowledge':
+            if purchase_order.acknowledgment_date:
+                errors[index] = {'non_field_errors': ["Purchase order already acknowledged."]}
+                continue
+            purchase_order.acknowledgment_date = now
+            updated.setdefault(purchase_order.pk, set()).add('acknowledgment_date')
+        else:
+            if 'items' in data and data['items'] != purchase_order.items:
+                items_changed.add(id(purchase_order))
+            for field, value in data.items():
+                setattr(purchase_order, field, value)
+            updated.setdefault(purchase_order.pk, set()).update(data)
+            affected_vendor_ids.add(purchase_order.vendor_id)
+        results.append({'index': index, 'op': op, 'purchase_order': purchase_order})
+
+    if errors:
+        return _error_report(errors, conflict=errors.keys() == conflicts)
+
+    # The purchase orders were read outside of the transaction, which fails as a conflict if any changed since.
+    read_versions = {pk: purchase_orders[pk].version for pk in [*deleted, *updated]}
+    try:
+        with transaction.atomic():
+            current = dict(PurchaseOrder.objects.select_for_update().filter(id__in=list(read_versions)).values_list('id', 'version'))
+            stale = sorted(pk for pk, version in read_versions.items() if current.get(pk) != version)
+            if stale:
+                message = f"Purchase order(s) {', '.join(map(str, stale))} changed since the batch was read."
+                return _error_report({None: {'non_field_errors': [message]}}, conflict=True)
+
+            for pk in updated:
+                purchase_orders[pk].version += 1
+                updated[pk].add('version')
+            if deleted:
+                PurchaseOrder.objects.filter(id__in=list(deleted)).delete()
+            if updated:
+                PurchaseOrder.objects.bulk_update(
+                    [purchase_orders[pk] for pk in updated], sorted(set().union(*updated.values())), batch_size=500,
+                )
+            PurchaseOrder.objects.bulk_create(created)
+            sync_line_items(created, created=True)
+            sync_line_items([purchase_orders[pk] for pk in updated if id(purchase_orders[pk]) in items_changed])
+            # One change feed entry per purchase order, with its state at the end of the batch.
+            record_purchase_order_changes([
+                *((PurchaseOrderChange.DELETED, purchase_order) for purchase_order in deleted.values()),
+                *((PurchaseOrderChange.UPDATED, purchase_orders[pk]) for pk in updated),
+                *((PurchaseOrderChange.CREATED, purchase_order) for purchase_order in created),
+            ])
+
+            if incremental_metrics_enabled():
+                rebuild_vendor_counters(sorted(affected_vendor_ids))
+            # Marked once per vendor: each recompute runs after the commit, see services/metrics_queue.py
+            for vendor_id in affected_vendor_ids:
+                invalidate_vendor(vendor_id)
+                mark_vendor_dirty(vendor_id)
+    except IntegrityError:
+        # Lost a race with a concurrent writer, the whole batch was rolled back. The database's
+        # message names tables and constraints: it is logged, not returned.
+        logger.warning("Purchase order batch rolled back", exc_info=True)
+        return _error_report({None: {'non_field_errors': [CONFLICT_MESSAGE]}})
+
+    for result in results:
+        if result['op'] == 'delete':
+            result['po_id'] = result.pop('purchase_order').pk
+    return {'results': results, 'errors': [], 'conflict': False}
+
+
+def _error_report(errors: dict, conflict: bool = False) -> dict:
+    return {
+        'results': [],
+        'errors': [{'index': index, 'errors': errors[index]} for index in sorted(errors, key=lambda index: -1 if index is None else index)],
+        'conflict': conflict,
+    }
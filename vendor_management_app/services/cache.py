@@ -0,0 +1,105 @@
+import hashlib
+import json
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.utils.encoders import JSONEncoder
+
+# Every cached entry of a vendor embeds the vendor's current version in its key.
+# Invalidating a vendor bumps the version, which orphans all of its entries at
+# once; they then expire on their own. Works with any Django cache backend.
+
+
+def _cache():
+    return caches[getattr(settings, 'VENDOR_CACHE_ALIAS', 'default')]
+
+
+def _version_key(vendor_id) -> str:
+    return f'vms:vendor:{vendor_id}:version'
+
+
+def _entry_key(vendor_id, version, name: str) -> str:
+    return f'vms:vendor:{vendor_id}:{version}:{name}'
+
+
+def request_entry_name(name: str, request) -> str:
+    """Entry name for a response that depends on the request's path and query string.
+
+    The query string is unbounded, so it is hashed: keys stay within every
+    backend's limits (250 characters on memcached).
+    """
+    return f'{name}:{hashlib.md5(request.get_full_path().encode()).hexdigest()}'
+
+
+def _make_entry(data) -> tuple:
+    content = json.dumps(data, cls=JSONEncoder, sort_keys=True).encode()
+    return data, '"%s"' % hashlib.md5(content).hexdigest()
+
+
+def _timeout() -> int:
+    return getattr(settings, 'VENDOR_CACHE_TIMEOUT', 300)
+
+
+def get_vendor_version(vendor_id) -> int:
+    cache = _cache()
+    version = cache.get(_version_key(vendor_id))
+    if version is None:
+        # Start from the clock rather than 1 so an evicted version never resurrects old entries.
+        cache.add(_version_key(vendor_id), time.time_ns(), timeout=None)
+        version = cache.get(_version_key(vendor_id))
+    return version
+
+
+def _bump_version(vendor_id) -> None:
+    cache = _cache()
+    try:
+        cache.incr(_version_key(vendor_id))
+    except ValueError:
+        cache.set(_version_key(vendor_id), time.time_ns(), timeout=None)
+
+
+def invalidate_vendor(vendor_id) -> None:
+    """Drop every cached entry of the vendor once the current transaction commits."""
+    transaction.on_commit(lambda: _bump_version(vendor_id))
+
+
+def get_or_set_vendor_entry(vendor_id, name: str, producer):
+    """Return the cached (data, etag) pair of `name` for the vendor, computing it with `producer` on a miss.
+
+    `producer` returns the data to cache, or None for a miss that should not be
+    cached (e.g. the vendor does not exist), in which case None is returned.
+    """
+    cache = _cache()
+    key = _entry_key(vendor_id, get_vendor_version(vendor_id), name)
+    entry = cache.get(key)
+    if entry is None:
+        data = producer()
+        if data is None:
+            return None
+        entry = _make_entry(data)
+        cache.set(key, entry, _timeout())
+    return entry
+
+
+async def aget_vendor_version(vendor_id) -> int:
+    cache = _cache()
+    version = await cache.aget(_version_key(vendor_id))
+    if version is None:
+        await cache.aadd(_version_key(vendor_id), time.time_ns(), timeout=None)
+        version = await cache.aget(_version_key(vendor_id))
+    return version
+
+
+async def aget_or_set_vendor_entry(vendor_id, name: str, producer):
+    """get_or_set_vendor_entry for async callers; `producer` is a coroutine function."""
+    cache = _cache()
+    key = _entry_key(vendor_id, await aget_vendor_version(vendor_id), name)
+    entry = await cache.aget(key)
+    if entry is None:
+        data = await producer()
+        if data is None:
+            return None
+        entry = _make_entry(data)
+        await cache.aset(key, entry, _timeout())
+    return entry
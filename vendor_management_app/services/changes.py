@@ -0,0 +1,22 @@
+from django.utils import timezone
+from vendor_management_app.models import PurchaseOrderChange
+from vendor_management_app.row_serializers import purchase_order_rows
+
+
+def record_purchase_order_changes(changes) -> None:
+    """Append (action, purchase order) pairs to the change feed with one INSERT.
+
+    Call it inside the transaction of the write, and before deleting a purchase
+    order: Model.delete() clears its primary key.
+    """
+    now = timezone.now()
+    PurchaseOrderChange.objects.bulk_create([
+        PurchaseOrderChange(
+            purchase_order_id=purchase_order.pk,
+            vendor_id=purchase_order.vendor_id,
+            action=action,
+            data=None if action == PurchaseOrderChange.DELETED else purchase_order_rows.instance_to_dict(purchase_order),
+            created_at=now,
+        )
+        for action, purchase_order in changes
+    ])
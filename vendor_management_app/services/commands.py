@@ -1,9 +1,74 @@
-from vendor_management_app.models import Vendor, PurchaseOrder, HistoricalPerformance
-from datetime import datetime
+from asgiref.sync import sync_to_async
+from vendor_management_app.instrumentation import instrumented
+from vendor_management_app.models import Vendor, PurchaseOrder, PurchaseOrderChange, HistoricalPerformance, VendorRanking
+from datetime import datetime, timedelta
+from django.db import transaction
+from django.db.models import Avg, F, Q
+from django.db.models.functions import TruncDay, TruncWeek
 from django.utils import timezone
-from django.db.models import Avg, Count
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from vendor_management_app.services.metrics import (
+    METRIC_FIELDS, SNAPSHOT_FIELDS, compute_vendor_metrics, compute_metrics_for_vendors, incremental_metrics_enabled, incremental_vendor_metrics,
+    purchase_order_snapshot, apply_purchase_order_transition
+)
+from vendor_management_app.services.cache import invalidate_vendor
+from vendor_management_app.services.changes import record_purchase_order_changes
+from vendor_management_app.services.items import sync_line_items
+from vendor_management_app.services.metrics_queue import mark_vendor_dirty
 
 
+class VersionConflict(APIException):
+    """The row was changed by someone else since the version the update was based on."""
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The object was modified concurrently."
+    default_code = 'conflict'
+
+    def __init__(self, detail=None, version=None):
+        # `version` is the row's current one, None when it is gone, so the client can re-read and retry.
+        # Nothing here touches the database: the exception must stay cheap and picklable.
+        super().__init__(detail)
+        self.detail = {'detail': self.detail, 'version': version}
+
+    def __reduce__(self):
+        return type(self), (str(self.detail['detail']), self.detail['version'])
+
+
+def _current_version(instance):
+    return type(instance).objects.filter(pk=instance.pk).values_list('version', flat=True).first()
+
+
+def _conditional_update(instance, version, fields: dict) -> list:
+    """Write the `fields` that differ from `instance` with one UPDATE ... WHERE version = ...
+
+    `version` is the version the caller's changes are based on, the instance's own
+    when None. Raises VersionConflict when the row isn't at that version any more.
+    Updates the instance and returns the names of the changed fields.
+    """
+    expected = instance.version if version is None else version
+    if expected != instance.version:
+        raise VersionConflict(version=_current_version(instance))
+
+    changed = {}
+    for name, value in fields.items():
+        field = instance._meta.get_field(name)
+        # Compare foreign keys by id, without loading the related object.
+        raw = value.pk if field.is_relation and value is not None else value
+        if getattr(instance, field.attname) != raw:
+            changed[name] = (field.attname, raw, value)
+    if not changed:
+        return []
+
+    values = {attname: raw for attname, raw, _ in changed.values()}
+    if not type(instance).objects.filter(pk=instance.pk, version=expected).update(version=F('version') + 1, **values):
+        raise VersionConflict(version=_current_version(instance))
+    for name, (_, _, value) in changed.items():
+        setattr(instance, name, value)
+    instance.version = expected + 1
+    return list(changed)
+
+
+@instrumented
 def create_vendor(name:str, contact_details:str, address:str, vendor_code:str, on_time_delivery_rate:float, quality_rating_avg:float, average_response_time:float, fulfillment_rate:float) -> Vendor:
     vendor = Vendor.objects.create(
     name=name,
@@ -16,58 +81,234 @@ def create_vendor(name:str, contact_details:str, address:str, vendor_code:str, o
     fulfillment_rate=fulfillment_rate,
     )
     return vendor
-def update_vendor(vendor: Vendor, name:str, contact_details:str, address:str, vendor_code:str, on_time_delivery_rate:float, quality_rating_avg:float, average_response_time:float, fulfillment_rate:float) -> Vendor:
-    vendor.name=name
-    vendor.contact_details=contact_details
-    vendor.address=address
-    vendor.vendor_code=vendor_code
-    vendor.on_time_delivery_rate=on_time_delivery_rate
-    vendor.quality_rating_avg=quality_rating_avg
-    vendor.average_response_time=average_response_time
-    vendor.fulfillment_rate=fulfillment_rate
-
-    vendor.save()
+@instrumented
+def update_vendor(vendor: Vendor, version: int = None, **fields) -> Vendor:
+    """Update the given fields of a vendor, only writing those that changed.
+
+    Raises VersionConflict when the vendor changed since `version` (by default
+    since it was loaded).
+    """
+    if _conditional_update(vendor, version, fields):
+        invalidate_vendor(vendor.id)
     return vendor
 
+@instrumented
+@transaction.atomic
 def delete_vendor(vendor: Vendor) -> None:
+    invalidate_vendor(vendor.id)
+    # The vendor's purchase orders are deleted with it, the change feed has to say so.
+    record_purchase_order_changes(
+        (PurchaseOrderChange.DELETED, purchase_order) for purchase_order in PurchaseOrder.objects.filter(vendor=vendor).only('id', 'vendor_id')
+    )
     vendor.delete()
     return
 
 # Here i have defined a backend logic
+@instrumented
 def update_historical_performance_metrics(vendor):
-    completed_orders = PurchaseOrder.objects.filter(vendor=vendor, status='completed')
-    total_orders = PurchaseOrder.objects.filter(vendor=vendor)
+    vendor_id = getattr(vendor, 'pk', vendor)
+    # All four metrics come from one query, see services/metrics.py
+    if incremental_metrics_enabled():
+        # Keeps the recompute at one read; the snapshot's percentiles are left to the batch recompute.
+        metrics = incremental_vendor_metrics(vendor_id)
+    else:
+        metrics = compute_vendor_metrics(vendor_id, percentiles=True)
 
-    on_time_delivery_rate = completed_orders.filter(delivery_date__lte=timezone.now()).count() / completed_orders.count() * 100 if completed_orders.count() > 0 else 0
+    store_vendor_metrics({vendor_id: metrics})
+    record_performance_snapshots({vendor_id: metrics})
+    refresh_vendor_rankings({vendor_id: metrics})
 
-    quality_rating_avg = completed_orders.aggregate(Avg('quality_rating'))['quality_rating__avg'] if completed_orders.count() > 0 else 0
+@instrumented
+def store_vendor_metrics(metrics_by_vendor: dict, now: datetime = None) -> set:
+    """Write the metrics onto the Vendor rows whose stored values differ, stamping `metrics_updated_at`.
 
-    response_times = completed_orders.exclude(acknowledgment_date=None).annotate(response_time=Count('acknowledgment_date', distinct=True))
-    average_response_time = response_times.aggregate(Avg('response_time'))['response_time__avg'] if response_times.count() > 0 else 0
+    A single vendor is written with one conditional UPDATE that matches no row
+    when nothing changed; many vendors with one read and one bulk_update of the
+    changed ones. Returns the ids of the vendors that changed.
+    """
+    now = now or timezone.now()
+    if len(metrics_by_vendor) == 1:
+        [(vendor_id, metrics)] = metrics_by_vendor.items()
+        values = {field: metrics[field] for field in METRIC_FIELDS}
+        unchanged = Q(*[(f'{field}__isnull', True) if value is None else (field, value) for field, value in values.items()])
+        changed = {vendor_id} if Vendor.objects.filter(id=vendor_id).exclude(unchanged).update(metrics_updated_at=now, **values) else set()
+    else:
+        stored = {row[0]: row[1:] for row in Vendor.objects.filter(id__in=list(metrics_by_vendor)).values_list('id', *METRIC_FIELDS)}
+        vendors = [
+            Vendor(id=vendor_id, metrics_updated_at=now, **{field: metrics[field] for field in METRIC_FIELDS})
+            for vendor_id, metrics in metrics_by_vendor.items()
+            if vendor_id in stored and stored[vendor_id] != tuple(metrics[field] for field in METRIC_FIELDS)
+        ]
+        Vendor.objects.bulk_update(vendors, [*METRIC_FIELDS, 'metrics_updated_at'])
+        changed = {vendor.id for vendor in vendors}
 
-    fulfilment_rate = completed_orders.filter(status='completed').count() / total_orders.count() * 100 if total_orders.count() > 0 else 0
+    for vendor_id in changed:
+        invalidate_vendor(vendor_id)
+    return changed
 
-    historical_performance = HistoricalPerformance.objects.filter(vendor=vendor).first()
-    if historical_performance:
-        update_historical_performance(
-            historical_performance,
-            vendor_id=vendor,
-            date=timezone.now(),
-            on_time_delivery_rate=on_time_delivery_rate,
-            quality_rating_avg=quality_rating_avg,
-            average_response_time=average_response_time,
-            fulfillment_rate=fulfilment_rate
-        )
-    else:
-        create_historical_performance(
-            vendor_id=vendor,
-            date=timezone.now(),
-            on_time_delivery_rate=on_time_delivery_rate,
-            quality_rating_avg=quality_rating_avg,
-            average_response_time=average_response_time,
-            fulfillment_rate=fulfilment_rate
+@instrumented
+def record_performance_snapshots(metrics_by_vendor: dict, now: datetime = None) -> None:
+    """Upsert each vendor's metrics into the snapshot of the current hour with a single query.
+
+    Percentiles missing from the metrics are left as they are in an existing snapshot.
+    """
+    bucket = (now or timezone.now()).replace(minute=0, second=0, microsecond=0)
+    fields = {field for metrics in metrics_by_vendor.values() for field in metrics}
+    HistoricalPerformance.objects.bulk_create(
+        [
+            HistoricalPerformance(vendor_id=vendor_id, date=bucket, granularity=HistoricalPerformance.HOUR, **metrics)
+            for vendor_id, metrics in metrics_by_vendor.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['vendor', 'granularity', 'date'],
+        update_fields=[field for field in SNAPSHOT_FIELDS if field in fields],
+    )
+    for vendor_id in metrics_by_vendor:
+        invalidate_vendor(vendor_id)
+
+@instrumented
+def refresh_vendor_rankings(metrics_by_vendor: dict, now: datetime = None) -> None:
+    """Upsert the VendorRanking rows of the given vendors with a single query."""
+    now = now or timezone.now()
+    VendorRanking.objects.bulk_create(
+        [
+            VendorRanking(vendor_id=vendor_id, updated_at=now, **{field: metrics[field] for field in METRIC_FIELDS})
+            for vendor_id, metrics in metrics_by_vendor.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['vendor'],
+        update_fields=[*METRIC_FIELDS, 'updated_at'],
+    )
+
+@instrumented
+def rebuild_vendor_rankings(chunk_size: int = 1000, engine: str = 'sql') -> int:
+    """Recompute the ranking of every vendor from its purchase orders, `chunk_size` vendors per query.
+
+    `engine` is passed on to compute_metrics_for_vendors.
+    """
+    vendor_ids = Vendor.objects.order_by('id').values_list('id', flat=True).iterator(chunk_size=chunk_size)
+    refreshed = 0
+    while True:
+        chunk = [vendor_id for _, vendor_id in zip(range(chunk_size), vendor_ids)]
+        if not chunk:
+            return refreshed
+        refresh_vendor_rankings(compute_metrics_for_vendors(chunk, percentiles=False, engine=engine))
+        refreshed += len(chunk)
+
+@instrumented
+@transaction.atomic
+def recompute_vendor_metrics(vendor_ids, now: datetime = None, engine: str = 'sql') -> int:
+    """Recompute and store the metrics of a chunk of vendors.
+
+    The metrics come from compute_metrics_for_vendors; the changed Vendor
+    columns are written with one bulk_update, and the current hour's snapshots and the
+    rankings with one upsert each. Vendors deleted in the meantime are
+    skipped. Returns the number of vendors recomputed.
+    """
+    now = now or timezone.now()
+    vendor_ids = list(Vendor.objects.filter(id__in=list(vendor_ids)).values_list('id', flat=True))
+    if not vendor_ids:
+        return 0
+    metrics_by_vendor = compute_metrics_for_vendors(vendor_ids, now=now, engine=engine)
+    store_vendor_metrics(metrics_by_vendor, now=now)
+    record_performance_snapshots(metrics_by_vendor, now=now)
+    refresh_vendor_rankings(metrics_by_vendor, now=now)
+    return len(vendor_ids)
+
+@instrumented
+def backfill_purchase_order_items(chunk_size: int = 1000, start_id: int = 0) -> int:
+    """Rebuild the line items of every purchase order with an id above `start_id`.
+
+    Walks the table in id order, `chunk_size` purchase orders per transaction,
+    so it can run next to regular traffic and be resumed after an interruption.
+    Returns the number of purchase orders processed.
+    """
+    processed, last_id = 0, start_id
+    while True:
+        with transaction.atomic():
+            chunk = list(PurchaseOrder.objects.filter(id__gt=last_id).order_by('id').only('id', 'items')[:chunk_size])
+            if not chunk:
+                return processed
+            sync_line_items(chunk)
+        processed += len(chunk)
+        last_id = chunk[-1].id
+
+def bucket_start(date: datetime, granularity: str) -> datetime:
+    """Start of the hour / day / week containing `date`, aligned like TruncHour / TruncDay / TruncWeek."""
+    date = timezone.localtime(date).replace(minute=0, second=0, microsecond=0)
+    if granularity == HistoricalPerformance.HOUR:
+        return date
+    date = date.replace(hour=0)
+    if granularity == HistoricalPerformance.WEEK:
+        date -= timedelta(days=date.weekday())
+    return date
+
+def _rollup_start(now: datetime, retention: timedelta, granularity: str) -> datetime:
+    # Start of the day / week containing now - retention.
+    return bucket_start(now - retention, granularity)
+
+@instrumented
+def compact_historical_performance(hour_retention: timedelta = timedelta(days=2), day_retention: timedelta = timedelta(days=90), now: datetime = None, batch_size: int = 1000) -> dict:
+    """Roll hour snapshots older than `hour_retention` into day snapshots, and day
+    snapshots older than `day_retention` into week snapshots.
+
+    Rolled-up metrics are the mean of the snapshots in the bucket. Only whole
+    days / weeks are compacted. Returns the number of snapshots compacted per
+    source granularity.
+    """
+    now = now or timezone.now()
+    rollups = (
+        (HistoricalPerformance.HOUR, HistoricalPerformance.DAY, TruncDay, hour_retention),
+        (HistoricalPerformance.DAY, HistoricalPerformance.WEEK, TruncWeek, day_retention),
+    )
+
+    compacted = {}
+    for source, target, trunc, retention in rollups:
+        with transaction.atomic():
+            snapshots = HistoricalPerformance.objects.filter(granularity=source, date__lt=_rollup_start(now, retention, target))
+            rows = (
+                snapshots.annotate(bucket=trunc('date'))
+                .values('vendor_id', 'bucket')
+                .annotate(**{field: Avg(field) for field in SNAPSHOT_FIELDS})
+                .order_by()
+            )
+
+            vendor_ids, batch = set(), []
+            for row in rows.iterator():
+                vendor_ids.add(row['vendor_id'])
+                batch.append(HistoricalPerformance(
+                    vendor_id=row['vendor_id'], date=row['bucket'], granularity=target,
+                    **{field: row[field] for field in SNAPSHOT_FIELDS}
+                ))
+                if len(batch) >= batch_size:
+                    _upsert_rollups(batch)
+                    batch = []
+            _upsert_rollups(batch)
+
+            compacted[source], _ = snapshots.delete()
+            for vendor_id in vendor_ids:
+                invalidate_vendor(vendor_id)
+    return compacted
+
+def _upsert_rollups(snapshots) -> None:
+    if snapshots:
+        HistoricalPerformance.objects.bulk_create(
+            snapshots, update_conflicts=True, unique_fields=['vendor', 'granularity', 'date'], update_fields=list(SNAPSHOT_FIELDS),
         )
 
+def _purchase_order_changed(old_snapshot, new_snapshot) -> None:
+    # Snapshots come from purchase_order_snapshot(), None for a created or deleted PO.
+    if incremental_metrics_enabled():
+        apply_purchase_order_transition(old_snapshot, new_snapshot)
+
+    # Metrics are recomputed off the request path, see services/metrics_queue.py
+    vendor_ids = {snapshot[0] for snapshot in (old_snapshot, new_snapshot) if snapshot is not None}
+    for vendor_id in vendor_ids:
+        invalidate_vendor(vendor_id)
+        mark_vendor_dirty(vendor_id)
+
+@instrumented
+@transaction.atomic
 def create_purchase_order(po_number:str, vendor:Vendor, order_date:datetime, delivery_date:datetime, items:str, quantity:int, status:str, quality_rating:float, issue_date:datetime, acknowledgment_date:datetime) -> PurchaseOrder:
     purchase_order = PurchaseOrder.objects.create(
         po_number=po_number,
@@ -82,57 +323,115 @@ def create_purchase_order(po_number:str, vendor:Vendor, order_date:datetime, del
         acknowledgment_date=acknowledgment_date,
     )
 
-    update_historical_performance_metrics(vendor)
+    sync_line_items([purchase_order], created=True)
+    record_purchase_order_changes([(PurchaseOrderChange.CREATED, purchase_order)])
+    _purchase_order_changed(None, purchase_order_snapshot(purchase_order))
 
     return purchase_order
-def update_purchase_order(purchase_order: PurchaseOrder, po_number:str, vendor:Vendor, order_date:datetime, delivery_date:datetime, items:str, quantity:int, status:str, quality_rating:float, issue_date:datetime, acknowledgment_date:datetime) -> PurchaseOrder:
-    purchase_order.po_number=po_number
-    purchase_order.vendor=vendor
-    purchase_order.order_date=order_date
-    purchase_order.delivery_date=delivery_date
-    purchase_order.items=items
-    purchase_order.quantity=quantity
-    purchase_order.status=status
-    purchase_order.quality_rating=quality_rating
-    purchase_order.issue_date=issue_date
-    purchase_order.acknowledgment_date=acknowledgment_date
-
-    purchase_order.save()
-
-    update_historical_performance_metrics(vendor)
+
+@instrumented
+@transaction.atomic
+def update_purchase_order(purchase_order: PurchaseOrder, version: int = None, **fields) -> PurchaseOrder:
+    """Update the given fields of a purchase order, only writing those that changed.
+
+    Raises VersionConflict when the purchase order changed since `version` (by
+    default since it was loaded); the counter deltas below rely on it not having.
+    """
+    old_snapshot = purchase_order_snapshot(purchase_order)
+    changed = _conditional_update(purchase_order, version, fields)
+    if not changed:
+        return purchase_order
+
+    if 'items' in changed:
+        sync_line_items([purchase_order])
+    record_purchase_order_changes([(PurchaseOrderChange.UPDATED, purchase_order)])
+    _purchase_order_changed(old_snapshot, purchase_order_snapshot(purchase_order))
     return purchase_order
 
+@instrumented
+@transaction.atomic
 def delete_purchase_order(purchase_order: PurchaseOrder) -> None:
-    vendor = purchase_order.vendor
+    old_snapshot = purchase_order_snapshot(purchase_order)
+    record_purchase_order_changes([(PurchaseOrderChange.DELETED, purchase_order)])
     purchase_order.delete()
 
-    update_historical_performance_metrics(vendor)
+    _purchase_order_changed(old_snapshot, None)
 
     return
 
+@instrumented
+@transaction.atomic
+def acknowledge_purchase_order(purchase_order: PurchaseOrder, version: int = None) -> PurchaseOrder:
+    """Set the acknowledgment date, unless the purchase order is already acknowledged.
+
+    Check and write are one conditional UPDATE (`acknowledgment_date IS NULL`,
+    and `version` when given), so of concurrent acknowledgments exactly one
+    succeeds and the others raise VersionConflict, whatever they read before.
+    """
+    now = timezone.now()
+    conditions = {} if version is None else {'version': version}
+    acknowledged = PurchaseOrder.objects.filter(id=purchase_order.id, acknowledgment_date__isnull=True, **conditions).update(
+        acknowledgment_date=now, version=F('version') + 1,
+    )
+    if not acknowledged:
+        row = PurchaseOrder.objects.filter(id=purchase_order.id).values_list('version', 'acknowledgment_date').first()
+        already = row is not None and row[1] is not None
+        raise VersionConflict("Purchase order already acknowledged." if already else None, row and row[0])
+
+    # The row is locked by the UPDATE: re-read it, the instance may predate other changes, and
+    # derive the counter transition from the row as it was just before the acknowledgment.
+    purchase_order.refresh_from_db()
+    new_snapshot = purchase_order_snapshot(purchase_order, now=now)
+    purchase_order.acknowledgment_date = None
+    old_snapshot = purchase_order_snapshot(purchase_order, now=now)
+    purchase_order.acknowledgment_date = now
+
+    record_purchase_order_changes([(PurchaseOrderChange.UPDATED, purchase_order)])
+    _purchase_order_changed(old_snapshot, new_snapshot)
+    return purchase_order
 
-def create_historical_performance(vendor_id:Vendor, date:datetime, on_time_delivery_rate:float, quality_rating_avg:float, average_response_time:float, fulfillment_rate:float) -> HistoricalPerformance:
+@instrumented
+def create_historical_performance(vendor_id:Vendor, date:datetime, on_time_delivery_rate:float, quality_rating_avg:float, average_response_time:float, fulfillment_rate:float, granularity:str = HistoricalPerformance.HOUR) -> HistoricalPerformance:
     historical_performance = HistoricalPerformance.objects.create(
     vendor=vendor_id,
-    date=date,
+    date=bucket_start(date, granularity),
+    granularity=granularity,
     on_time_delivery_rate=on_time_delivery_rate,
     quality_rating_avg=quality_rating_avg,
     average_response_time=average_response_time,
     fulfillment_rate=fulfillment_rate,
     )
+    invalidate_vendor(historical_performance.vendor_id)
     return historical_performance
 
-def update_historical_performance(historical_performance: HistoricalPerformance, vendor_id:Vendor, date:datetime, on_time_delivery_rate:float, quality_rating_avg:float, average_response_time:float, fulfillment_rate:float) -> HistoricalPerformance:
+@instrumented
+def update_historical_performance(historical_performance: HistoricalPerformance, vendor_id:Vendor, date:datetime, on_time_delivery_rate:float, quality_rating_avg:float, average_response_time:float, fulfillment_rate:float, granularity:str = HistoricalPerformance.HOUR) -> HistoricalPerformance:
 
     historical_performance.vendor=vendor_id
-    historical_performance.date=date
+    historical_performance.date=bucket_start(date, granularity)
+    historical_performance.granularity=granularity
     historical_performance.on_time_delivery_rate=on_time_delivery_rate
     historical_performance.quality_rating_avg=quality_rating_avg
     historical_performance.average_response_time=average_response_time
     historical_performance.fulfillment_rate=fulfillment_rate
 
     historical_performance.save()
+    invalidate_vendor(historical_performance.vendor_id)
     return historical_performance
+@instrumented
 def delete_historical_performance(historical_performance: HistoricalPerformance) -> None:
+    invalidate_vendor(historical_performance.vendor_id)
     historical_performance.delete()
-    return
\ No newline at end of file
+    return
+
+
+# Async counterparts for the async views. Writes rely on transaction.atomic and
+# on_commit, which the async ORM doesn't support, so they run in the sync thread.
+acreate_vendor = sync_to_async(create_vendor)
+aupdate_vendor = sync_to_async(update_vendor)
+adelete_vendor = sync_to_async(delete_vendor)
+acreate_purchase_order = sync_to_async(create_purchase_order)
+aupdate_purchase_order = sync_to_async(update_purchase_order)
+adelete_purchase_order = sync_to_async(delete_purchase_order)
+aacknowledge_purchase_order = sync_to_async(acknowledge_purchase_order)
+aupdate_historical_performance_metrics = sync_to_async(update_historical_performance_metrics)
@@ -0,0 +1,156 @@
+import csv
+import json
+import logging
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+from vendor_management_app.models import Vendor, PurchaseOrder, PurchaseOrderChange
+from vendor_management_app.services.changes import record_purchase_order_changes
+from vendor_management_app.services.items import sync_line_items
+from vendor_management_app.services.metrics import incremental_metrics_enabled, rebuild_vendor_counters
+from vendor_management_app.services.metrics_queue import mark_vendor_dirty
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('jsonl', 'csv')
+NULLABLE_CSV_FIELDS = ('quality_rating', 'acknowledgment_date')
+# Rows per transaction: bounds the memory of a chunk and how long it holds the write lock.
+MAX_CHUNK_SIZE = 5000
+CONFLICT_MESSAGE = "Conflicts with an existing purchase order."
+
+
+class PurchaseOrderRowSerializer(serializers.Serializer):
+    # Uniqueness and vendor checks are done once per chunk, not per row.
+    po_number = serializers.CharField(max_length=50)
+    vendor_code = serializers.CharField(max_length=50)
+    order_date = serializers.DateTimeField()
+    delivery_date = serializers.DateTimeField()
+    items = serializers.JSONField()
+    quantity = serializers.IntegerField()
+    status = serializers.CharField(max_length=20, required=False, default='pending')
+    quality_rating = serializers.FloatField(required=False, allow_null=True, default=None)
+    issue_date = serializers.DateTimeField()
+    acknowledgment_date = serializers.DateTimeField(required=False, allow_null=True, default=None)
+
+
+def _decode(lines):
+    for line in lines:
+        yield line.decode('utf-8') if isinstance(line, bytes) else line
+
+
+def parse_jsonl(lines):
+    """Yield (row number, data, error) for each non-blank line of a JSON Lines stream."""
+    row_number = 0
+    for line in _decode(lines):
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            data = json.loads(line)
+        except ValueError as exc:
+            yield row_number, None, {'non_field_errors': [f"Invalid JSON: {exc}"]}
+            continue
+        if not isinstance(data, dict):
+            yield row_number, None, {'non_field_errors': ["Expected a JSON object."]}
+            continue
+        yield row_number, data, None
+
+
+def parse_csv(lines):
+    """Yield (row number, data, error) for each row of a CSV stream with a header line.
+
+    `items` holds JSON and empty optional columns are read as null.
+    """
+    for row_number, data in enumerate(csv.DictReader(_decode(lines)), start=1):
+        for field in NULLABLE_CSV_FIELDS:
+            if data.get(field) == '':
+                data[field] = None
+        if data.get('items'):
+            try:
+                data['items'] = json.loads(data['items'])
+            except ValueError:
+                yield row_number, None, {'items': ["Value must be valid JSON."]}
+                continue
+        yield row_number, data, None
+
+
+PARSERS = {
+    'jsonl': parse_jsonl,
+    'csv': parse_csv,
+}
+
+
+def parse_purchase_order_stream(lines, fmt: str):
+    return PARSERS[fmt](lines)
+
+
+def _import_chunk(chunk, seen_po_numbers: set, report: dict, affected_vendor_ids: set) -> None:
+    valid = []
+    for row_number, data, error in chunk:
+        if error is None:
+            serializer = PurchaseOrderRowSerializer(data=data)
+            if serializer.is_valid():
+                valid.append((row_number, serializer.validated_data))
+                continue
+            error = serializer.errors
+        report['errors'].append({'row': row_number, 'errors': error})
+
+    vendor_ids = dict(Vendor.objects.filter(vendor_code__in={row['vendor_code'] for _, row in valid}).values_list('vendor_code', 'id'))
+    existing = set(PurchaseOrder.objects.filter(po_number__in=[row['po_number'] for _, row in valid]).values_list('po_number', flat=True))
+
+    purchase_orders, row_numbers = [], []
+    for row_number, row in valid:
+        vendor_code = row.pop('vendor_code')
+        if vendor_code not in vendor_ids:
+            report['errors'].append({'row': row_number, 'errors': {'vendor_code': [f"Unknown vendor code '{vendor_code}'."]}})
+            continue
+        if row['po_number'] in existing or row['po_number'] in seen_po_numbers:
+            report['errors'].append({'row': row_number, 'errors': {'po_number': ["Purchase order with this po number already exists."]}})
+            continue
+        seen_po_numbers.add(row['po_number'])
+        purchase_orders.append(PurchaseOrder(vendor_id=vendor_ids[vendor_code], **row))
+        row_numbers.append(row_number)
+
+    try:
+        with transaction.atomic():
+            # bulk_create sets the primary keys (INSERT ... RETURNING) the line items point at.
+            PurchaseOrder.objects.bulk_create(purchase_orders)
+            sync_line_items(purchase_orders, created=True)
+            record_purchase_order_changes((PurchaseOrderChange.CREATED, purchase_order) for purchase_order in purchase_orders)
+    except IntegrityError:
+        # Lost a race with a concurrent writer, the whole chunk was rolled back. The database's
+        # message names tables and constraints: it is logged, not returned.
+        logger.warning("Purchase order import chunk rolled back", exc_info=True)
+        report['errors'].extend({'row': row_number, 'errors': {'non_field_errors': [CONFLICT_MESSAGE]}} for row_number in row_numbers)
+        return
+
+    report['created'] += len(purchase_orders)
+    affected_vendor_ids.update(purchase_order.vendor_id for purchase_order in purchase_orders)
+
+
+def import_purchase_orders(rows, chunk_size: int = 500) -> dict:
+    """Validate and insert purchase orders from (row number, data, error) tuples.
+
+    Rows are processed in chunks, each inserted with one bulk_create in its own
+    transaction, so an invalid row only rejects itself. Vendor metrics are
+    recomputed once per affected vendor after the whole stream was imported.
+    """
+    report = {'created': 0, 'errors': []}
+    seen_po_numbers, affected_vendor_ids = set(), set()
+
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            _import_chunk(chunk, seen_po_numbers, report, affected_vendor_ids)
+            chunk = []
+    if chunk:
+        _import_chunk(chunk, seen_po_numbers, report, affected_vendor_ids)
+
+    if incremental_metrics_enabled() and affected_vendor_ids:
+        rebuild_vendor_counters(sorted(affected_vendor_ids))
+    for vendor_id in affected_vendor_ids:
+        mark_vendor_dirty(vendor_id)
+
+    report['errors'].sort(key=lambda error: error['row'])
+    report['failed'] = len(report['errors'])
+    return report
@@ -0,0 +1,37 @@
+from vendor_management_app.models import PurchaseOrderItem
+
+
+def line_items(items) -> list:
+    """(sku, quantity) of each line of a purchase order's `items` JSON.
+
+    Lines are objects with a 'sku' and an optional integer 'quantity'; anything
+    else in the JSON is not indexed.
+    """
+    if not isinstance(items, list):
+        return []
+    lines = []
+    for line in items:
+        if not isinstance(line, dict) or not isinstance(line.get('sku'), str) or not line['sku']:
+            continue
+        quantity = line.get('quantity')
+        if isinstance(quantity, float) and quantity.is_integer():
+            quantity = int(quantity)
+        if not isinstance(quantity, int) or isinstance(quantity, bool):
+            quantity = None
+        lines.append((line['sku'][:100], quantity))
+    return lines
+
+
+def sync_line_items(purchase_orders, created: bool = False) -> None:
+    """Replace the PurchaseOrderItem rows of `purchase_orders` with their current items.
+
+    Two queries for any number of purchase orders, one when they were just created.
+    """
+    purchase_orders = list(purchase_orders)
+    if not created:
+        PurchaseOrderItem.objects.filter(purchase_order__in=[purchase_order.pk for purchase_order in purchase_orders]).delete()
+    PurchaseOrderItem.objects.bulk_create([
+        PurchaseOrderItem(purchase_order_id=purchase_order.pk, sku=sku, quantity=quantity)
+        for purchase_order in purchase_orders
+        for sku, quantity in line_items(purchase_order.items)
+    ])
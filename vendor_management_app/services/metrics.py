@@ -0,0 +1,359 @@
+import math
+from collections import defaultdict
+from datetime import datetime
+from django.conf import settings
+from django.db.models import Avg, BooleanField, Count, DurationField, ExpressionWrapper, F, Q, Sum, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from vendor_management_app.models import Vendor, PurchaseOrder, VendorMetricCounters
+
+
+METRIC_FIELDS = ('on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate')
+# Response time percentiles, in hours. Recorded in the performance snapshots but not ranked.
+PERCENTILES = {'response_time_p50': 50, 'response_time_p90': 90}
+SNAPSHOT_FIELDS = METRIC_FIELDS + tuple(PERCENTILES)
+
+# Response time is the latency between issuing a PO and the vendor acknowledging it.
+RESPONSE_TIME = ExpressionWrapper(F('acknowledgment_date') - F('issue_date'), output_field=DurationField())
+
+
+def _metric_aggregates(now: datetime) -> dict:
+    # Every metric is expressed as a conditional aggregate so that all of them
+    # are computed in a single scan over the vendor's purchase orders.
+    completed = Q(status='completed')
+    return {
+        'total_count': Count('id'),
+        'completed_count': Count('id', filter=completed),
+        'on_time_count': Count('id', filter=completed & Q(delivery_date__lte=now)),
+        'quality_rating_avg': Avg('quality_rating', filter=completed),
+        'average_response_time': Avg(RESPONSE_TIME, filter=Q(acknowledgment_date__isnull=False)),
+    }
+
+
+def metrics_from_counts(total_count: int, completed_count: int, on_time_count: int, quality_rating_avg, average_response_time) -> dict:
+    """Turn the raw aggregate values into the four vendor metrics.
+
+    `average_response_time` is accepted either as a timedelta or as a number of
+    hours and is always returned in hours.
+    """
+    if hasattr(average_response_time, 'total_seconds'):
+        average_response_time = average_response_time.total_seconds() / 3600
+    return {
+        'on_time_delivery_rate': on_time_count / completed_count * 100 if completed_count else 0,
+        'quality_rating_avg': quality_rating_avg or 0,
+        'average_response_time': average_response_time or 0,
+        'fulfillment_rate': completed_count / total_count * 100 if total_count else 0,
+    }
+
+
+def _percentile_rows(vendor_ids):
+    # Nearest-rank percentiles: the value at position ceil(p * n) of each vendor's sorted
+    # response times. Window functions number the rows per vendor, so one query returns
+    # just the rows at those positions, for any number of vendors.
+    acknowledged = Window(Count('id'), partition_by=F('vendor_id'))
+    positions = Q()
+    for percentile in PERCENTILES.values():
+        positions |= Q(position=(F('acknowledged') * percentile + 99) / 100)
+    return (
+        PurchaseOrder.objects.filter(vendor_id__in=vendor_ids, acknowledgment_date__isnull=False)
+        .annotate(
+            response_time=RESPONSE_TIME,
+            position=Window(RowNumber(), partition_by=F('vendor_id'), order_by=[RESPONSE_TIME.asc(), F('id').asc()]),
+            acknowledged=acknowledged,
+        )
+        .filter(positions)
+        .values_list('vendor_id', 'position', 'acknowledged', 'response_time')
+    )
+
+
+def _percentiles_from_rows(rows, vendor_ids) -> dict:
+    percentiles = {vendor_id: dict.fromkeys(PERCENTILES) for vendor_id in vendor_ids}
+    for vendor_id, position, acknowledged, response_time in rows:
+        for field, percentile in PERCENTILES.items():
+            if position == (acknowledged * percentile + 99) // 100:
+                percentiles[vendor_id][field] = response_time.total_seconds() / 3600
+    return percentiles
+
+
+def response_time_percentiles(vendor_ids) -> dict:
+    """p50 / p90 response time in hours of each vendor, None without acknowledged POs. One query."""
+    vendor_ids = list(vendor_ids)
+    return _percentiles_from_rows(_percentile_rows(vendor_ids), vendor_ids)
+
+
+async def aresponse_time_percentiles(vendor_ids) -> dict:
+    vendor_ids = list(vendor_ids)
+    return _percentiles_from_rows([row async for row in _percentile_rows(vendor_ids)], vendor_ids)
+
+
+def compute_vendor_metrics(vendor, now: datetime = None, percentiles: bool = False) -> dict:
+    """Compute the performance metrics of one vendor with a single query.
+
+    With `percentiles`, the response time percentiles are included, at the
+    cost of a second query.
+    """
+    vendor_id = getattr(vendor, 'pk', vendor)
+    counts = PurchaseOrder.objects.filter(vendor=vendor_id).aggregate(**_metric_aggregates(now or timezone.now()))
+    metrics = metrics_from_counts(**counts)
+    if percentiles:
+        metrics.update(response_time_percentiles([vendor_id])[vendor_id])
+    return metrics
+
+
+async def acompute_vendor_metrics(vendor, now: datetime = None, percentiles: bool = False) -> dict:
+    vendor_id = getattr(vendor, 'pk', vendor)
+    counts = await PurchaseOrder.objects.filter(vendor=vendor_id).aaggregate(**_metric_aggregates(now or timezone.now()))
+    metrics = metrics_from_counts(**counts)
+    if percentiles:
+        metrics.update((await aresponse_time_percentiles([vendor_id]))[vendor_id])
+    return metrics
+
+
+def compute_metrics_for_vendors(vendor_ids, now: datetime = None, percentiles: bool = True, engine: str = 'sql') -> dict:
+    """Compute the performance metrics of many vendors at once.
+
+    With the 'sql' engine that is one grouped query, plus one for the response
+    time percentiles. The 'numpy' engine reads the vendors' purchase orders in
+    one query and aggregates them in NumPy, which is faster for large batches
+    on databases without percentile functions such as SQLite.
+
+    Returns a mapping of vendor id to metrics. Vendors without purchase orders
+    are included with all metrics set to 0 and percentiles set to None.
+    """
+    vendor_ids = list(vendor_ids)
+    now = now or timezone.now()
+    if engine == 'numpy':
+        return _numpy_metrics_for_vendors(vendor_ids, now, percentiles)
+
+    rows = (
+        PurchaseOrder.objects.filter(vendor_id__in=vendor_ids)
+        .values('vendor_id')
+        .annotate(**_metric_aggregates(now))
+        .order_by()
+    )
+    metrics = {vendor_id: metrics_from_counts(0, 0, 0, None, None) for vendor_id in vendor_ids}
+    for row in rows:
+        vendor_id = row.pop('vendor_id')
+        metrics[vendor_id] = metrics_from_counts(**row)
+    if percentiles:
+        for vendor_id, vendor_percentiles in response_time_percentiles(vendor_ids).items():
+            metrics[vendor_id].update(vendor_percentiles)
+    return metrics
+
+
+def _numpy_metrics_for_vendors(vendor_ids, now: datetime, percentiles: bool) -> dict:
+    # Imported here, not at module level: NumPy is optional and slow to import for every process.
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError("The 'numpy' metrics engine requires NumPy: pip install numpy") from None
+
+    # Conditions and durations are evaluated by the database, which is cheaper than
+    # converting three datetimes per row to Python objects.
+    completed = Q(status='completed')
+    rows = list(
+        PurchaseOrder.objects.filter(vendor_id__in=vendor_ids)
+        .annotate(
+            completed=ExpressionWrapper(completed, output_field=BooleanField()),
+            on_time=ExpressionWrapper(completed & Q(delivery_date__lte=now), output_field=BooleanField()),
+            response_time=RESPONSE_TIME,
+        )
+        .values_list('vendor_id', 'completed', 'on_time', 'quality_rating', 'response_time')
+    )
+    size = len(vendor_ids)
+    # Position of each PO's vendor in `vendor_ids`, the group it is aggregated into.
+    positions = {vendor_id: index for index, vendor_id in enumerate(vendor_ids)}
+    group = np.fromiter((positions[row[0]] for row in rows), dtype=np.int64, count=len(rows))
+    completed = np.fromiter((row[1] for row in rows), dtype=bool, count=len(rows))
+    on_time = np.fromiter((row[2] for row in rows), dtype=bool, count=len(rows))
+    rating = np.fromiter((np.nan if row[3] is None else row[3] for row in rows), dtype=float, count=len(rows))
+    response_time = np.fromiter(
+        (np.nan if row[4] is None else row[4].total_seconds() / 3600 for row in rows), dtype=float, count=len(rows)
+    )
+    rated = completed & ~np.isnan(rating)
+    acknowledged = ~np.isnan(response_time)
+
+    total_count = np.bincount(group, minlength=size)
+    completed_count = np.bincount(group[completed], minlength=size)
+    on_time_count = np.bincount(group[on_time], minlength=size)
+    rating_count = np.bincount(group[rated], minlength=size)
+    rating_sum = np.bincount(group[rated], weights=rating[rated], minlength=size)
+    response_count = np.bincount(group[acknowledged], minlength=size)
+    response_sum = np.bincount(group[acknowledged], weights=response_time[acknowledged], minlength=size)
+
+    metrics = {
+        vendor_id: metrics_from_counts(
+            total_count=int(total_count[index]),
+            completed_count=int(completed_count[index]),
+            on_time_count=int(on_time_count[index]),
+            quality_rating_avg=float(rating_sum[index] / rating_count[index]) if rating_count[index] else None,
+            average_response_time=float(response_sum[index] / response_count[index]) if response_count[index] else None,
+        )
+        for index, vendor_id in enumerate(vendor_ids)
+    }
+    if not percentiles:
+        return metrics
+
+    # Sorted by vendor, then response time, each vendor's times are a contiguous run
+    # starting at `starts`; the nearest rank ceil(p * n) is an offset into that run.
+    sorted_times = response_time[acknowledged][np.lexsort((response_time[acknowledged], group[acknowledged]))]
+    starts = np.cumsum(response_count) - response_count
+    has_responses = response_count > 0
+    for field, percentile in PERCENTILES.items():
+        ranks = (response_count * percentile + 99) // 100
+        values = sorted_times[(starts + ranks - 1)[has_responses]]
+        for index, value in zip(np.flatnonzero(has_responses), values):
+            metrics[vendor_ids[index]][field] = float(value)
+        for index in np.flatnonzero(~has_responses):
+            metrics[vendor_ids[index]][field] = None
+    return metrics
+
+
+# Incremental mode
+#
+# Instead of rescanning a vendor's purchase orders, every PO write applies the
+# difference between the PO's contribution to the counters before and after the
+# write. A PO counts as on time when it is completed and its delivery date has
+# passed at the time of the write, so counters can drift from a full recompute
+# as time passes; `rebuild_vendor_counters` brings them back in line.
+
+COUNTER_FIELDS = ('total_count', 'completed_count', 'on_time_count', 'rating_sum', 'rating_count', 'response_time_sum', 'response_time_count')
+
+
+def incremental_metrics_enabled() -> bool:
+    return getattr(settings, 'VENDOR_METRICS_MODE', 'full') == 'incremental'
+
+
+def purchase_order_snapshot(purchase_order: PurchaseOrder, now: datetime = None) -> tuple:
+    """Capture a PO's vendor and its contribution to the vendor counters."""
+    now = now or timezone.now()
+    completed = purchase_order.status == 'completed'
+    rated = completed and purchase_order.quality_rating is not None
+    acknowledged = purchase_order.acknowledgment_date is not None
+    response_time = (purchase_order.acknowledgment_date - purchase_order.issue_date).total_seconds() / 3600 if acknowledged else 0
+    return purchase_order.vendor_id, {
+        'total_count': 1,
+        'completed_count': int(completed),
+        'on_time_count': int(completed and purchase_order.delivery_date <= now),
+        'rating_sum': purchase_order.quality_rating if rated else 0,
+        'rating_count': int(rated),
+        'response_time_sum': response_time,
+        'response_time_count': int(acknowledged),
+    }
+
+
+def apply_purchase_order_transition(old_snapshot: tuple = None, new_snapshot: tuple = None) -> None:
+    """Update the vendor counters for a PO going from `old_snapshot` to `new_snapshot`.
+
+    Either snapshot may be None for a created or deleted PO. Costs one UPDATE
+    per affected vendor, independent of how many POs the vendor has.
+    """
+    deltas = defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0))
+    for sign, snapshot in ((-1, old_snapshot), (1, new_snapshot)):
+        if snapshot is None:
+            continue
+        vendor_id, contribution = snapshot
+        for field in COUNTER_FIELDS:
+            deltas[vendor_id][field] += sign * contribution[field]
+
+    for vendor_id, delta in deltas.items():
+        changes = {field: F(field) + value for field, value in delta.items() if value}
+        if not changes:
+            continue
+        if not VendorMetricCounters.objects.filter(vendor_id=vendor_id).update(**changes):
+            # No counters yet for this vendor, seed them from its purchase orders.
+            rebuild_vendor_counters([vendor_id])
+
+
+def incremental_vendor_metrics(vendor, percentiles: bool = False) -> dict:
+    """Read a vendor's metrics from its running counters with a single query.
+
+    Percentiles can't be kept as running totals: with `percentiles` they are
+    read from the purchase orders with a second query.
+    """
+    vendor_id = getattr(vendor, 'pk', vendor)
+    counters = VendorMetricCounters.objects.filter(vendor=vendor_id).first()
+    if counters is None:
+        metrics = metrics_from_counts(0, 0, 0, None, None)
+    else:
+        metrics = metrics_from_counts(
+            total_count=counters.total_count,
+            completed_count=counters.completed_count,
+            on_time_count=counters.on_time_count,
+            quality_rating_avg=counters.rating_sum / counters.rating_count if counters.rating_count else None,
+            average_response_time=counters.response_time_sum / counters.response_time_count if counters.response_time_count else None,
+        )
+    if percentiles:
+        metrics.update(response_time_percentiles([vendor_id])[vendor_id])
+    return metrics
+
+
+def _counter_aggregates(now: datetime) -> dict:
+    completed = Q(status='completed')
+    acknowledged = Q(acknowledgment_date__isnull=False)
+    return {
+        'total_count': Count('id'),
+        'completed_count': Count('id', filter=completed),
+        'on_time_count': Count('id', filter=completed & Q(delivery_date__lte=now)),
+        'rating_sum': Sum('quality_rating', filter=completed),
+        'rating_count': Count('quality_rating', filter=completed),
+        'response_time_sum': Sum(RESPONSE_TIME, filter=acknowledged),
+        'response_time_count': Count('id', filter=acknowledged),
+    }
+
+
+def _counters_differ(stored: VendorMetricCounters, actual: dict) -> dict:
+    drift = {}
+    for field in COUNTER_FIELDS:
+        stored_value = getattr(stored, field)
+        if not math.isclose(stored_value, actual[field], rel_tol=1e-9, abs_tol=1e-6):
+            drift[field] = (stored_value, actual[field])
+    return drift
+
+
+def rebuild_vendor_counters(vendor_ids=None, chunk_size: int = 1000, dry_run: bool = False, now: datetime = None) -> dict:
+    """Recompute the counters of the given vendors (all vendors by default) from their purchase orders.
+
+    Returns the drift found, as a mapping of vendor id to
+    {field: (stored value, recomputed value)}. Vendors that had no counters yet
+    but do have purchase orders are reported with a stored value of None.
+    """
+    now = now or timezone.now()
+    if vendor_ids is None:
+        vendor_ids = Vendor.objects.order_by('id').values_list('id', flat=True).iterator(chunk_size=chunk_size)
+    vendor_ids = iter(vendor_ids)
+
+    drift = {}
+    while True:
+        chunk = [vendor_id for _, vendor_id in zip(range(chunk_size), vendor_ids)]
+        if not chunk:
+            return drift
+
+        actual = {vendor_id: dict.fromkeys(COUNTER_FIELDS, 0) for vendor_id in chunk}
+        rows = PurchaseOrder.objects.filter(vendor_id__in=chunk).values('vendor_id').annotate(**_counter_aggregates(now)).order_by()
+        for row in rows:
+            vendor_id = row.pop('vendor_id')
+            row['rating_sum'] = row['rating_sum'] or 0
+            response_time_sum = row['response_time_sum']
+            row['response_time_sum'] = response_time_sum.total_seconds() / 3600 if response_time_sum else 0
+            actual[vendor_id] = row
+
+        stored = VendorMetricCounters.objects.in_bulk(chunk)
+        to_create, to_update = [], []
+        for vendor_id, values in actual.items():
+            counters = stored.get(vendor_id)
+            if counters is None:
+                if any(values.values()):
+                    drift[vendor_id] = {field: (None, value) for field, value in values.items()}
+                to_create.append(VendorMetricCounters(vendor_id=vendor_id, **values))
+                continue
+            vendor_drift = _counters_differ(counters, values)
+            if vendor_drift:
+                drift[vendor_id] = vendor_drift
+                for field, value in values.items():
+                    setattr(counters, field, value)
+                to_update.append(counters)
+
+        if not dry_run:
+            VendorMetricCounters.objects.bulk_create(to_create, ignore_conflicts=True)
+            VendorMetricCounters.objects.bulk_update(to_update, COUNTER_FIELDS)
@@ -0,0 +1,226 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import partial
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from vendor_management_app.models import MetricsRecomputeRequest, Vendor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SETTINGS = {
+    'BACKEND': 'sync',
+    'WORKERS': 2,
+    'COALESCE_WINDOW': 0.5,
+    'MAX_ATTEMPTS': 5,
+}
+
+
+def _recompute(vendor_id) -> None:
+    from vendor_management_app.services.commands import update_historical_performance_metrics
+    update_historical_performance_metrics(vendor_id)
+
+
+class SyncMetricsQueue:
+    """Recompute right away, in the caller's thread, once the write has been committed."""
+    transactional = False
+
+    def __init__(self, **kwargs):
+        pass
+
+    def mark_dirty(self, vendor_id) -> None:
+        _recompute(vendor_id)
+
+    def flush(self, timeout: float = None) -> bool:
+        return True
+
+
+class ThreadMetricsQueue:
+    """Recompute on an in-process thread pool.
+
+    A vendor marked dirty is recomputed `coalesce_window` seconds later, and any
+    further marks for it in the meantime are folded into that one recompute. A
+    vendor is never recomputed by two workers at the same time.
+    """
+    transactional = False
+
+    def __init__(self, workers: int = 2, coalesce_window: float = 0.5, **kwargs):
+        self.coalesce_window = coalesce_window
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='vendor-metrics')
+        self._condition = threading.Condition()
+        self._due = {}
+        self._running = set()
+        self._flushing = 0
+        self._dispatcher = None
+
+    def mark_dirty(self, vendor_id) -> None:
+        with self._condition:
+            if vendor_id not in self._due:
+                self._due[vendor_id] = time.monotonic() + self.coalesce_window
+                self._condition.notify_all()
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch, name='vendor-metrics-dispatcher', daemon=True)
+                self._dispatcher.start()
+
+    def flush(self, timeout: float = None) -> bool:
+        """Recompute everything that is pending without waiting for the window, and wait for it to finish."""
+        with self._condition:
+            self._flushing += 1
+            self._condition.notify_all()
+            try:
+                return self._condition.wait_for(lambda: not self._due and not self._running, timeout)
+            finally:
+                self._flushing -= 1
+
+    def _dispatch(self) -> None:
+        while True:
+            with self._condition:
+                now = time.monotonic()
+                ready = [
+                    vendor_id for vendor_id, due in self._due.items()
+                    if vendor_id not in self._running and (due <= now or self._flushing)
+                ]
+                if not ready:
+                    waiting = [due for vendor_id, due in self._due.items() if vendor_id not in self._running]
+                    self._condition.wait(max(min(waiting) - now, 0) if waiting else None)
+                    continue
+                for vendor_id in ready:
+                    del self._due[vendor_id]
+                    self._running.add(vendor_id)
+
+            for vendor_id in ready:
+                self._executor.submit(self._run, vendor_id)
+
+    def _run(self, vendor_id) -> None:
+        close_old_connections()
+        try:
+            _recompute(vendor_id)
+        except Exception:
+            logger.exception("Recomputing metrics for vendor %s failed", vendor_id)
+        finally:
+            close_old_connections()
+            with self._condition:
+                self._running.discard(vendor_id)
+                self._condition.notify_all()
+
+
+class DatabaseMetricsQueue:
+    """Keep dirty vendors in the MetricsRecomputeRequest table.
+
+    Marks are written in the same transaction as the PO change and coalesce on
+    the vendor primary key. Requests are picked up by
+    `python manage.py process_metrics_queue` once they are `coalesce_window`
+    seconds old, which works with any database including SQLite.
+
+    A failed recompute is requeued for another window; after `max_attempts`
+    failures the request is kept as a dead letter and no longer picked up,
+    until the vendor is marked again or `process_metrics_queue --requeue-failed`
+    retries it.
+    """
+    transactional = True
+
+    def __init__(self, coalesce_window: float = 0.5, max_attempts: int = 5, **kwargs):
+        # Workers are separate `process_metrics_queue` processes, so no pool size here.
+        self.coalesce_window = coalesce_window
+        self.max_attempts = max_attempts
+
+    def mark_dirty(self, vendor_id) -> None:
+        # A pending request keeps its requested_at, so marks coalesce; any request, a dead letter included,
+        # starts over with a fresh attempts count since the vendor changed.
+        MetricsRecomputeRequest.objects.bulk_create(
+            [MetricsRecomputeRequest(vendor_id=vendor_id, requested_at=timezone.now())],
+            update_conflicts=True, unique_fields=['vendor'], update_fields=['attempts'],
+        )
+
+    def process(self, limit: int = 100, include_recent: bool = False) -> int:
+        """Recompute up to `limit` pending vendors and return how many were processed."""
+        requests = self.pending().order_by('requested_at')
+        if not include_recent:
+            requests = requests.filter(requested_at__lte=timezone.now() - timedelta(seconds=self.coalesce_window))
+
+        processed = 0
+        for vendor_id, attempts in list(requests.values_list('vendor_id', 'attempts')[:limit]):
+            # Deleting the request claims it, so concurrent workers never recompute the same vendor twice.
+            deleted, _ = MetricsRecomputeRequest.objects.filter(vendor_id=vendor_id, attempts=attempts).delete()
+            if not deleted:
+                continue
+            try:
+                _recompute(vendor_id)
+            except Exception:
+                if not Vendor.objects.filter(id=vendor_id).exists():
+                    # Deleted while the request was waiting or running, there is nothing left to recompute.
+                    continue
+                logger.exception("Recomputing metrics for vendor %s failed (attempt %s of %s)", vendor_id, attempts + 1, self.max_attempts)
+                # A mark made since the claim already requeued the vendor, with a fresh count.
+                MetricsRecomputeRequest.objects.bulk_create(
+                    [MetricsRecomputeRequest(vendor_id=vendor_id, requested_at=timezone.now(), attempts=attempts + 1)], ignore_conflicts=True
+                )
+                continue
+            processed += 1
+        return processed
+
+    def pending(self):
+        """The requests still to be processed, i.e. without the dead letters."""
+        return MetricsRecomputeRequest.objects.filter(attempts__lt=self.max_attempts)
+
+    def requeue_failed(self) -> int:
+        """Give the dead letters another `max_attempts` tries. Returns how many were requeued."""
+        return MetricsRecomputeRequest.objects.filter(attempts__gte=self.max_attempts).update(attempts=0, requested_at=timezone.now())
+
+    def flush(self, timeout: float = None) -> bool:
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            self.process(include_recent=True)
+            if not self.pending().exists():
+                # Dead letters count as not flushed.
+                return not MetricsRecomputeRequest.objects.exists()
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+
+BACKENDS = {
+    'sync': SyncMetricsQueue,
+    'thread': ThreadMetricsQueue,
+    'database': DatabaseMetricsQueue,
+}
+
+_queue = None
+
+
+def get_metrics_queue():
+    global _queue
+    if _queue is None:
+        options = {**DEFAULT_QUEUE_SETTINGS, **getattr(settings, 'VENDOR_METRICS_QUEUE', {})}
+        _queue = BACKENDS[options['BACKEND']](
+            workers=options['WORKERS'], coalesce_window=options['COALESCE_WINDOW'], max_attempts=options['MAX_ATTEMPTS'],
+        )
+    return _queue
+
+
+@receiver(setting_changed)
+def _reset_metrics_queue(setting, **kwargs):
+    global _queue
+    if setting == 'VENDOR_METRICS_QUEUE':
+        _queue = None
+
+
+def mark_vendor_dirty(vendor_id) -> None:
+    """Schedule a metrics recompute for the vendor once the current transaction commits."""
+    queue = get_metrics_queue()
+    if queue.transactional:
+        queue.mark_dirty(vendor_id)
+    else:
+        transaction.on_commit(partial(queue.mark_dirty, vendor_id))
+
+
+def flush_metrics_queue(timeout: float = None) -> bool:
+    """Run every pending recompute and wait for it.
+
+    Returns False if `timeout` expired first, or if the database queue is left with dead letters.
+    """
+    return get_metrics_queue().flush(timeout)
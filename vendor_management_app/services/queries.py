@@ -1,13 +1,207 @@
-from vendor_management_app.models import Vendor, PurchaseOrder, HistoricalPerformance
+from datetime import datetime
+from functools import cache
+from django.utils import timezone
+from django.db.models import Avg, Count, F, Func, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import TruncHour, TruncDay, TruncWeek
+from vendor_management_app.instrumentation import instrumented
+from vendor_management_app.models import Vendor, PurchaseOrder, PurchaseOrderChange, PurchaseOrderItem, HistoricalPerformance, VendorRanking
+from vendor_management_app.row_serializers import vendor_rows, VENDOR_SUMMARY_FIELDS
+from vendor_management_app.services.cache import get_or_set_vendor_entry, aget_or_set_vendor_entry
+from vendor_management_app.services.metrics import METRIC_FIELDS, SNAPSHOT_FIELDS
 
+# A series of a granularity is built from snapshots of that granularity and every finer one.
+SERIES_GRANULARITIES = {
+    HistoricalPerformance.HOUR: (TruncHour, [HistoricalPerformance.HOUR]),
+    HistoricalPerformance.DAY: (TruncDay, [HistoricalPerformance.HOUR, HistoricalPerformance.DAY]),
+    HistoricalPerformance.WEEK: (TruncWeek, [HistoricalPerformance.HOUR, HistoricalPerformance.DAY, HistoricalPerformance.WEEK]),
+}
+
+@instrumented
 def get_vendors() -> Vendor:
     return Vendor.objects.all()
 
-def get_purchase_orders() -> PurchaseOrder:
-    return PurchaseOrder.objects.all()
+@instrumented
+def get_vendor_detail(vendor_id) -> tuple:
+    """(data, etag) of the vendor's API representation, read through the vendor cache. None if it does not exist."""
+    def load():
+        row = vendor_rows.values_list(Vendor.objects.filter(id=vendor_id)).first()
+        return vendor_rows.to_dict(row) if row else None
+    return get_or_set_vendor_entry(vendor_id, 'detail', load)
+
+@instrumented
+async def aget_vendor_detail(vendor_id) -> tuple:
+    async def load():
+        row = await vendor_rows.values_list(Vendor.objects.filter(id=vendor_id)).afirst()
+        return vendor_rows.to_dict(row) if row else None
+    return await aget_or_set_vendor_entry(vendor_id, 'detail', load)
+
+# Relations that listings can embed with `?expand=`.
+EXPANSIONS = ('vendor',)
+
+def with_vendor(queryset):
+    """Join the vendor into `queryset`, loading only its summary columns.
+
+    Touching `obj.vendor` (e.g. in `__str__`) then costs no query per row.
+    """
+    own_fields = [field.name for field in queryset.model._meta.concrete_fields]
+    vendor_fields = [f'vendor__{field}' for field in VENDOR_SUMMARY_FIELDS.values()]
+    return queryset.select_related('vendor').only(*own_fields, *vendor_fields)
+
+def _expand(queryset, expand):
+    return with_vendor(queryset) if 'vendor' in expand else queryset
+
+# Purchase order list filters and the lookups they apply.
+PURCHASE_ORDER_FILTERS = {
+    'vendor': 'vendor_id',
+    'status': 'status__in',
+    'min_quality_rating': 'quality_rating__gte',
+    'max_quality_rating': 'quality_rating__lte',
+    **{f'{field}_after': f'{field}__gte' for field in ('order_date', 'delivery_date', 'issue_date')},
+    **{f'{field}_before': f'{field}__lt' for field in ('order_date', 'delivery_date', 'issue_date')},
+}
+
+@instrumented
+def get_purchase_orders(expand=(), filters: dict = None) -> PurchaseOrder:
+    """Purchase orders narrowed by `filters`.
+
+    `filters` maps the names in PURCHASE_ORDER_FILTERS to values, plus
+    'acknowledged' and 'overdue' (past delivery date and not completed) to
+    booleans, and 'sku' to a SKU the purchase order must have a line of.
+    """
+    purchase_orders = PurchaseOrder.objects.all()
+    filters = dict(filters or {})
+    acknowledged = filters.pop('acknowledged', None)
+    overdue = filters.pop('overdue', None)
+    sku = filters.pop('sku', None)
+
+    for name, value in filters.items():
+        purchase_orders = purchase_orders.filter(**{PURCHASE_ORDER_FILTERS[name]: value})
+    if acknowledged is not None:
+        purchase_orders = purchase_orders.filter(acknowledgment_date__isnull=not acknowledged)
+    if overdue is not None:
+        late = Q(delivery_date__lt=timezone.now()) & ~Q(status='completed')
+        purchase_orders = purchase_orders.filter(late if overdue else ~late)
+    if sku is not None:
+        # A subquery rather than a join: a purchase order can have several lines of one SKU.
+        purchase_orders = purchase_orders.filter(id__in=PurchaseOrderItem.objects.filter(sku=sku).values('purchase_order_id'))
+    return _expand(purchase_orders, expand)
+
+SKU_TOTALS = {'purchase_orders': Count('purchase_order_id', distinct=True), 'quantity': Sum('quantity')}
+
+@instrumented
+def get_sku_totals(prefix: str = None, vendor_id=None):
+    """Per-SKU rows of {sku, purchase_orders, quantity}, for SKUs starting with `prefix` (case-sensitive).
+
+    `quantity` is the total ordered over every line of the SKU.
+    """
+    line_items = PurchaseOrderItem.objects.all()
+    if prefix:
+        # A range rather than startswith: SQLite's LIKE can't use the SKU index.
+        line_items = line_items.filter(sku__gte=prefix, sku__lt=prefix + '\U0010ffff')
+    if vendor_id is not None:
+        line_items = line_items.filter(purchase_order__vendor_id=vendor_id)
+    return line_items.values('sku').annotate(**SKU_TOTALS)
+
+@instrumented
+def get_sku_detail(sku: str) -> dict:
+    """Totals of one SKU, overall and per vendor, or None if no purchase order has it."""
+    line_items = PurchaseOrderItem.objects.filter(sku=sku)
+    totals = line_items.values('sku').annotate(**SKU_TOTALS).order_by('sku').first()
+    if totals is None:
+        return None
+    vendors = (
+        line_items.values(vendor_id=F('purchase_order__vendor_id'))
+        .annotate(**SKU_TOTALS)
+        .order_by('vendor_id')
+    )
+    totals['vendors'] = list(vendors)
+    return totals
+
+@instrumented
+def get_purchase_order_changes(since: int = 0, vendor_id=None) -> PurchaseOrderChange:
+    """Change feed entries after the sequence number `since`, oldest first."""
+    changes = PurchaseOrderChange.objects.filter(id__gt=since)
+    if vendor_id is not None:
+        changes = changes.filter(vendor_id=vendor_id)
+    return changes.order_by('id')
+
+@instrumented
+def get_historical_performances(vendor, expand=()) -> HistoricalPerformance:
+    return _expand(HistoricalPerformance.objects.filter(vendor=vendor), expand)
+
+@instrumented
+def get_performance_series(vendor_id, granularity: str, start: datetime, end: datetime) -> list:
+    """Average metrics per `granularity` bucket in [start, end), oldest first.
+
+    Buckets are built from snapshots of the same or a finer granularity, so
+    compacted and recent history line up in one series.
+    """
+    return list(_performance_series(vendor_id, granularity, start, end))
+
+@instrumented
+async def aget_performance_series(vendor_id, granularity: str, start: datetime, end: datetime) -> list:
+    return [row async for row in _performance_series(vendor_id, granularity, start, end)]
+
+def _performance_series(vendor_id, granularity: str, start: datetime, end: datetime):
+    trunc, granularities = SERIES_GRANULARITIES[granularity]
+    return (
+        HistoricalPerformance.objects
+        .filter(vendor_id=vendor_id, granularity__in=granularities, date__gte=start, date__lt=end)
+        .annotate(bucket=trunc('date'))
+        .values('bucket')
+        .annotate(**{field: Avg(field) for field in SNAPSHOT_FIELDS})
+        .order_by('bucket')
+    )
+
+# Lower is better for response time, higher for every other metric.
+LOWER_IS_BETTER = {'average_response_time'}
+
+@instrumented
+def get_vendor_rankings(filters: dict = None):
+    """Ranking rows, as dicts with the vendor's name and code, filtered on metric ranges.
+
+    `filters` maps e.g. 'min_quality_rating_avg' / 'max_fulfillment_rate' to bounds.
+    """
+    rankings = VendorRanking.objects.all()
+    for name, value in (filters or {}).items():
+        bound, field = name.split('_', 1)
+        rankings = rankings.filter(**{f"{field}__{'gte' if bound == 'min' else 'lte'}": value})
+    return rankings.values('vendor_id', *METRIC_FIELDS, name=F('vendor__name'), vendor_code=F('vendor__vendor_code'))
+
+def _ranking_count(**lookups):
+    # COUNT(*) of the rankings matching `lookups`, as a scalar subquery.
+    rankings = VendorRanking.objects.filter(**lookups).order_by().values(count=Func(F('pk'), function='COUNT'))
+    return Subquery(rankings, output_field=IntegerField())
+
+@cache
+def _standing_counts() -> dict:
+    # Built once: assembling nine subqueries costs more than running them.
+    counts = {'total': _ranking_count()}
+    for field in METRIC_FIELDS:
+        better, worse = ('lt', 'gt') if field in LOWER_IS_BETTER else ('gt', 'lt')
+        counts[f'{field}_better'] = _ranking_count(**{f'{field}__{better}': OuterRef(field)})
+        counts[f'{field}_worse'] = _ranking_count(**{f'{field}__{worse}': OuterRef(field)})
+    return counts
+
+@instrumented
+def get_vendor_standing(vendor_id) -> dict:
+    """Rank and percentile of the vendor for every metric, or None if it has no ranking yet.
 
-def get_historical_performances() -> HistoricalPerformance:
-    return HistoricalPerformance.objects.all()
+    The rank counts the vendors that are strictly better, plus one; the
+    percentile is the share of vendors that are strictly worse. It is one
+    query whose count subqueries are each a range scan of a metric's index.
+    """
+    ranking = VendorRanking.objects.filter(vendor_id=vendor_id).values(*METRIC_FIELDS, **_standing_counts()).first()
+    if ranking is None:
+        return None
 
-def get_historical_performances(vendor) -> HistoricalPerformance :
-    return HistoricalPerformance.objects.filter(vendor=vendor)
\ No newline at end of file
+    total = ranking['total']
+    metrics = {
+        field: {
+            'value': ranking[field],
+            'rank': ranking[f'{field}_better'] + 1,
+            'percentile': round(100 * ranking[f'{field}_worse'] / total, 2),
+        }
+        for field in METRIC_FIELDS
+    }
+    return {'vendor_id': vendor_id, 'vendors': total, 'metrics': metrics}
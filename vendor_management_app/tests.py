@@ -1,3 +1,1531 @@
-from django.test import TestCase
+import base64
+import csv
+import importlib.util
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import warnings
+from datetime import timedelta
+from io import StringIO
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.backends.base import CacheKeyWarning
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import F
+from django.http import HttpResponse
+from django.test.utils import CaptureQueriesContext
+from unittest import mock, skipUnless
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.urls import resolve
+from rest_framework.test import APIClient
+from django.utils import timezone
+from vendor_management import settings_api
+from vendor_management_app.models import (
+    Vendor, PurchaseOrder, PurchaseOrderChange, PurchaseOrderItem, HistoricalPerformance, VendorMetricCounters, MetricsRecomputeRequest, VendorRanking
+)
+from vendor_management_app.instrumentation import InstrumentationMiddleware, profile, registry
+from vendor_management_app.services import batch as batch_module, metrics_queue
+from vendor_management_app.services.changes import record_purchase_order_changes
+from vendor_management_app.services.items import line_items
+from vendor_management_app.services.queries import get_purchase_orders
+from vendor_management_app.views import VendorApi, PurchaseOrderApi, HistoricalPerformanceApi
+from vendor_management_app.services.commands import (
+    VersionConflict, update_vendor, create_purchase_order, create_historical_performance, update_purchase_order, delete_purchase_order, acknowledge_purchase_order,
+    update_historical_performance_metrics, record_performance_snapshots, compact_historical_performance,
+    rebuild_vendor_rankings, recompute_vendor_metrics, store_vendor_metrics, aupdate_historical_performance_metrics
+)
+from vendor_management_app.services.metrics import (
+    acompute_vendor_metrics, compute_vendor_metrics, compute_metrics_for_vendors, incremental_vendor_metrics, rebuild_vendor_counters,
+    response_time_percentiles
+)
 
-# Create your tests here.
+
+class APITestCase(TestCase):
+    def setUp(self):
+        # Database ids are reused between tests, cached responses must not be.
+        cache.clear()
+        self.client = APIClient()
+
+
+def make_vendor(code='V001', **kwargs):
+    return Vendor.objects.create(name=f'Vendor {code}', contact_details='', address='', vendor_code=code, **kwargs)
+
+
+def make_purchase_order(vendor, po_number, status='pending', delivery_days=-1, quality_rating=None, response_hours=None, **kwargs):
+    now = timezone.now()
+    issue_date = now - timedelta(days=10)
+    return PurchaseOrder.objects.create(
+        po_number=po_number,
+        vendor=vendor,
+        order_date=issue_date,
+        delivery_date=now + timedelta(days=delivery_days),
+        items=[{'sku': 'SKU-1', 'quantity': 1}],
+        quantity=1,
+        status=status,
+        quality_rating=quality_rating,
+        issue_date=issue_date,
+        acknowledgment_date=issue_date + timedelta(hours=response_hours) if response_hours is not None else None,
+        **kwargs,
+    )
+
+
+class VendorMetricsTests(TestCase):
+    def setUp(self):
+        self.vendor = make_vendor()
+        make_purchase_order(self.vendor, 'PO-1', status='completed', quality_rating=4, response_hours=2)
+        make_purchase_order(self.vendor, 'PO-2', status='completed', delivery_days=5, quality_rating=2, response_hours=4)
+        make_purchase_order(self.vendor, 'PO-3', status='pending')
+        make_purchase_order(self.vendor, 'PO-4', status='canceled')
+
+    def test_compute_vendor_metrics(self):
+        metrics = compute_vendor_metrics(self.vendor)
+        self.assertEqual(metrics['on_time_delivery_rate'], 50)
+        self.assertEqual(metrics['quality_rating_avg'], 3)
+        self.assertAlmostEqual(metrics['average_response_time'], 3)
+        self.assertEqual(metrics['fulfillment_rate'], 50)
+
+    def test_compute_vendor_metrics_without_orders(self):
+        metrics = compute_vendor_metrics(make_vendor('V002'), percentiles=True)
+        self.assertEqual(metrics, {
+            'on_time_delivery_rate': 0, 'quality_rating_avg': 0, 'average_response_time': 0, 'fulfillment_rate': 0,
+            'response_time_p50': None, 'response_time_p90': None,
+        })
+
+    def test_compute_vendor_metrics_is_one_query(self):
+        with self.assertNumQueries(1):
+            compute_vendor_metrics(self.vendor)
+        # metrics aggregate + percentiles
+        with self.assertNumQueries(2):
+            compute_vendor_metrics(self.vendor, percentiles=True)
+
+    def test_compute_metrics_for_vendors_queries(self):
+        other = make_vendor('V002')
+        make_purchase_order(other, 'PO-5', status='completed', quality_rating=5)
+        empty = make_vendor('V003')
+
+        with self.assertNumQueries(2):
+            metrics = compute_metrics_for_vendors([self.vendor.id, other.id, empty.id])
+        with self.assertNumQueries(1):
+            compute_metrics_for_vendors([self.vendor.id], percentiles=False)
+
+        self.assertEqual(metrics[self.vendor.id], compute_vendor_metrics(self.vendor, percentiles=True))
+        self.assertEqual(metrics[other.id]['fulfillment_rate'], 100)
+        self.assertEqual(metrics[empty.id]['fulfillment_rate'], 0)
+
+    def test_update_historical_performance_metrics_query_count(self):
+        # aggregate + percentiles + conditional Vendor UPDATE + upserts of the current hour's snapshot and of the ranking
+        with self.assertNumQueries(5):
+            update_historical_performance_metrics(self.vendor)
+        with self.assertNumQueries(5):
+            update_historical_performance_metrics(self.vendor)
+
+        historical_performance = HistoricalPerformance.objects.get(vendor=self.vendor)
+        self.assertEqual(historical_performance.fulfillment_rate, 50)
+        self.assertAlmostEqual(historical_performance.response_time_p90, 4)
+
+    def test_vendor_metric_columns_follow_recomputes(self):
+        update_historical_performance_metrics(self.vendor)
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.fulfillment_rate, 50)
+        updated_at = self.vendor.metrics_updated_at
+        self.assertIsNotNone(updated_at)
+
+        # Nothing changed: the conditional UPDATE matches no row and the version stays.
+        self.assertEqual(store_vendor_metrics({self.vendor.id: compute_vendor_metrics(self.vendor)}), set())
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.metrics_updated_at, updated_at)
+
+        PurchaseOrder.objects.filter(vendor=self.vendor).update(status='completed')
+        other = make_vendor('V002')
+        metrics = compute_metrics_for_vendors([self.vendor.id, other.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(store_vendor_metrics(metrics), {self.vendor.id, other.id})
+        self.assertEqual(store_vendor_metrics(metrics), set())
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.fulfillment_rate, 100)
+        self.assertGreater(self.vendor.metrics_updated_at, updated_at)
+
+        response = APIClient().get(f'/api/vendors/{self.vendor.id}/')
+        self.assertEqual(response.data['fulfillment_rate'], 100)
+        self.assertIsNotNone(response.data['metrics_updated_at'])
+
+    def test_response_time_percentiles(self):
+        for number, hours in enumerate([1, 3, 5, 7, 9, 11, 13, 15], start=5):
+            make_purchase_order(self.vendor, f'PO-{number}', response_hours=hours)
+        other = make_vendor('V002')
+        make_purchase_order(other, 'PO-20', response_hours=6)
+        make_purchase_order(other, 'PO-21')
+
+        percentiles = response_time_percentiles([self.vendor.id, other.id, make_vendor('V003').id])
+
+        # Response times 1, 2, 3, 4, 5, 7, 9, 11, 13, 15: nearest ranks 5 and 9.
+        self.assertAlmostEqual(percentiles[self.vendor.id]['response_time_p50'], 5)
+        self.assertAlmostEqual(percentiles[self.vendor.id]['response_time_p90'], 13)
+        self.assertAlmostEqual(percentiles[other.id]['response_time_p50'], 6)
+        self.assertAlmostEqual(percentiles[other.id]['response_time_p90'], 6)
+        self.assertEqual(list(percentiles.values())[2], {'response_time_p50': None, 'response_time_p90': None})
+
+    @skipUnless(importlib.util.find_spec('numpy'), "NumPy is not installed")
+    def test_numpy_engine_matches_sql(self):
+        for number, hours in enumerate([1, 3, 5, 7, 9, 11], start=5):
+            make_purchase_order(self.vendor, f'PO-{number}', status='completed', quality_rating=number % 5, response_hours=hours)
+        other = make_vendor('V002')
+        make_purchase_order(other, 'PO-20', status='completed', delivery_days=3, response_hours=6)
+        vendor_ids = [other.id, make_vendor('V003').id, self.vendor.id]
+        now = timezone.now()
+
+        with self.assertNumQueries(1):
+            numpy_metrics = compute_metrics_for_vendors(vendor_ids, now=now, engine='numpy')
+        sql_metrics = compute_metrics_for_vendors(vendor_ids, now=now)
+
+        self.assertEqual(numpy_metrics.keys(), sql_metrics.keys())
+        for vendor_id in vendor_ids:
+            for field, value in sql_metrics[vendor_id].items():
+                with self.subTest(vendor_id=vendor_id, field=field):
+                    if value is None:
+                        self.assertIsNone(numpy_metrics[vendor_id][field])
+                    else:
+                        self.assertAlmostEqual(numpy_metrics[vendor_id][field], value, places=6)
+
+
+def purchase_order_fields(purchase_order, **changes):
+    fields = {
+        field: getattr(purchase_order, field)
+        for field in ['po_number', 'vendor', 'order_date', 'delivery_date', 'items', 'quantity', 'status', 'quality_rating', 'issue_date', 'acknowledgment_date']
+    }
+    fields.update(changes)
+    return fields
+
+
+@override_settings(VENDOR_METRICS_MODE='incremental')
+class IncrementalVendorMetricsTests(TestCase):
+    def setUp(self):
+        self.vendor = make_vendor()
+        self.other = make_vendor('V002')
+        now = timezone.now()
+        self.fields = {
+            'po_number': 'PO-1',
+            'vendor': self.vendor,
+            'order_date': now - timedelta(days=10),
+            'delivery_date': now - timedelta(days=1),
+            'items': [],
+            'quantity': 1,
+            'status': 'pending',
+            'quality_rating': None,
+            'issue_date': now - timedelta(days=10),
+            'acknowledgment_date': None,
+        }
+
+    def assertCountersMatchFullRecompute(self):
+        for vendor in (self.vendor, self.other):
+            self.assertEqual(incremental_vendor_metrics(vendor), compute_vendor_metrics(vendor))
+        self.assertEqual(rebuild_vendor_counters(dry_run=True), {})
+
+    def test_counters_follow_purchase_order_lifecycle(self):
+        purchase_order = create_purchase_order(**self.fields)
+        create_purchase_order(**dict(self.fields, po_number='PO-2', status='completed', quality_rating=3))
+        self.assertCountersMatchFullRecompute()
+
+        acknowledge_purchase_order(purchase_order)
+        self.assertCountersMatchFullRecompute()
+
+        update_purchase_order(purchase_order, **purchase_order_fields(purchase_order, status='completed', quality_rating=5))
+        self.assertCountersMatchFullRecompute()
+        counters = VendorMetricCounters.objects.get(vendor=self.vendor)
+        self.assertEqual((counters.total_count, counters.completed_count, counters.rating_sum), (2, 2, 8))
+
+        update_purchase_order(purchase_order, **purchase_order_fields(purchase_order, vendor=self.other))
+        self.assertCountersMatchFullRecompute()
+
+        delete_purchase_order(purchase_order)
+        self.assertCountersMatchFullRecompute()
+        self.assertEqual(VendorMetricCounters.objects.get(vendor=self.other).total_count, 0)
+
+    def test_counter_update_cost_is_independent_of_order_count(self):
+        for number in range(20):
+            make_purchase_order(self.vendor, f'PO-OLD-{number}', status='completed')
+        rebuild_vendor_counters()
+        purchase_order = make_purchase_order(self.vendor, 'PO-NEW')
+
+        # savepoint, UPDATE purchase order, change feed INSERT, UPDATE counters, release; the recompute is queued
+        with self.assertNumQueries(5):
+            update_purchase_order(purchase_order, **purchase_order_fields(purchase_order, status='completed'))
+
+    def test_recompute_skips_percentiles(self):
+        make_purchase_order(self.vendor, 'PO-1', status='completed', response_hours=4)
+        rebuild_vendor_counters()
+        recompute_vendor_metrics([self.vendor.id])
+
+        # counters read + conditional Vendor UPDATE + snapshot and ranking upserts
+        with self.assertNumQueries(4):
+            update_historical_performance_metrics(self.vendor)
+        # The snapshot keeps the percentiles of the last full recompute.
+        self.assertAlmostEqual(HistoricalPerformance.objects.get(vendor=self.vendor).response_time_p50, 4)
+
+    def test_reconcile_command_reports_and_fixes_drift(self):
+        create_purchase_order(**self.fields)
+        VendorMetricCounters.objects.filter(vendor=self.vendor).update(total_count=5)
+
+        out = StringIO()
+        call_command('reconcile_vendor_metrics', stdout=out)
+
+        self.assertIn(f"vendor {self.vendor.id}: total_count: 5 -> 1", out.getvalue())
+        self.assertEqual(VendorMetricCounters.objects.get(vendor=self.vendor).total_count, 1)
+        self.assertCountersMatchFullRecompute()
+
+
+class MetricsQueueTests(TestCase):
+    def setUp(self):
+        self.vendor = make_vendor()
+
+    @override_settings(VENDOR_METRICS_QUEUE={'BACKEND': 'sync'})
+    def test_sync_queue_recomputes_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            make_purchase_order(self.vendor, 'PO-1', status='completed')
+            create_purchase_order(**purchase_order_fields(PurchaseOrder.objects.get(), po_number='PO-2', status='pending'))
+            self.assertFalse(HistoricalPerformance.objects.exists())
+
+        self.assertEqual(HistoricalPerformance.objects.get(vendor=self.vendor).fulfillment_rate, 50)
+
+    @override_settings(VENDOR_METRICS_QUEUE={'BACKEND': 'database', 'COALESCE_WINDOW': 60})
+    def test_database_queue_coalesces_marks(self):
+        purchase_order = make_purchase_order(self.vendor, 'PO-1')
+        create_purchase_order(**purchase_order_fields(purchase_order, po_number='PO-2'))
+        acknowledge_purchase_order(purchase_order)
+
+        self.assertEqual(MetricsRecomputeRequest.objects.get().vendor_id, self.vendor.id)
+        self.assertEqual(metrics_queue.get_metrics_queue().process(), 0)
+
+        with mock.patch.object(metrics_queue, '_recompute', wraps=metrics_queue._recompute) as recompute:
+            self.assertTrue(metrics_queue.flush_metrics_queue())
+        recompute.assert_called_once_with(self.vendor.id)
+        self.assertFalse(MetricsRecomputeRequest.objects.exists())
+        self.assertTrue(HistoricalPerformance.objects.filter(vendor=self.vendor).exists())
+
+    @override_settings(VENDOR_METRICS_QUEUE={'BACKEND': 'database', 'MAX_ATTEMPTS': 3})
+    def test_database_queue_dead_letters_failing_recomputes(self):
+        make_purchase_order(self.vendor, 'PO-1')
+        metrics_queue.mark_vendor_dirty(self.vendor.id)
+
+        with mock.patch.object(metrics_queue, '_recompute', side_effect=RuntimeError) as recompute, self.assertLogs(metrics_queue.logger):
+            self.assertFalse(metrics_queue.flush_metrics_queue())
+        self.assertEqual(recompute.call_count, 3)
+        self.assertEqual(MetricsRecomputeRequest.objects.get().attempts, 3)
+        self.assertEqual(metrics_queue.get_metrics_queue().process(include_recent=True), 0)
+
+        out = StringIO()
+        call_command('process_metrics_queue', '--requeue-failed', stdout=out)
+        self.assertIn("Requeued 1 failed request(s).", out.getvalue())
+        self.assertFalse(MetricsRecomputeRequest.objects.exists())
+        self.assertTrue(HistoricalPerformance.objects.filter(vendor=self.vendor).exists())
+
+    @override_settings(VENDOR_METRICS_QUEUE={'BACKEND': 'database', 'MAX_ATTEMPTS': 1})
+    def test_database_queue_revives_dead_letters_on_new_changes(self):
+        purchase_order = make_purchase_order(self.vendor, 'PO-1')
+        metrics_queue.mark_vendor_dirty(self.vendor.id)
+        with mock.patch.object(metrics_queue, '_recompute', side_effect=RuntimeError), self.assertLogs(metrics_queue.logger):
+            self.assertFalse(metrics_queue.flush_metrics_queue())
+
+        create_purchase_order(**purchase_order_fields(purchase_order, po_number='PO-2', status='completed', quality_rating=4))
+        self.assertEqual(MetricsRecomputeRequest.objects.get().attempts, 0)
+        self.assertTrue(metrics_queue.flush_metrics_queue())
+        self.assertEqual(HistoricalPerformance.objects.get(vendor=self.vendor).fulfillment_rate, 50)
+
+    @override_settings(VENDOR_METRICS_QUEUE={'BACKEND': 'database'})
+    def test_database_queue_times_out(self):
+        metrics_queue.mark_vendor_dirty(self.vendor.id)
+        with mock.patch.object(metrics_queue, '_recompute', side_effect=RuntimeError), self.assertLogs(metrics_queue.logger):
+            self.assertFalse(metrics_queue.flush_metrics_queue(timeout=0))
+        self.assertEqual(MetricsRecomputeRequest.objects.get().attempts, 1)
+
+    @override_settings(VENDOR_METRICS_QUEUE={'BACKEND': 'database'})
+    def test_database_queue_drops_deleted_vendors(self):
+        metrics_queue.mark_vendor_dirty(self.vendor.id)
+
+        def delete_vendor_first(vendor_id):
+            Vendor.objects.filter(id=vendor_id).delete()
+            raise RuntimeError
+        with mock.patch.object(metrics_queue, '_recompute', side_effect=delete_vendor_first):
+            self.assertTrue(metrics_queue.flush_metrics_queue())
+        self.assertFalse(MetricsRecomputeRequest.objects.exists())
+
+
+@override_settings(VENDOR_METRICS_QUEUE={'BACKEND': 'thread', 'WORKERS': 2, 'COALESCE_WINDOW': 60})
+class ThreadMetricsQueueTests(TransactionTestCase):
+    def test_marks_within_window_coalesce(self):
+        vendor = make_vendor()
+        purchase_order = make_purchase_order(vendor, 'PO-1')
+
+        with mock.patch.object(metrics_queue, '_recompute', wraps=metrics_queue._recompute) as recompute:
+            for number in range(5):
+                create_purchase_order(**purchase_order_fields(purchase_order, po_number=f'PO-{number + 2}'))
+            self.assertTrue(metrics_queue.flush_metrics_queue(timeout=10))
+
+        recompute.assert_called_once_with(vendor.id)
+        self.assertEqual(HistoricalPerformance.objects.get(vendor=vendor).fulfillment_rate, 0)
+
+    def test_import_command_waits_for_recomputes(self):
+        vendor = make_vendor()
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as handle:
+            handle.write('\n'.join(json.dumps(import_row(f'PO-{number}')) for number in range(3)))
+        self.addCleanup(os.remove, handle.name)
+
+        call_command('import_purchase_orders', handle.name, stdout=StringIO())
+
+        vendor.refresh_from_db()
+        self.assertEqual(vendor.fulfillment_rate, 100)
+        self.assertTrue(HistoricalPerformance.objects.filter(vendor=vendor).exists())
+        self.assertTrue(VendorRanking.objects.filter(vendor=vendor).exists())
+
+
+def import_row(po_number, vendor_code='V001', **changes):
+    row = {
+        'po_number': po_number,
+        'vendor_code': vendor_code,
+        'order_date': '2024-01-01T00:00:00Z',
+        'delivery_date': '2024-01-10T00:00:00Z',
+        'items': [{'sku': 'SKU-1', 'quantity': 2}],
+        'quantity': 2,
+        'status': 'completed',
+        'quality_rating': 4.5,
+        'issue_date': '2024-01-01T00:00:00Z',
+        'acknowledgment_date': '2024-01-01T06:00:00Z',
+    }
+    row.update(changes)
+    return row
+
+
+@override_settings(VENDOR_METRICS_QUEUE={'BACKEND': 'sync'})
+class PurchaseOrderImportTests(APITestCase):
+    def setUp(self):
+        self.vendor = make_vendor()
+        super().setUp()
+
+    def test_bulk_endpoint_reports_errors_per_row(self):
+        make_purchase_order(self.vendor, 'PO-EXISTING')
+        lines = [
+            json.dumps(import_row('PO-1')),
+            json.dumps(import_row('PO-2', vendor_code='NOPE')),
+            '{not json',
+            json.dumps(import_row('PO-EXISTING')),
+            json.dumps(import_row('PO-1')),
+            json.dumps(import_row('PO-3', quantity='many')),
+            json.dumps(import_row('PO-4', status='pending', quality_rating=None, acknowledgment_date=None)),
+        ]
+
+        response = self.client.post('/api/purchase_orders/bulk/?chunk_size=3', '\n'.join(lines), content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3, 4, 5, 6])
+        self.assertIn('vendor_code', response.data['errors'][0]['errors'])
+        self.assertEqual(set(PurchaseOrder.objects.values_list('po_number', flat=True)), {'PO-EXISTING', 'PO-1', 'PO-4'})
+
+    def test_bulk_endpoint_accepts_json_list(self):
+        response = self.client.post('/api/purchase_orders/bulk/', [import_row('PO-1'), import_row('PO-2')], format='json')
+
+        self.assertEqual(response.data, {'created': 2, 'errors': [], 'failed': 0})
+
+    def test_bulk_endpoint_validates_chunk_size(self):
+        for chunk_size in ['abc', '0', '-1', '1000000']:
+            with self.subTest(chunk_size=chunk_size):
+                response = self.client.post(f'/api/purchase_orders/bulk/?chunk_size={chunk_size}', [import_row('PO-1')], format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('chunk_size', response.data)
+        self.assertFalse(PurchaseOrder.objects.exists())
+
+        response = self.client.post('/api/purchase_orders/bulk/?chunk_size=1', [import_row('PO-1'), import_row('PO-2')], format='json')
+        self.assertEqual(response.data['created'], 2)
+
+    def test_import_queries_are_per_chunk(self):
+        rows = [(number, import_row(f'PO-{number}'), None) for number in range(1, 51)]
+        from vendor_management_app.services.imports import import_purchase_orders
+
+        # vendor lookup, existing PO lookup, savepoint, INSERT, line items INSERT, change feed INSERT, release;
+        # then one recompute (aggregate, percentiles, Vendor UPDATE, snapshot and ranking upserts)
+        with self.assertNumQueries(12), self.captureOnCommitCallbacks(execute=True):
+            report = import_purchase_orders(rows, chunk_size=100)
+        self.assertEqual(report['created'], 50)
+        self.assertEqual(PurchaseOrderItem.objects.filter(purchase_order__vendor=self.vendor).count(), 50)
+        self.assertEqual(HistoricalPerformance.objects.get(vendor=self.vendor).fulfillment_rate, 100)
+
+    def test_lost_insert_race_is_reported_without_database_details(self):
+        from django.db import IntegrityError
+        from vendor_management_app.services import imports
+
+        race = IntegrityError('UNIQUE constraint failed: vendor_management_app_purchaseorder.po_number')
+        with mock.patch.object(imports, 'sync_line_items', side_effect=race), self.assertLogs(imports.logger, 'WARNING'):
+            report = imports.import_purchase_orders([(1, import_row('PO-1'), None)])
+
+        self.assertEqual(report['errors'], [{'row': 1, 'errors': {'non_field_errors': ["Conflicts with an existing purchase order."]}}])
+        self.assertFalse(PurchaseOrder.objects.exists())
+
+    def test_import_command_reads_csv(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, newline='') as handle:
+            handle.write('po_number,vendor_code,order_date,delivery_date,items,quantity,status,quality_rating,issue_date,acknowledgment_date\n')
+            handle.write('PO-1,V001,2024-01-01T00:00:00Z,2024-01-10T00:00:00Z,"[{""sku"": ""A""}]",1,completed,4,2024-01-01T00:00:00Z,\n')
+            handle.write('PO-2,V001,2024-01-01T00:00:00Z,2024-01-10T00:00:00Z,[],x,pending,,2024-01-01T00:00:00Z,\n')
+        self.addCleanup(os.remove, handle.name)
+
+        out, err = StringIO(), StringIO()
+        call_command('import_purchase_orders', handle.name, stdout=out, stderr=err)
+
+        self.assertIn('Created 1 purchase order(s), 1 row(s) failed.', out.getvalue())
+        self.assertIn('row 2:', err.getvalue())
+        self.assertEqual(PurchaseOrder.objects.get().items, [{'sku': 'A'}])
+
+
+@override_settings(VENDOR_METRICS_QUEUE={'BACKEND': 'sync'})
+class PurchaseOrderBatchTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.vendor = make_vendor()
+        self.other_vendor = make_vendor('V002')
+        self.first = make_purchase_order(self.vendor, 'PO-1')
+        self.second = make_purchase_order(self.other_vendor, 'PO-2')
+
+    def batch(self, *operations):
+        return self.client.post('/api/purchase_orders/batch/', {'operations': list(operations)}, format='json')
+
+    def create_data(self, po_number, **changes):
+        data = import_row(po_number, **changes)
+        data['vendor'] = data.pop('vendor_code', self.vendor.id)
+        return data
+
+    def test_applies_operations_in_one_transaction(self):
+        mark_dirty = mock.patch('vendor_management_app.services.batch.mark_vendor_dirty', wraps=metrics_queue.mark_vendor_dirty)
+        with self.captureOnCommitCallbacks(execute=True), mark_dirty as marked:
+            response = self.batch(
+                {'op': 'create', 'data': self.create_data('PO-3', vendor_code=self.vendor.id)},
+                {'op': 'update', 'id': self.first.id, 'data': {'status': 'completed', 'items': [{'sku': 'BOLT', 'quantity': 3}]}},
+                {'op': 'acknowledge', 'id': self.first.id},
+                {'op': 'delete', 'id': self.second.id},
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(result['op'], result['status']) for result in response.data['results']],
+                         [('create', 201), ('update', 202), ('acknowledge', 200), ('delete', 204)])
+        self.assertEqual(response.data['results'][3]['po_id'], self.second.id)
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.status, 'completed')
+        self.assertIsNotNone(self.first.acknowledgment_date)
+        self.assertEqual(list(self.first.line_items.values_list('sku', 'quantity')), [('BOLT', 3)])
+        self.assertEqual(set(PurchaseOrder.objects.values_list('po_number', flat=True)), {'PO-1', 'PO-3'})
+        # One metrics recompute per affected vendor, not per operation.
+        self.assertEqual(sorted(call.args[0] for call in marked.call_args_list), [self.vendor.id, self.other_vendor.id])
+        self.assertEqual(HistoricalPerformance.objects.get(vendor=self.vendor).fulfillment_rate, 100)
+
+    def test_any_error_rejects_the_whole_batch(self):
+        response = self.batch(
+            {'op': 'update', 'id': self.first.id, 'data': {'status': 'completed'}},
+            {'op': 'create', 'data': self.create_data('PO-2', vendor_code=self.vendor.id)},
+            {'op': 'create', 'data': self.create_data('PO-4', vendor_code=999)},
+            {'op': 'delete', 'id': 999},
+            {'op': 'update', 'id': self.second.id},
+            {'op': 'delete', 'id': self.second.id},
+            {'op': 'acknowledge', 'id': self.second.id},
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2, 3, 4, 6])
+        self.assertIn('po_number', response.data['errors'][0]['errors']['data'])
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.status, 'pending')
+        self.assertEqual(PurchaseOrder.objects.count(), 2)
+
+        response = self.batch(
+            {'op': 'create', 'data': self.create_data('PO-5', vendor_code=self.vendor.id)},
+            {'op': 'create', 'data': self.create_data('PO-5', vendor_code=self.vendor.id)},
+        )
+        self.assertEqual([error['index'] for error in response.data['errors']], [1])
+        self.assertEqual(self.batch().status_code, 400)
+
+    def test_lost_insert_race_is_reported_without_database_details(self):
+        # Another writer inserts the same po number between the batch's validation and its INSERT.
+        def check_references(*args):
+            purchase_orders = check(*args)
+            make_purchase_order(self.vendor, 'PO-RACE')
+            return purchase_orders
+        check = batch_module._check_references
+        with mock.patch.object(batch_module, '_check_references', check_references), self.assertLogs(batch_module.logger, 'WARNING'):
+            response = self.batch({'op': 'create', 'data': self.create_data('PO-RACE', vendor_code=self.vendor.id)})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'], [{'index': None, 'errors': {'non_field_errors': ["Conflicts with an existing purchase order."]}}])
+
+    def test_queries_do_not_grow_with_operations(self):
+        purchase_orders = [make_purchase_order(self.vendor, f'PO-B{number}') for number in range(20)]
+        operations = [{'op': 'update', 'id': purchase_order.id, 'data': {'status': 'completed'}} for purchase_order in purchase_orders]
+
+        # purchase orders lookup, savepoint, version check, UPDATE, change feed INSERT, release: no vendor or po number changes to check
+        with self.assertNumQueries(6):
+            response = self.batch(*operations)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(PurchaseOrder.objects.filter(status='completed').count(), 20)
+
+
+@override_settings(VENDOR_METRICS_QUEUE={'BACKEND': 'sync'})
+class OptimisticConcurrencyTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.vendor = make_vendor()
+        self.purchase_order = make_purchase_order(self.vendor, 'PO-1')
+
+    def test_vendor_update_writes_changed_fields_only(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(f'/api/vendors/{self.vendor.id}/', {'name': 'Renamed', 'vendor_code': 'V001', 'version': 1}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual((response.data['name'], response.data['version']), ('Renamed', 2))
+        [update] = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertIn('"name"', update)
+        self.assertNotIn('"vendor_code"', update)
+
+        # Unchanged values don't write or bump the version.
+        self.vendor.refresh_from_db()
+        with self.assertNumQueries(0):
+            update_vendor(self.vendor, vendor_code='V001')
+        self.assertEqual(self.vendor.version, 2)
+
+        response = self.client.put(f'/api/vendors/{self.vendor.id}/', {'name': 'Stale', 'version': 1}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['version'], 2)
+        self.assertEqual(Vendor.objects.get().name, 'Renamed')
+
+    def test_version_conflict_is_picklable(self):
+        # Raised in worker processes, e.g. by benchmarks/sqlite_concurrency.py
+        with self.assertNumQueries(0):
+            exc = pickle.loads(pickle.dumps(VersionConflict("Changed.", 3)))
+        self.assertEqual(exc.detail, {'detail': "Changed.", 'version': 3})
+        self.assertEqual(exc.status_code, 409)
+
+    def test_concurrent_purchase_order_updates(self):
+        stale = PurchaseOrder.objects.get()
+        update_purchase_order(self.purchase_order, status='completed')
+        changes = PurchaseOrderChange.objects.count()
+
+        with self.assertRaises(VersionConflict), self.captureOnCommitCallbacks(execute=True):
+            update_purchase_order(stale, quality_rating=4)
+        self.purchase_order.refresh_from_db()
+        self.assertEqual((self.purchase_order.status, self.purchase_order.quality_rating, self.purchase_order.version), ('completed', None, 2))
+        self.assertEqual(PurchaseOrderChange.objects.count(), changes)
+
+        # A partial PUT based on the current version.
+        response = self.client.put(f'/api/purchase_orders/{self.purchase_order.id}/', {'quality_rating': 4, 'version': 2}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual((response.data['status'], response.data['quality_rating'], response.data['version']), ('completed', 4, 3))
+        self.assertEqual(self.client.put(f'/api/purchase_orders/{self.purchase_order.id}/', {'quantity': 2, 'version': 2}, format='json').status_code, 409)
+
+    @override_settings(VENDOR_METRICS_MODE='incremental')
+    def test_concurrent_acknowledgments(self):
+        rebuild_vendor_counters()
+        stale = PurchaseOrder.objects.get()
+        # An unrelated edit doesn't make a plain acknowledgment conflict.
+        update_purchase_order(self.purchase_order, quantity=3, issue_date=self.purchase_order.issue_date - timedelta(hours=5))
+
+        acknowledge_purchase_order(stale)
+        self.assertEqual((stale.quantity, stale.version), (3, 3))
+        # The counters saw the issue date the row had when it was acknowledged.
+        self.assertEqual(incremental_vendor_metrics(self.vendor), compute_vendor_metrics(self.vendor))
+
+        with self.assertRaisesMessage(VersionConflict, "Purchase order already acknowledged."):
+            acknowledge_purchase_order(PurchaseOrder.objects.get())
+        response = self.client.post(f'/api/purchase_orders/{stale.id}/acknowledge/')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data, {'detail': "Purchase order already acknowledged.", 'version': 3})
+
+    def test_acknowledge_checks_version_when_given(self):
+        response = self.client.post(f'/api/purchase_orders/{self.purchase_order.id}/acknowledge/', {'version': 2}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertIsNone(PurchaseOrder.objects.get().acknowledgment_date)
+
+        response = self.client.post(f'/api/purchase_orders/{self.purchase_order.id}/acknowledge/', {'version': 1}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(PurchaseOrder.objects.get().version, 2)
+
+    async def test_async_api_conflicts(self):
+        client = AsyncClient()
+        response = await client.put(f'/api/async/purchase_orders/{self.purchase_order.id}/', {'quantity': 2, 'version': 3}, content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['version'], 1)
+        response = await client.put(f'/api/async/vendors/{self.vendor.id}/', {'name': 'Renamed', 'version': 1}, content_type='application/json')
+        self.assertEqual(response.json()['version'], 2)
+
+    def test_batch_conflicts(self):
+        def batch(*operations):
+            return self.client.post('/api/purchase_orders/batch/', {'operations': list(operations)}, format='json')
+
+        response = batch({'op': 'update', 'id': self.purchase_order.id, 'version': 2, 'data': {'status': 'completed'}})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['errors'][0]['errors']['version'], [f"Purchase order {self.purchase_order.id} is at version 1."])
+
+        # Changed by another writer between the batch's read and its transaction.
+        def check_references(*args):
+            purchase_orders = check(*args)
+            PurchaseOrder.objects.filter(id=self.purchase_order.id).update(quantity=5, version=F('version') + 1)
+            return purchase_orders
+        check = batch_module._check_references
+        with mock.patch.object(batch_module, '_check_references', check_references):
+            response = batch({'op': 'update', 'id': self.purchase_order.id, 'data': {'status': 'completed'}})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(PurchaseOrder.objects.get().status, 'pending')
+
+        response = batch({'op': 'update', 'id': self.purchase_order.id, 'version': 2, 'data': {'status': 'completed'}})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['data']['version'], 3)
+
+
+@override_settings(VENDOR_METRICS_QUEUE={'BACKEND': 'sync'})
+class PurchaseOrderChangeTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.vendor = make_vendor()
+        self.other_vendor = make_vendor('V002')
+        self.async_client = AsyncClient()
+
+    def write(self):
+        self.client.post('/api/purchase_orders/', {**import_row('PO-1', acknowledgment_date=None), 'vendor': self.vendor.id}, format='json')
+        purchase_order = PurchaseOrder.objects.get(po_number='PO-1')
+        update_purchase_order(purchase_order, **purchase_order_fields(purchase_order, status='canceled'))
+        acknowledge_purchase_order(purchase_order)
+        other = make_purchase_order(self.other_vendor, 'PO-2')
+        other_id = other.id
+        delete_purchase_order(other)
+        return purchase_order, other_id
+
+    def test_commands_append_to_the_feed(self):
+        purchase_order, other_id = self.write()
+
+        response = self.client.get('/api/changes/', {'count': 3})
+        self.assertEqual([(change['action'], change['po_id']) for change in response.data['results']],
+                         [('created', purchase_order.id), ('updated', purchase_order.id), ('updated', purchase_order.id)])
+        self.assertEqual(response.data['results'][1]['data']['status'], 'canceled')
+        self.assertEqual(response.data['results'][2]['data'], self.client.get(f'/api/purchase_orders/{purchase_order.id}/').data)
+        self.assertTrue(response.data['has_more'])
+
+        response = self.client.get('/api/changes/', {'since': response.data['last_seq']})
+        self.assertEqual([(change['action'], change['po_id'], change['data']) for change in response.data['results']],
+                         [('deleted', other_id, None)])
+        self.assertFalse(response.data['has_more'])
+
+        response = self.client.get('/api/changes/', {'since': response.data['last_seq']})
+        self.assertEqual(response.data['results'], [])
+        self.assertEqual(response.data['last_seq'], PurchaseOrderChange.objects.latest('id').id)
+        self.assertEqual(len(self.client.get('/api/changes/', {'vendor': self.other_vendor.id}).data['results']), 1)
+        self.assertEqual(self.client.get('/api/changes/', {'since': -1}).status_code, 400)
+
+    def test_batch_import_and_vendor_delete_append_to_the_feed(self):
+        purchase_order = make_purchase_order(self.vendor, 'PO-1')
+        self.client.post('/api/purchase_orders/batch/', {'operations': [
+            {'op': 'acknowledge', 'id': purchase_order.id},
+            {'op': 'update', 'id': purchase_order.id, 'data': {'status': 'completed'}},
+        ]}, format='json')
+        self.client.post('/api/purchase_orders/bulk/', [import_row('PO-2')], format='json')
+        self.client.delete(f'/api/vendors/{self.vendor.id}/')
+
+        self.assertEqual(list(PurchaseOrderChange.objects.order_by('id').values_list('action', 'data__status')), [
+            ('updated', 'completed'), ('created', 'completed'), ('deleted', None), ('deleted', None),
+        ])
+
+    async def test_long_poll_returns_as_soon_as_there_is_a_change(self):
+        since = await PurchaseOrderChange.objects.acount()
+        with mock.patch('vendor_management_app.async_views.CHANGE_POLL_INTERVAL', 0.01):
+            response = await self.async_client.get('/api/async/changes/', {'since': since, 'wait': 0.05})
+            self.assertEqual(response.json(), {'results': [], 'last_seq': since, 'has_more': False})
+
+            await sync_to_async(make_purchase_order)(self.vendor, 'PO-1')
+            await sync_to_async(record_purchase_order_changes)([
+                (PurchaseOrderChange.CREATED, await PurchaseOrder.objects.aget(po_number='PO-1')),
+            ])
+            response = await self.async_client.get('/api/async/changes/', {'since': since, 'wait': 5})
+        self.assertEqual([change['action'] for change in response.json()['results']], ['created'])
+
+    async def test_server_sent_events(self):
+        purchase_order, _ = await sync_to_async(self.write)()
+        last_event_id = await PurchaseOrderChange.objects.order_by('id').values_list('id', flat=True).afirst()
+
+        with mock.patch('vendor_management_app.async_views.CHANGE_POLL_INTERVAL', 0.01):
+            response = await self.async_client.get('/api/async/changes/stream/', headers={'Last-Event-ID': str(last_event_id)})
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            events = aiter(response.streaming_content)
+            self.assertEqual(await anext(events), b'retry: 10\n\n')
+            event = (await anext(events)).decode()
+            await events.aclose()
+
+        self.assertTrue(event.startswith(f'id: {last_event_id + 1}\nevent: updated\ndata: '), event)
+        self.assertEqual(json.loads(event.split('data: ', 1)[1])['po_id'], purchase_order.id)
+
+
+class MigrationTests(TestCase):
+    def test_models_match_migrations(self):
+        call_command('makemigrations', 'vendor_management_app', check=True, dry_run=True, stdout=StringIO())
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.vendor = make_vendor()
+        for number in range(7):
+            make_purchase_order(self.vendor, f'PO-{number}')
+        # Equal order dates must still page by id.
+        PurchaseOrder.objects.filter(po_number__in=['PO-2', 'PO-3', 'PO-4']).update(order_date=timezone.now() - timedelta(days=30))
+
+    def walk(self, url):
+        results, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            results.extend(response.data['results'])
+            url = response.data['next']
+            pages += 1
+        return results, pages
+
+    def test_walks_purchase_orders_in_order_date_order(self):
+        results, pages = self.walk('/api/purchase_orders/?count=2')
+
+        self.assertEqual(pages, 4)
+        expected = list(PurchaseOrder.objects.order_by('order_date', 'id').values_list('id', flat=True))
+        self.assertEqual([row['po_id'] for row in results], expected)
+
+    def test_deep_pages_cost_the_same_as_the_first(self):
+        first = self.client.get('/api/purchase_orders/?count=2&skip_count=true')
+        self.assertNotIn('count', first.data)
+
+        with self.assertNumQueries(1):
+            self.client.get(first.data['next'])
+
+    def test_page_size_is_capped(self):
+        for number in range(3):
+            make_vendor(f'V10{number}')
+        with mock.patch('vendor_management_app.pagination.KeysetPagination.max_page_size', 3):
+            response = self.client.get('/api/vendors/?count=1000000')
+
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(response.data['count'], 4)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/vendors/?cursor=bm9wZQ')
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_values_of_the_wrong_type(self):
+        def cursor(values):
+            return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+        for url, values in [
+            ('/api/vendors/', ['abc']), ('/api/vendors/', [None]), ('/api/vendors/', [{'a': 1}]), ('/api/vendors/', [1, 2]),
+            ('/api/purchase_orders/', ['notadate', 1]), ('/api/purchase_orders/', [None, None]),
+            ('/api/purchase_orders/', [{'a': 1}, 1]), ('/api/purchase_orders/', ['2024-01-01T00:00:00+00:00', 'abc']),
+        ]:
+            with self.subTest(url=url, values=values):
+                response = self.client.get(url, {'cursor': cursor(values)})
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.data['detail'], 'Invalid cursor')
+
+    def test_performance_history_is_paginated_newest_first(self):
+        for days in range(3):
+            HistoricalPerformance.objects.create(
+                vendor=self.vendor, date=timezone.now() - timedelta(days=days),
+                on_time_delivery_rate=0, quality_rating_avg=0, average_response_time=0, fulfillment_rate=0,
+            )
+
+        results, pages = self.walk(f'/api/vendors/{self.vendor.id}/performance?count=2')
+
+        self.assertEqual(pages, 2)
+        dates = [row['date'] for row in results]
+        self.assertEqual(dates, sorted(dates, reverse=True))
+
+
+class PurchaseOrderFilterTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.vendor = make_vendor()
+        self.other_vendor = make_vendor('V002')
+        make_purchase_order(self.vendor, 'OVERDUE', delivery_days=-2)
+        make_purchase_order(self.vendor, 'OVERDUE-ACKED', delivery_days=-2, response_hours=1)
+        make_purchase_order(self.vendor, 'DUE-LATER', delivery_days=5)
+        make_purchase_order(self.vendor, 'DELIVERED', status='completed', quality_rating=4.5, response_hours=2)
+        make_purchase_order(self.other_vendor, 'OTHER-OVERDUE', delivery_days=-1)
+        make_purchase_order(self.other_vendor, 'OTHER-CANCELED', status='canceled', quality_rating=2, delivery_days=3)
+
+    def po_numbers(self, query):
+        response = self.client.get(f'/api/purchase_orders/?{query}')
+        self.assertEqual(response.status_code, 200, response.data)
+        return [row['po_number'] for row in response.data['results']]
+
+    def test_overdue_unacknowledged_for_vendor(self):
+        self.assertEqual(self.po_numbers(f'vendor={self.vendor.id}&overdue=true&acknowledged=false'), ['OVERDUE'])
+        self.assertEqual(self.po_numbers('overdue=true&ordering=po_number'), ['OTHER-OVERDUE', 'OVERDUE', 'OVERDUE-ACKED'])
+
+    def test_status_date_and_rating_filters(self):
+        self.assertEqual(self.po_numbers('status=completed,canceled&ordering=po_number'), ['DELIVERED', 'OTHER-CANCELED'])
+        self.assertEqual(self.po_numbers('min_quality_rating=3'), ['DELIVERED'])
+        self.assertEqual(self.po_numbers('acknowledged=true&ordering=po_number'), ['DELIVERED', 'OVERDUE-ACKED'])
+
+        after = (timezone.now() + timedelta(days=1)).isoformat()
+        query = f'delivery_date_after={after.replace("+", "%2B")}&ordering=delivery_date'
+        self.assertEqual(self.po_numbers(query), ['OTHER-CANCELED', 'DUE-LATER'])
+
+    def test_ordering_composes_with_pagination(self):
+        results, url = [], '/api/purchase_orders/?ordering=-delivery_date&count=2&status=pending'
+        while url:
+            response = self.client.get(url)
+            results.extend(row['po_number'] for row in response.data['results'])
+            url = response.data['next']
+            self.assertEqual(response.data['count'], 4)
+
+        expected = PurchaseOrder.objects.filter(status='pending').order_by('-delivery_date', '-id')
+        self.assertEqual(results, [purchase_order.po_number for purchase_order in expected])
+
+    def test_filters_apply_to_exports(self):
+        response = self.client.get(f'/api/purchase_orders/?export=ndjson&vendor={self.other_vendor.id}&ordering=-po_number')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['po_number'] for row in rows], ['OTHER-OVERDUE', 'OTHER-CANCELED'])
+
+    def test_invalid_parameters(self):
+        for query in ['ordering=quality_rating', 'overdue=maybe', 'order_date_after=yesterday']:
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'/api/purchase_orders/?{query}').status_code, 400)
+
+    def test_vendor_listing_uses_an_index(self):
+        purchase_orders = get_purchase_orders(filters={'vendor': self.vendor.id, 'overdue': True, 'acknowledged': False})
+        plan = purchase_orders.order_by('order_date', 'id').explain()
+        self.assertIn('USING INDEX', plan)
+        self.assertNotIn('SCAN vendor_management_app_purchaseorder', plan)
+
+
+class PurchaseOrderItemTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.vendor = make_vendor()
+        self.other_vendor = make_vendor('V002')
+        template = make_purchase_order(self.vendor, 'TEMPLATE')
+        self.first = create_purchase_order(**purchase_order_fields(
+            template, po_number='PO-1', items=[{'sku': 'BOLT-10', 'quantity': 5}, {'sku': 'NUT-10', 'quantity': 2}]))
+        self.second = create_purchase_order(**purchase_order_fields(
+            template, po_number='PO-2', vendor=self.other_vendor, items=[{'sku': 'BOLT-10', 'quantity': 7}, {'sku': 'BOLT-12'}]))
+
+    def line_items(self, purchase_order):
+        return sorted(purchase_order.line_items.values_list('sku', 'quantity'))
+
+    def test_line_items_follow_the_purchase_order_commands(self):
+        self.assertEqual(self.line_items(self.first), [('BOLT-10', 5), ('NUT-10', 2)])
+
+        update_purchase_order(self.first, **purchase_order_fields(self.first, items=[{'sku': 'NUT-10', 'quantity': 3}]))
+        self.assertEqual(self.line_items(self.first), [('NUT-10', 3)])
+
+        delete_purchase_order(self.first)
+        self.assertFalse(PurchaseOrderItem.objects.filter(purchase_order_id=self.first.id).exists())
+
+    def test_unchanged_items_are_not_rewritten(self):
+        with CaptureQueriesContext(connection) as queries:
+            update_purchase_order(self.first, **purchase_order_fields(self.first, status='completed'))
+        self.assertFalse(any('purchaseorderitem' in query['sql'] for query in queries.captured_queries))
+
+    def test_only_sku_lines_are_indexed(self):
+        items = [{'sku': 'A', 'quantity': 2.0}, {'sku': 'B', 'quantity': 'many'}, {'quantity': 1}, 'C', {'sku': ''}]
+        self.assertEqual(line_items(items), [('A', 2), ('B', None)])
+        self.assertEqual(line_items({'sku': 'A'}), [])
+
+    def test_sku_search_and_totals(self):
+        response = self.client.get('/api/skus/?search=BOLT')
+        self.assertEqual(response.data['results'], [
+            {'sku': 'BOLT-10', 'purchase_orders': 2, 'quantity': 12},
+            {'sku': 'BOLT-12', 'purchase_orders': 1, 'quantity': None},
+        ])
+        response = self.client.get(f'/api/skus/?vendor={self.vendor.id}')
+        self.assertEqual([row['sku'] for row in response.data['results']], ['BOLT-10', 'NUT-10'])
+
+        detail = self.client.get('/api/skus/BOLT-10/').data
+        self.assertEqual(detail['quantity'], 12)
+        self.assertEqual(detail['vendors'], [
+            {'vendor_id': self.vendor.id, 'purchase_orders': 1, 'quantity': 5},
+            {'vendor_id': self.other_vendor.id, 'purchase_orders': 1, 'quantity': 7},
+        ])
+        self.assertEqual(self.client.get('/api/skus/NOPE/').status_code, 404)
+
+    def test_purchase_orders_filtered_by_sku(self):
+        response = self.client.get('/api/purchase_orders/?sku=BOLT-10&ordering=po_number')
+        self.assertEqual([row['po_number'] for row in response.data['results']], ['PO-1', 'PO-2'])
+
+    def test_backfill_command(self):
+        PurchaseOrderItem.objects.all().delete()
+
+        out = StringIO()
+        call_command('backfill_purchase_order_items', '--chunk-size', '2', stdout=out)
+
+        self.assertIn('Indexed the items of 3 purchase order(s).', out.getvalue())
+        self.assertEqual(self.line_items(self.second), [('BOLT-10', 7), ('BOLT-12', None)])
+
+
+class StreamingExportTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.vendor = make_vendor(on_time_delivery_rate=12.5)
+        make_purchase_order(self.vendor, 'PO-1', status='completed', quality_rating=4, response_hours=3)
+        make_purchase_order(self.vendor, 'PO-2')
+
+    def content(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_no_pagination_streams_same_output_as_serializer(self):
+        vendors = json.loads(self.content(self.client.get('/api/vendors/?no_pagination=true')))
+        purchase_orders = json.loads(self.content(self.client.get('/api/purchase_orders/?no_pagination=true')))
+
+        self.assertEqual(vendors, VendorApi.OutputSerializer(Vendor.objects.order_by('id'), many=True).data)
+        expected = PurchaseOrderApi.OutputSerializer(PurchaseOrder.objects.order_by('order_date', 'id'), many=True).data
+        self.assertEqual(purchase_orders, json.loads(json.dumps(expected)))
+
+    def test_ndjson_export(self):
+        response = self.client.get('/api/purchase_orders/?export=ndjson')
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual([row['po_number'] for row in rows], ['PO-1', 'PO-2'])
+
+    def test_csv_export(self):
+        response = self.client.get('/api/purchase_orders/?export=csv')
+
+        rows = list(csv.DictReader(self.content(response).splitlines()))
+        self.assertEqual(rows[0]['po_number'], 'PO-1')
+        self.assertEqual(json.loads(rows[0]['items']), [{'sku': 'SKU-1', 'quantity': 1}])
+        self.assertEqual(rows[1]['acknowledgment_date'], '')
+
+
+class RowSerializerTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.vendor = make_vendor(quality_rating_avg=3.5)
+        make_purchase_order(self.vendor, 'PO-1', status='completed', quality_rating=4, response_hours=3)
+        make_purchase_order(self.vendor, 'PO-2')
+        HistoricalPerformance.objects.create(
+            vendor=self.vendor, date=timezone.now(),
+            on_time_delivery_rate=50, quality_rating_avg=4, average_response_time=3, fulfillment_rate=50,
+        )
+
+    def test_list_output_matches_output_serializers(self):
+        cases = [
+            ('/api/vendors/', VendorApi.OutputSerializer, Vendor.objects.order_by('id')),
+            ('/api/purchase_orders/', PurchaseOrderApi.OutputSerializer, PurchaseOrder.objects.order_by('order_date', 'id')),
+            (f'/api/purchase_orders/?vendor_id={self.vendor.id}', PurchaseOrderApi.OutputSerializer, PurchaseOrder.objects.filter(vendor=self.vendor)),
+            (f'/api/vendors/{self.vendor.id}/performance', HistoricalPerformanceApi.OutputSerializer, HistoricalPerformance.objects.all()),
+        ]
+        for url, serializer_class, queryset in cases:
+            with self.subTest(url=url):
+                data = self.client.get(url).json()
+                results = data['results'] if isinstance(data, dict) else data
+                expected = json.loads(json.dumps(serializer_class(queryset, many=True).data))
+                self.assertEqual(results, expected)
+
+
+class ExpandVendorTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.vendors = [make_vendor(f'V00{number}') for number in range(5)]
+        for number in range(40):
+            make_purchase_order(self.vendors[number % 5], f'PO-{number}')
+        for hours in range(3):
+            HistoricalPerformance.objects.create(
+                vendor=self.vendors[0], date=timezone.now() - timedelta(hours=hours),
+                on_time_delivery_rate=0, quality_rating_avg=0, average_response_time=0, fulfillment_rate=0,
+            )
+
+    def summary(self, vendor):
+        return {'vendor_id': vendor.id, 'name': vendor.name, 'vendor_code': vendor.vendor_code}
+
+    def test_purchase_orders_embed_vendor_in_constant_queries(self):
+        with self.assertNumQueries(2):
+            results = self.client.get('/api/purchase_orders/?expand=vendor&count=1000').data['results']
+
+        self.assertEqual(len(results), 40)
+        vendors = {vendor.id: vendor for vendor in self.vendors}
+        for row in results:
+            self.assertEqual(row['vendor'], self.summary(vendors[row['vendor_id']]))
+        plain = self.client.get('/api/purchase_orders/?count=1000').data['results']
+        self.assertEqual([{k: v for k, v in row.items() if k != 'vendor'} for row in results], plain)
+
+    def test_performance_history_embeds_vendor(self):
+        results = self.client.get(f'/api/vendors/{self.vendors[0].id}/performance?expand=vendor').data['results']
+
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(row['vendor'] == self.summary(self.vendors[0]) for row in results))
+
+    def test_unknown_expansion(self):
+        response = self.client.get('/api/purchase_orders/?expand=items')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('expand', response.data)
+
+    def test_query_policy_loads_vendor_with_the_rows(self):
+        with self.assertNumQueries(1):
+            names = [str(purchase_order) for purchase_order in get_purchase_orders(expand={'vendor'})]
+        self.assertEqual(len(names), 40)
+
+    def test_admin_changelists_do_not_query_per_row(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+        for url in ['/admin/vendor_management_app/purchaseorder/', '/admin/vendor_management_app/historicalperformance/']:
+            with self.subTest(url=url), CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(url).status_code, 200)
+            self.assertLess(len(queries), 10)
+
+
+@override_settings(VENDOR_METRICS_QUEUE={'BACKEND': 'sync'})
+class PurchaseOrderAdminTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.vendor = make_vendor()
+
+    def form(self, **changes):
+        data = {
+            'po_number': 'PO-1', 'vendor': self.vendor.id, 'order_date_0': '2024-01-01', 'order_date_1': '00:00:00',
+            'delivery_date_0': '2024-01-10', 'delivery_date_1': '00:00:00', 'items': '[{"sku": "A", "quantity": 1}]', 'quantity': 1,
+            'status': 'completed', 'quality_rating': 4, 'issue_date_0': '2024-01-01', 'issue_date_1': '00:00:00',
+            'acknowledgment_date_0': '', 'acknowledgment_date_1': '',
+        }
+        data.update(changes)
+        return data
+
+    def test_admin_writes_go_through_the_commands(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/admin/vendor_management_app/purchaseorder/add/', self.form())
+        self.assertEqual(response.status_code, 302)
+        purchase_order = PurchaseOrder.objects.get()
+        self.assertEqual(list(purchase_order.line_items.values_list('sku', flat=True)), ['A'])
+        self.assertEqual(HistoricalPerformance.objects.get(vendor=self.vendor).fulfillment_rate, 100)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/admin/vendor_management_app/purchaseorder/{purchase_order.id}/change/', self.form(
+                items='[{"sku": "B", "quantity": 2}]', status='pending', quality_rating='',
+            ))
+        purchase_order.refresh_from_db()
+        self.assertEqual((purchase_order.status, purchase_order.version), ('pending', 2))
+        self.assertEqual(list(purchase_order.line_items.values_list('sku', flat=True)), ['B'])
+        self.assertEqual(HistoricalPerformance.objects.get(vendor=self.vendor).fulfillment_rate, 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/admin/vendor_management_app/purchaseorder/{purchase_order.id}/delete/', {'post': 'yes'})
+        self.assertFalse(PurchaseOrder.objects.exists())
+        self.assertEqual(
+            list(PurchaseOrderChange.objects.order_by('id').values_list('action', flat=True)),
+            [PurchaseOrderChange.CREATED, PurchaseOrderChange.UPDATED, PurchaseOrderChange.DELETED],
+        )
+
+
+@override_settings(VENDOR_METRICS_QUEUE={'BACKEND': 'sync'})
+class VendorCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.vendor = make_vendor()
+        self.url = f'/api/vendors/{self.vendor.id}/'
+
+    def vendor_fields(self, **changes):
+        fields = {field: getattr(self.vendor, field) for field in VendorApi.InputSerializer.Meta.fields}
+        fields.update(changes)
+        return fields
+
+    def test_vendor_detail_is_read_through(self):
+        self.assertEqual(self.client.get(self.url).data['name'], 'Vendor V001')
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['vendor_id'], self.vendor.id)
+
+    def test_vendor_update_invalidates(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            update_vendor(self.vendor, **self.vendor_fields(name='Renamed'))
+
+        self.assertEqual(self.client.get(self.url).data['name'], 'Renamed')
+
+    def test_etag_returns_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            update_vendor(self.vendor, **self.vendor_fields(address='Elsewhere'))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_purchase_order_changes_invalidate_performance(self):
+        url = f'/api/vendors/{self.vendor.id}/performance'
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            purchase_order = create_purchase_order(**purchase_order_fields(make_purchase_order(self.vendor, 'PO-1'), po_number='PO-2', status='completed'))
+        self.assertEqual(self.client.get(url).data['results'][0]['fulfillment_rate'], 50)
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            acknowledge_purchase_order(purchase_order)
+        self.assertAlmostEqual(self.client.get(url).data['results'][0]['average_response_time'], 240, places=2)
+
+    def test_long_query_strings_make_valid_keys(self):
+        url = f'/api/vendors/{self.vendor.id}/performance?granularity=day&expand=' + 'vendor,' * 50
+        with warnings.catch_warnings():
+            # memcached refuses the keys locmem warns about.
+            warnings.simplefilter('error', CacheKeyWarning)
+            self.assertEqual(self.client.get(url).status_code, 200)
+            with self.assertNumQueries(0):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_missing_vendor(self):
+        self.assertEqual(self.client.get('/api/vendors/999/').status_code, 404)
+        self.assertEqual(self.client.get('/api/vendors/999/performance').status_code, 404)
+
+
+class PerformanceTimeSeriesTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.vendor = make_vendor()
+        self.now = timezone.now().replace(minute=30, second=0, microsecond=0)
+
+    def snapshot(self, hours_ago, rate):
+        metrics = {'on_time_delivery_rate': rate, 'quality_rating_avg': 0, 'average_response_time': 0, 'fulfillment_rate': rate}
+        record_performance_snapshots({self.vendor.id: metrics}, now=self.now - timedelta(hours=hours_ago))
+
+    def test_one_snapshot_per_hour(self):
+        self.snapshot(0, 10)
+        self.snapshot(0, 20)
+        self.snapshot(1, 30)
+
+        snapshots = HistoricalPerformance.objects.filter(vendor=self.vendor).order_by('-date')
+        self.assertEqual([snapshot.fulfillment_rate for snapshot in snapshots], [20, 30])
+        self.assertEqual(snapshots[0].date, self.now.replace(minute=0))
+
+    def test_posted_snapshots_are_bucketed_and_unique(self):
+        snapshot = {
+            'vendor_id': self.vendor.id, 'date': self.now.isoformat(), 'on_time_delivery_rate': 1, 'quality_rating_avg': 1,
+            'average_response_time': 1, 'fulfillment_rate': 1,
+        }
+        url = f'/api/vendors/{self.vendor.id}/performance'
+        response = self.client.post(url, snapshot, format='json')
+        self.assertEqual(response.status_code, 201)
+        created = HistoricalPerformance.objects.get(id=response.data['historical_performance_id'])
+        self.assertEqual((created.granularity, created.date), ('hour', self.now.replace(minute=0)))
+
+        # Same hour, another minute.
+        duplicate = dict(snapshot, date=(self.now + timedelta(minutes=10)).isoformat())
+        self.assertEqual(self.client.post(url, duplicate, format='json').status_code, 400)
+        self.assertEqual(self.client.post(url, dict(duplicate, granularity='day'), format='json').status_code, 201)
+
+        # Moving another snapshot onto the hour is rejected as well, re-saving it in place isn't.
+        other = HistoricalPerformanceApi.InputSerializer(data=dict(snapshot, date=(self.now - timedelta(hours=1)).isoformat()))
+        other.is_valid(raise_exception=True)
+        other = create_historical_performance(**other.validated_data)
+        self.assertFalse(HistoricalPerformanceApi.InputSerializer(other, data=snapshot).is_valid())
+        self.assertTrue(HistoricalPerformanceApi.InputSerializer(other, data=dict(snapshot, date=other.date.isoformat())).is_valid())
+
+    def test_compaction_rolls_up_old_snapshots(self):
+        for hours_ago in range(24 * 5):
+            self.snapshot(hours_ago, hours_ago % 2 * 100)
+
+        compacted = compact_historical_performance(hour_retention=timedelta(days=2), day_retention=timedelta(days=90), now=self.now)
+
+        snapshots = HistoricalPerformance.objects.filter(vendor=self.vendor)
+        self.assertEqual(compacted['day'], 0)
+        self.assertGreater(compacted['hour'], 0)
+        self.assertFalse(snapshots.filter(granularity='hour', date__lt=self.now - timedelta(days=3)).exists())
+        days = snapshots.filter(granularity='day')
+        self.assertTrue(days.exists())
+        self.assertEqual(snapshots.filter(granularity='hour').count() + compacted['hour'], 24 * 5)
+        # Every full day holds as many odd as even hours.
+        self.assertIn(50, days.values_list('fulfillment_rate', flat=True))
+
+    def test_range_query(self):
+        for hours_ago in range(48):
+            self.snapshot(hours_ago, 100 if hours_ago < 24 else 0)
+        url = f'/api/vendors/{self.vendor.id}/performance'
+
+        response = self.client.get(url, {'granularity': 'hour', 'from': (self.now - timedelta(hours=3)).isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(response.data['results'][-1]['fulfillment_rate'], 100)
+
+        response = self.client.get(url, {'granularity': 'week', 'from': (self.now - timedelta(days=7)).isoformat()})
+        self.assertEqual(response.data['granularity'], 'week')
+        # 48 hours fall in at most two weeks.
+        self.assertIn(len(response.data['results']), (1, 2))
+
+        self.assertEqual(self.client.get(url, {'granularity': 'month'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/vendors/999/performance', {'granularity': 'day'}).status_code, 404)
+
+
+@override_settings(VENDOR_METRICS_QUEUE={'BACKEND': 'sync'})
+class VendorRankingTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        # (on-time / fulfillment rate, response hours) per vendor: V1 is the best on-time, V3 the fastest.
+        self.vendors = []
+        for code, status, response_hours in [('V1', 'completed', 48), ('V2', 'pending', 24), ('V3', 'pending', 1)]:
+            vendor = make_vendor(code)
+            make_purchase_order(vendor, f'PO-{code}', status=status, response_hours=response_hours)
+            self.vendors.append(vendor)
+        rebuild_vendor_rankings()
+
+    def test_recompute_refreshes_ranking(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            purchase_order = PurchaseOrder.objects.get(po_number='PO-V2')
+            update_purchase_order(purchase_order, **purchase_order_fields(purchase_order, status='completed'))
+        self.assertEqual(VendorRanking.objects.get(vendor=self.vendors[1]).fulfillment_rate, 100)
+
+    def test_top_n(self):
+        response = self.client.get('/api/vendors/ranking/', {'ordering': 'average_response_time', 'count': 2})
+        self.assertEqual([row['vendor_code'] for row in response.data['results']], ['V3', 'V2'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([row['vendor_code'] for row in response.data['results']], ['V1'])
+
+        response = self.client.get('/api/vendors/ranking/', {'min_on_time_delivery_rate': 50})
+        self.assertEqual([row['vendor_id'] for row in response.data['results']], [self.vendors[0].id])
+        self.assertEqual(self.client.get('/api/vendors/ranking/', {'ordering': 'name'}).status_code, 400)
+
+    def test_standing(self):
+        response = self.client.get(f'/api/vendors/{self.vendors[2].id}/ranking/')
+        self.assertEqual(response.data['vendors'], 3)
+        self.assertEqual(response.data['metrics']['average_response_time']['rank'], 1)
+        self.assertAlmostEqual(response.data['metrics']['average_response_time']['percentile'], 66.67)
+        self.assertEqual(response.data['metrics']['on_time_delivery_rate']['rank'], 2)
+
+        self.assertEqual(self.client.get(f'/api/vendors/{make_vendor("V4").id}/ranking/').status_code, 404)
+
+
+class RecomputeVendorMetricsTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.vendors = [make_vendor(f'V{index}') for index in range(3)]
+        for vendor in self.vendors:
+            make_purchase_order(vendor, f'PO-{vendor.vendor_code}', status='completed', response_hours=2)
+        self.checkpoint = os.path.join(tempfile.mkdtemp(), 'checkpoint.json')
+
+    def recompute(self, *args):
+        out = StringIO()
+        call_command('recompute_vendor_metrics', '--workers', '1', '--chunk-size', '2', '--checkpoint', self.checkpoint, *args, stdout=out)
+        return out.getvalue()
+
+    def test_recompute_writes_vendors_snapshots_and_rankings(self):
+        output = self.recompute()
+
+        self.assertIn('Recomputed the metrics of 3 vendor(s)', output)
+        self.assertIn('2/3 vendors', output)
+        for vendor in Vendor.objects.all():
+            self.assertEqual(vendor.fulfillment_rate, 100)
+            self.assertEqual(vendor.average_response_time, 2)
+        self.assertEqual(HistoricalPerformance.objects.filter(granularity='hour').count(), 3)
+        self.assertEqual(VendorRanking.objects.count(), 3)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_resumes_from_checkpoint(self):
+        now = timezone.now() - timedelta(days=1)
+        with open(self.checkpoint, 'w') as checkpoint:
+            json.dump({'now': now.isoformat(), 'done': [[self.vendors[0].id, self.vendors[1].id]]}, checkpoint)
+
+        output = self.recompute()
+
+        self.assertIn('Resuming the run', output)
+        self.assertIn('Recomputed the metrics of 1 vendor(s)', output)
+        self.assertEqual(list(Vendor.objects.filter(fulfillment_rate=100).values_list('id', flat=True)), [self.vendors[2].id])
+        # The resumed chunks are computed as of the interrupted run's start.
+        self.assertEqual(HistoricalPerformance.objects.get().date, now.replace(minute=0, second=0, microsecond=0))
+
+        with open(self.checkpoint, 'w') as checkpoint:
+            json.dump({'now': now.isoformat(), 'done': [[self.vendors[0].id, self.vendors[2].id]]}, checkpoint)
+        self.assertIn('Recomputed the metrics of 3 vendor(s)', self.recompute('--restart'))
+
+
+@override_settings(VENDOR_METRICS_QUEUE={'BACKEND': 'sync'})
+class AsyncApiTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.vendor = make_vendor()
+        self.purchase_order = make_purchase_order(self.vendor, 'PO-1', status='completed', quality_rating=4)
+        self.async_client = AsyncClient()
+
+    async def test_reads_match_sync_api(self):
+        for url in ['/vendors/', f'/vendors/{self.vendor.id}/', '/purchase_orders/', f'/purchase_orders/{self.purchase_order.id}/',
+                    f'/purchase_orders/?vendor_id={self.vendor.id}']:
+            with self.subTest(url=url):
+                response = await self.async_client.get(f'/api/async{url}')
+                self.assertEqual(response.status_code, 200)
+                expected = await sync_to_async(self.client.get)(f'/api{url}')
+                self.assertEqual(response.json(), json.loads(expected.content))
+
+        self.assertEqual((await self.async_client.get('/api/async/vendors/999/')).status_code, 404)
+
+    async def test_keyset_pagination(self):
+        await sync_to_async(make_vendor)('V002')
+        response = (await self.async_client.get('/api/async/vendors/', {'count': 1})).json()
+        self.assertEqual(response['count'], 2)
+
+        response = (await self.async_client.get(response['next'])).json()
+        self.assertEqual([row['vendor_code'] for row in response['results']], ['V002'])
+        self.assertIsNone(response['next'])
+
+    async def test_invalid_cursor(self):
+        await sync_to_async(update_historical_performance_metrics)(self.vendor)
+        for url in ['/api/async/vendors/', '/api/async/purchase_orders/', f'/api/async/vendors/{self.vendor.id}/performance']:
+            with self.subTest(url=url):
+                response = await self.async_client.get(url, {'cursor': '!!'})
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.json(), {'detail': 'Invalid cursor'})
+
+    async def test_purchase_order_writes(self):
+        fields = {**purchase_order_fields(self.purchase_order, po_number='PO-2', status='pending'), 'vendor': self.vendor.id}
+        response = await self.async_client.post('/api/async/purchase_orders/', fields, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        po_id = response.json()['po_id']
+
+        response = await self.async_client.post(f'/api/async/purchase_orders/{po_id}/acknowledge/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone((await PurchaseOrder.objects.aget(id=po_id)).acknowledgment_date)
+        response = await self.async_client.post(f'/api/async/purchase_orders/{po_id}/acknowledge/')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['detail'], "Purchase order already acknowledged.")
+
+        response = await self.async_client.post('/api/async/purchase_orders/', fields, content_type='application/json')
+        self.assertIn('po_number', response.json())
+
+        # on_commit callbacks run on the sync thread's connection, out of reach of this test.
+        await aupdate_historical_performance_metrics(self.vendor.id)
+        response = await self.async_client.get(f'/api/async/vendors/{self.vendor.id}/performance')
+        self.assertEqual(response.json()['results'][0]['fulfillment_rate'], 50)
+
+    async def test_acompute_vendor_metrics(self):
+        self.assertEqual(
+            await acompute_vendor_metrics(self.vendor.id, percentiles=True),
+            await sync_to_async(compute_vendor_metrics)(self.vendor.id, percentiles=True),
+        )
+
+
+class SqliteBackendTests(TransactionTestCase):
+    def test_pragmas_are_applied(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -64000)
+
+    def test_atomic_takes_the_write_lock_up_front(self):
+        with CaptureQueriesContext(connection) as queries, transaction.atomic():
+            make_vendor()
+        self.assertEqual(queries.captured_queries[0]['sql'], 'BEGIN IMMEDIATE')
+
+
+@override_settings(ROOT_URLCONF='vendor_management.urls_api', MIDDLEWARE=settings_api.MIDDLEWARE, REST_FRAMEWORK=settings_api.REST_FRAMEWORK)
+class ApiSettingsTests(APITestCase):
+    # Apps and templates can't be swapped in this process: the profile itself runs in a fresh interpreter.
+    PROFILE_CHILD = """
+import json, os, sys
+from django.conf import settings
+settings.DATABASES['default']['NAME'] = os.environ['PROFILE_DB']
+import django
+django.setup()
+from django.apps import apps
+from django.core.management import call_command
+from django.test import Client
+call_command('migrate', verbosity=0)
+drf_before_request = 'rest_framework' in sys.modules
+
+client = Client(SERVER_NAME='localhost')
+created = client.post('/api/vendors/', {
+    'name': 'Vendor V001', 'contact_details': 'c', 'address': 'a', 'vendor_code': 'V001', 'on_time_delivery_rate': 0,
+    'quality_rating_avg': 0, 'average_response_time': 0, 'fulfillment_rate': 0,
+}, content_type='application/json')
+listing = client.get('/api/vendors/')
+print(json.dumps({
+    'created': created.status_code, 'count': listing.json()['count'], 'content_type': listing['Content-Type'],
+    'browsable': client.get('/api/vendors/', HTTP_ACCEPT='text/html').status_code, 'admin': client.get('/admin/').status_code,
+    'apps': [app.name for app in apps.get_app_configs()], 'sessions': 'django.contrib.sessions.middleware' in sys.modules,
+    'drf_before_request': drf_before_request,
+}))
+"""
+
+    def run_api_profile(self, *args):
+        with tempfile.TemporaryDirectory() as directory:
+            env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'vendor_management.settings_api', 'PROFILE_DB': os.path.join(directory, 'db.sqlite3')}
+            return subprocess.run([sys.executable, *args], env=env, cwd=settings.BASE_DIR, capture_output=True, text=True, check=True)
+
+    def test_system_checks_pass(self):
+        self.assertIn("System check identified no issues", self.run_api_profile('manage.py', 'check').stdout)
+
+    def test_api_without_admin(self):
+        result = json.loads(self.run_api_profile('-c', self.PROFILE_CHILD).stdout)
+        self.assertEqual((result['created'], result['count']), (201, 1))
+        self.assertEqual(result['content_type'], 'application/json')
+        # JSON only: no browsable API to negotiate.
+        self.assertEqual(result['browsable'], 406)
+        self.assertEqual(result['admin'], 404)
+        self.assertEqual(result['apps'], ['vendor_management_app'])
+        self.assertFalse(result['sessions'])
+        # Setup, system checks and migrate leave the views, and with them DRF, unimported.
+        self.assertFalse(result['drf_before_request'])
+
+    async def test_async_views_stay_async(self):
+        match = resolve('/api/async/vendors/')
+        self.assertTrue(iscoroutinefunction(match.func))
+        self.assertTrue(match.func.csrf_exempt)
+        self.assertFalse(iscoroutinefunction(resolve('/api/vendors/').func))
+        self.assertEqual((await AsyncClient().get('/api/async/vendors/')).status_code, 200)
+
+
+@override_settings(VENDOR_INSTRUMENTATION={'ENABLED': True, 'N_PLUS_ONE_THRESHOLD': 3})
+class InstrumentationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        registry.clear()
+        self.vendor = make_vendor()
+
+    def test_server_timing_header(self):
+        response = self.client.get(f'/api/vendors/{self.vendor.id}/')
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('svc.get_vendor_detail;dur=', response['Server-Timing'])
+
+        response = self.client.get('/api/purchase_orders/')
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="2 queries"')
+
+    async def test_async_requests_stay_async(self):
+        async def get_response(request):
+            return HttpResponse()
+        self.assertTrue(iscoroutinefunction(InstrumentationMiddleware(get_response)))
+        self.assertFalse(iscoroutinefunction(InstrumentationMiddleware(lambda request: HttpResponse())))
+
+        response = await AsyncClient().get(f'/api/async/vendors/{self.vendor.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="1 queries"')
+
+    def test_prometheus_metrics(self):
+        self.client.get(f'/api/vendors/{self.vendor.id}/')
+
+        response = self.client.get('/metrics', REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, 200)
+        metrics = response.content.decode()
+        self.assertIn('vms_requests_total{method="GET",route="api/vendors/<int:vendor_id>/",status="200"} 1', metrics)
+        self.assertIn('vms_service_calls_total{function="get_vendor_detail"} 1', metrics)
+        self.assertIn('vms_request_duration_seconds_bucket{method="GET",route="api/vendors/<int:vendor_id>/",le="+Inf"} 1', metrics)
+
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.1').status_code, 404)
+
+    def test_n_plus_one_is_flagged(self):
+        for number in range(3):
+            make_purchase_order(self.vendor, f'PO-{number}')
+
+        with profile() as request_profile:
+            [str(purchase_order) for purchase_order in PurchaseOrder.objects.all()]
+
+        [(statement, count)] = request_profile.n_plus_one(3)
+        self.assertEqual(count, 3)
+        self.assertIn('"vendor_management_app_vendor"."id" = ?', statement)
+
+    @override_settings(VENDOR_INSTRUMENTATION={'ENABLED': False})
+    def test_disabled(self):
+        self.client = APIClient()
+        self.assertNotIn('Server-Timing', self.client.get('/api/vendors/'))
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='127.0.0.1').status_code, 404)
@@ -1,14 +1,25 @@
 from django.urls import path
-from vendor_management_app import views
+from vendor_management_app.lazy_views import lazy_view
+
+
+def view(name):
+    return lazy_view(f'vendor_management_app.views.{name}')
+
 
 urlpatterns = [
 
-    path('vendors/', views.VendorApi.as_view()),
-    path('vendors/<int:vendor_id>/', views.VendorApi.as_view()),
-    path('purchase_orders/', views.PurchaseOrderApi.as_view()),
-    path('purchase_orders/', views.PurchaseOrderApi.as_view()),
-    path('purchase_orders/<int:po_id>/', views.PurchaseOrderApi.as_view()),
-    path('purchase_orders/<int:po_id>/acknowledge/', views.AcknowledgePurchaseOrder.as_view()),
-    path('vendors/<int:vendor_id>/performance', views.HistoricalPerformanceApi.as_view()),    
+    path('vendors/', view('VendorApi')),
+    path('vendors/<int:vendor_id>/', view('VendorApi')),
+    path('vendors/ranking/', view('VendorRankingApi')),
+    path('vendors/<int:vendor_id>/ranking/', view('VendorRankingApi')),
+    path('purchase_orders/', view('PurchaseOrderApi')),
+    path('purchase_orders/bulk/', view('PurchaseOrderBulkApi')),
+    path('purchase_orders/batch/', view('PurchaseOrderBatchApi')),
+    path('purchase_orders/<int:po_id>/', view('PurchaseOrderApi')),
+    path('purchase_orders/<int:po_id>/acknowledge/', view('AcknowledgePurchaseOrder')),
+    path('vendors/<int:vendor_id>/performance', view('HistoricalPerformanceApi')),    
+    path('changes/', view('PurchaseOrderChangeApi')),
+    path('skus/', view('SkuApi')),
+    path('skus/<str:sku>/', view('SkuApi')),
 
 ]
@@ -1,60 +1,100 @@
+from datetime import timedelta
+from django.http import Http404
 from django.shortcuts import get_object_or_404, render
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, serializers
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils import timezone
 from vendor_management_app.models import Vendor, PurchaseOrder, HistoricalPerformance
+from vendor_management_app.pagination import KeysetPagination
+from vendor_management_app.row_serializers import (
+    vendor_rows, purchase_order_rows, historical_performance_rows, purchase_order_vendor_rows, historical_performance_vendor_rows,
+    purchase_order_change_rows, format_datetime
+)
+from vendor_management_app.streaming import EXPORT_FORMATS, streaming_export_response
 from vendor_management_app.services.commands import (
     create_vendor, update_vendor, delete_vendor,
-    create_purchase_order, update_purchase_order, delete_purchase_order,
-    create_historical_performance, update_historical_performance, delete_historical_performance, update_historical_performance_metrics
+    create_purchase_order, update_purchase_order, delete_purchase_order, acknowledge_purchase_order,
+    bucket_start, create_historical_performance, update_historical_performance, delete_historical_performance
 )
+from vendor_management_app.services.batch import MAX_OPERATIONS, apply_purchase_order_batch
+from vendor_management_app.services.imports import MAX_CHUNK_SIZE, import_purchase_orders, parse_purchase_order_stream
+from vendor_management_app.services.cache import get_or_set_vendor_entry, request_entry_name
+from vendor_management_app.services.metrics import METRIC_FIELDS
 from vendor_management_app.services.queries import (
-    get_vendors, get_purchase_orders, get_historical_performances
+    EXPANSIONS, get_vendors, get_vendor_detail, get_purchase_orders, get_historical_performances, get_performance_series,
+    get_vendor_rankings, get_vendor_standing, get_sku_totals, get_sku_detail, get_purchase_order_changes
 )
 
 
+def conditional_response(request, data, etag):
+    # Answer If-None-Match with 304 when the client already has this representation.
+    if_none_match = request.headers.get('If-None-Match', '')
+    client_etags = [value.strip().removeprefix('W/') for value in if_none_match.split(',')]
+    if etag in client_etags or '*' in client_etags:
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(data, status=status.HTTP_200_OK)
+    response['ETag'] = etag
+    return response
+
+
+def parse_expand(params) -> set:
+    # `?expand=vendor` embeds the related vendor's summary in each listed row.
+    expand = {value for value in params.get('expand', '').split(',') if value}
+    unknown = expand.difference(EXPANSIONS)
+    if unknown:
+        raise serializers.ValidationError({'expand': [f"Unknown expansion: {', '.join(sorted(unknown))}."]})
+    return expand
+
+
 class VendorApi(APIView):
-    paginator = PageNumberPagination()
+    pagination_class = KeysetPagination
+    ordering = ('id',)
 
     class InputSerializer(serializers.ModelSerializer):
+        version = serializers.IntegerField(required=False, help_text="On update, the version the changes are based on; 409 when the vendor has changed since.")
+
         class Meta:
             model = Vendor
-            fields = ['name', 'contact_details', 'address', 'vendor_code', 'on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate']
+            fields = ['name', 'contact_details', 'address', 'vendor_code', 'on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate', 'version']
 
     class OutputSerializer(serializers.ModelSerializer):
         vendor_id = serializers.IntegerField(source="id")
 
         class Meta:
             model = Vendor
-            fields = ['vendor_id', 'name', 'contact_details', 'address', 'vendor_code', 'on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate']
+            fields = ['vendor_id', 'name', 'contact_details', 'address', 'vendor_code', 'on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate', 'metrics_updated_at', 'version']
 
     def get(self, request, *args, **kwargs):
         vendor_id = kwargs.get('vendor_id')
 
         if vendor_id:
-            vendor = get_object_or_404(Vendor, id=vendor_id)
-            serializer = self.OutputSerializer(vendor)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            entry = get_vendor_detail(vendor_id)
+            if entry is None:
+                raise Http404
+            return conditional_response(request, *entry)
 
         params = request.GET.dict()
         vendors = get_vendors()
         no_pagination = request.GET.get('no_pagination', False) == 'true'
+        export = request.GET.get('export')
 
+        if export in EXPORT_FORMATS:
+            return streaming_export_response(vendors.order_by(*self.ordering), vendor_rows, export, 'vendors')
         if no_pagination:
-            return Response(self.OutputSerializer(vendors, many=True, context={'request': request}).data, status=status.HTTP_200_OK)
+            return streaming_export_response(vendors.order_by(*self.ordering), vendor_rows, 'json', 'vendors')
 
-        self.paginator.page_size = request.GET.get('count', 10)
-        result_page = self.paginator.paginate_queryset(vendors, request)
-        serializer = self.OutputSerializer(result_page, many=True, context={'request': request})
-        return self.paginator.get_paginated_response(serializer.data)
+        paginator = self.pagination_class(ordering=self.ordering)
+        result_page = paginator.paginate_queryset(vendor_rows.values_list(vendors), request)
+        return paginator.get_paginated_response(vendor_rows.to_dicts(result_page))
 
     def post(self, request, *args, **kwargs):
         serializer = self.InputSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        serializer.validated_data.pop('version', None)
         vendor = create_vendor(**serializer.validated_data)
         return Response(self.OutputSerializer(vendor).data, status=status.HTTP_201_CREATED)
 
@@ -74,15 +114,54 @@ class VendorApi(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class VendorRankingApi(APIView):
+    pagination_class = KeysetPagination
+
+    class FilterSerializer(serializers.Serializer):
+        ordering = serializers.ChoiceField(
+            choices=[prefix + field for field in METRIC_FIELDS for prefix in ('', '-')],
+            required=False, default='-on_time_delivery_rate'
+        )
+
+        def get_fields(self):
+            fields = super().get_fields()
+            for field in METRIC_FIELDS:
+                fields[f'min_{field}'] = serializers.FloatField(required=False)
+                fields[f'max_{field}'] = serializers.FloatField(required=False)
+            return fields
+
+    def get(self, request, *args, **kwargs):
+        vendor_id = kwargs.get('vendor_id')
+
+        if vendor_id:
+            standing = get_vendor_standing(vendor_id)
+            if standing is None:
+                get_object_or_404(Vendor, id=vendor_id)
+                return Response({"error": f"Vendor with ID {vendor_id} has not been ranked yet."}, status=status.HTTP_404_NOT_FOUND)
+            return Response(standing)
+
+        serializer = self.FilterSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        filters = dict(serializer.validated_data)
+        ordering = filters.pop('ordering')
+
+        # The tie-breaker follows the metric's direction so both run along the (metric, vendor) index.
+        tie_breaker = '-vendor_id' if ordering.startswith('-') else 'vendor_id'
+        paginator = self.pagination_class(ordering=(ordering, tie_breaker))
+        result_page = paginator.paginate_queryset(get_vendor_rankings(filters), request)
+        return paginator.get_paginated_response(result_page)
+
+
 class PurchaseOrderApi(APIView):
-    paginator = PageNumberPagination()
+    pagination_class = KeysetPagination
 
     class InputSerializer(serializers.ModelSerializer):
         vendor = serializers.PrimaryKeyRelatedField(queryset=Vendor.objects.all())
+        version = serializers.IntegerField(required=False, help_text="On update, the version the changes are based on; 409 when the purchase order has changed since.")
 
         class Meta:
             model = PurchaseOrder
-            fields = ['po_number', 'vendor', 'order_date', 'delivery_date', 'items', 'quantity', 'status', 'quality_rating', 'issue_date', 'acknowledgment_date']
+            fields = ['po_number', 'vendor', 'order_date', 'delivery_date', 'items', 'quantity', 'status', 'quality_rating', 'issue_date', 'acknowledgment_date', 'version']
 
     class OutputSerializer(serializers.ModelSerializer):
         po_id = serializers.IntegerField(source="id")
@@ -90,7 +169,44 @@ class PurchaseOrderApi(APIView):
 
         class Meta:
             model = PurchaseOrder
-            fields = ['po_id', 'po_number', 'vendor_id', 'order_date', 'delivery_date', 'items', 'quantity', 'status', 'quality_rating', 'issue_date', 'acknowledgment_date']
+            fields = ['po_id', 'po_number', 'vendor_id', 'order_date', 'delivery_date', 'items', 'quantity', 'status', 'quality_rating', 'issue_date', 'acknowledgment_date', 'version']
+
+    class FilterSerializer(serializers.Serializer):
+        # Keyset pagination needs non-null sort keys, so nullable columns can be filtered on but not sorted by.
+        ordering = serializers.ChoiceField(
+            choices=[prefix + field for field in ('order_date', 'delivery_date', 'issue_date', 'po_number') for prefix in ('', '-')],
+            required=False, default='order_date'
+        )
+        vendor = serializers.IntegerField(required=False)
+        status = serializers.CharField(required=False, help_text="Comma separated statuses.")
+        sku = serializers.CharField(required=False, max_length=100)
+        acknowledged = serializers.BooleanField(required=False, allow_null=True, default=None)
+        overdue = serializers.BooleanField(required=False, allow_null=True, default=None)
+        min_quality_rating = serializers.FloatField(required=False)
+        max_quality_rating = serializers.FloatField(required=False)
+
+        def get_fields(self):
+            fields = super().get_fields()
+            for field in ('order_date', 'delivery_date', 'issue_date'):
+                fields[f'{field}_after'] = serializers.DateTimeField(required=False)
+                fields[f'{field}_before'] = serializers.DateTimeField(required=False)
+            return fields
+
+        def validate_status(self, value):
+            return [status for status in value.split(',') if status]
+
+        def validate(self, data):
+            return {name: value for name, value in data.items() if value is not None}
+
+    @classmethod
+    def list_params(cls, params) -> tuple:
+        """(filters, ordering) of a listing request, raising ValidationError on bad parameters."""
+        serializer = cls.FilterSerializer(data=params)
+        serializer.is_valid(raise_exception=True)
+        filters = dict(serializer.validated_data)
+        ordering = filters.pop('ordering')
+        # The id tie-breaker follows the field's direction so both run along the same index.
+        return filters, (ordering, '-id' if ordering.startswith('-') else 'id')
 
     def get(self, request, *args, **kwargs):
         po_id = request.query_params.get('po_id')
@@ -104,26 +220,31 @@ class PurchaseOrderApi(APIView):
             purchase_order = get_object_or_404(PurchaseOrder, id=kwargs['po_id'])
             serializer = self.OutputSerializer(purchase_order)
             return Response(serializer.data, status=status.HTTP_200_OK)
-        elif vendor_id:
-            purchase_orders = PurchaseOrder.objects.filter(vendor__id=vendor_id)
-            serializer = self.OutputSerializer(purchase_orders, many=True, context={'request': request})
-            return Response(serializer.data, status=status.HTTP_200_OK)
+        expand = parse_expand(request.query_params)
+        filters, ordering = self.list_params(request.query_params)
+        rows = purchase_order_vendor_rows if 'vendor' in expand else purchase_order_rows
+        purchase_orders = get_purchase_orders(expand, filters)
+
+        if vendor_id:
+            purchase_orders = purchase_orders.filter(vendor__id=vendor_id).order_by(*ordering)
+            return Response(rows.to_dicts(rows.values_list(purchase_orders)), status=status.HTTP_200_OK)
         else:
-            params = request.GET.dict()
-            purchase_orders = get_purchase_orders()
             no_pagination = request.GET.get('no_pagination', False) == 'true'
+            export = request.GET.get('export')
 
+            if export in EXPORT_FORMATS:
+                return streaming_export_response(purchase_orders.order_by(*ordering), rows, export, 'purchase_orders')
             if no_pagination:
-                return Response(self.OutputSerializer(purchase_orders, many=True, context={'request': request}).data, status=status.HTTP_200_OK)
+                return streaming_export_response(purchase_orders.order_by(*ordering), rows, 'json', 'purchase_orders')
 
-            self.paginator.page_size = request.GET.get('count', 10)
-            result_page = self.paginator.paginate_queryset(purchase_orders, request)
-            serializer = self.OutputSerializer(result_page, many=True, context={'request': request})
-            return self.paginator.get_paginated_response(serializer.data)
+            paginator = self.pagination_class(ordering=ordering)
+            result_page = paginator.paginate_queryset(rows.values_list(purchase_orders), request)
+            return paginator.get_paginated_response(rows.to_dicts(result_page))
 
     def post(self, request, *args, **kwargs):
         serializer = self.InputSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        serializer.validated_data.pop('version', None)
         vendor = serializer.validated_data.pop('vendor', None)
         purchase_order = create_purchase_order(vendor=vendor, **serializer.validated_data)
         return Response(self.OutputSerializer(purchase_order).data, status=status.HTTP_201_CREATED)
@@ -140,51 +261,231 @@ class PurchaseOrderApi(APIView):
         delete_purchase_order(purchase_order=purchase_order)
         return Response(status=status.HTTP_204_NO_CONTENT)
     
+class PurchaseOrderBulkApi(APIView):
+    # Streams are parsed here instead of through DRF parsers, so large uploads are never fully buffered.
+    content_types = {
+        'application/x-ndjson': 'jsonl',
+        'application/jsonl': 'jsonl',
+        'text/csv': 'csv',
+    }
+
+    class FilterSerializer(serializers.Serializer):
+        chunk_size = serializers.IntegerField(required=False, default=500, min_value=1, max_value=MAX_CHUNK_SIZE)
+
+    def post(self, request, *args, **kwargs):
+        content_type = request.content_type.split(';')[0].strip()
+        params = self.FilterSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        chunk_size = params.validated_data['chunk_size']
+
+        if content_type in self.content_types:
+            rows = parse_purchase_order_stream(request.stream or [], self.content_types[content_type])
+        elif isinstance(request.data, list):
+            rows = ((row_number, data, None) for row_number, data in enumerate(request.data, start=1))
+        else:
+            return Response({"detail": "Expected a JSON list, JSON Lines or CSV body."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        report = import_purchase_orders(rows, chunk_size=chunk_size)
+        return Response(report, status=status.HTTP_200_OK)
+
+class PurchaseOrderBatchApi(APIView):
+    class InputSerializer(serializers.Serializer):
+        operations = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=MAX_OPERATIONS)
+
+    result_status = {
+        'create': status.HTTP_201_CREATED,
+        'update': status.HTTP_202_ACCEPTED,
+        'delete': status.HTTP_204_NO_CONTENT,
+        'acknowledge': status.HTTP_200_OK,
+    }
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.InputSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        report = apply_purchase_order_batch(serializer.validated_data['operations'])
+        if report['errors']:
+            return Response({'errors': report['errors']}, status=status.HTTP_409_CONFLICT if report['conflict'] else status.HTTP_400_BAD_REQUEST)
+
+        results = []
+        for result in report['results']:
+            data = {'index': result['index'], 'op': result['op'], 'status': self.result_status[result['op']]}
+            if 'purchase_order' in result:
+                data['data'] = PurchaseOrderApi.OutputSerializer(result['purchase_order']).data
+            else:
+                data['po_id'] = result['po_id']
+            results.append(data)
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+
 class AcknowledgePurchaseOrder(APIView):
+    # 409 when the purchase order is already acknowledged, or is no longer at the optional `version`.
+    class InputSerializer(serializers.Serializer):
+        version = serializers.IntegerField(required=False)
+
     def post(self, request, po_id, *args, **kwargs):
         purchase_order = get_object_or_404(PurchaseOrder, id=po_id)
+        serializer = self.InputSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
 
-        if purchase_order.acknowledgment_date:
-            return Response({"detail": "Purchase order already acknowledged."},
-                            status=status.HTTP_400_BAD_REQUEST)
-
-        purchase_order.acknowledgment_date = timezone.now()
-        purchase_order.save()
-        update_historical_performance_metrics(purchase_order.vendor)
+        acknowledge_purchase_order(purchase_order, **serializer.validated_data)
 
         return Response({"detail": "Purchase order acknowledged successfully."},
                         status=status.HTTP_200_OK)
 
 
+class PurchaseOrderChangeApi(APIView):
+    class FilterSerializer(serializers.Serializer):
+        since = serializers.IntegerField(required=False, default=0, min_value=0, help_text="Last sequence number seen.")
+        vendor = serializers.IntegerField(required=False)
+        count = serializers.IntegerField(required=False, default=100, min_value=1, max_value=1000)
+
+    @classmethod
+    def feed_params(cls, params) -> dict:
+        serializer = cls.FilterSerializer(data=params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    @classmethod
+    def rows(cls, params: dict):
+        """values_list rows of the next batch, one more than `count` to tell whether there is more."""
+        changes = get_purchase_order_changes(params['since'], params.get('vendor'))
+        return purchase_order_change_rows.values_list(changes)[:params['count'] + 1]
+
+    @classmethod
+    def batch(cls, params: dict, rows) -> dict:
+        rows = list(rows)
+        has_more = len(rows) > params['count']
+        results = purchase_order_change_rows.to_dicts(rows[:params['count']])
+        return {
+            'results': results,
+            # The `since` of the next request.
+            'last_seq': results[-1]['seq'] if results else params['since'],
+            'has_more': has_more,
+        }
+
+    def get(self, request, *args, **kwargs):
+        params = self.feed_params(request.query_params)
+        return Response(self.batch(params, self.rows(params)), status=status.HTTP_200_OK)
+
+
+class SkuApi(APIView):
+    pagination_class = KeysetPagination
+    ordering = ('sku',)
+
+    class FilterSerializer(serializers.Serializer):
+        search = serializers.CharField(required=False, max_length=100, help_text="SKU prefix, case-sensitive.")
+        vendor = serializers.IntegerField(required=False)
+
+    def get(self, request, *args, **kwargs):
+        sku = kwargs.get('sku')
+
+        if sku:
+            detail = get_sku_detail(sku)
+            if detail is None:
+                return Response({"error": f"No purchase order has SKU {sku}."}, status=status.HTTP_404_NOT_FOUND)
+            return Response(detail)
+
+        serializer = self.FilterSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        filters = serializer.validated_data
+
+        paginator = self.pagination_class(ordering=self.ordering)
+        result_page = paginator.paginate_queryset(get_sku_totals(filters.get('search'), filters.get('vendor')), request)
+        return paginator.get_paginated_response(result_page)
+
+
 class HistoricalPerformanceApi(APIView):
-    paginator = PageNumberPagination()
+    pagination_class = KeysetPagination
+    ordering = ('-date', '-id')
 
     class InputSerializer(serializers.ModelSerializer):
         vendor_id = serializers.PrimaryKeyRelatedField(queryset=Vendor.objects.all())
+        granularity = serializers.ChoiceField(choices=HistoricalPerformance.GRANULARITY_CHOICES, default=HistoricalPerformance.HOUR)
 
         class Meta:
             model = HistoricalPerformance
-            fields = ['vendor_id', 'date', 'on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate']
+            fields = ['vendor_id', 'date', 'granularity', 'on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate']
+
+        def validate(self, data):
+            # One snapshot per vendor and bucket, keyed by the bucket's start as the recomputes and compaction write them.
+            date = bucket_start(data['date'], data['granularity'])
+            duplicates = HistoricalPerformance.objects.filter(vendor=data['vendor_id'], granularity=data['granularity'], date=date)
+            if self.instance is not None:
+                duplicates = duplicates.exclude(id=self.instance.id)
+            if duplicates.exists():
+                raise serializers.ValidationError("The vendor already has a snapshot for this bucket.", code='unique')
+            return data
 
     class OutputSerializer(serializers.ModelSerializer):
         historical_performance_id = serializers.IntegerField(source="id")
 
         class Meta:
             model = HistoricalPerformance
-            fields = ['historical_performance_id', 'vendor_id', 'date', 'on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate']
+            fields = ['historical_performance_id', 'vendor_id', 'date', 'granularity', 'on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate', 'response_time_p50', 'response_time_p90']
+
+    class RangeSerializer(serializers.Serializer):
+        granularity = serializers.ChoiceField(choices=HistoricalPerformance.GRANULARITY_CHOICES)
+        to = serializers.DateTimeField(required=False)
+
+        def get_fields(self):
+            # `from` is a keyword, so it can't be declared as a class attribute.
+            fields = super().get_fields()
+            fields['from'] = serializers.DateTimeField(required=False)
+            return fields
+
+        def validate(self, data):
+            data.setdefault('to', timezone.now())
+            data.setdefault('from', data['to'] - timedelta(days=30))
+            if data['from'] >= data['to']:
+                raise serializers.ValidationError("'from' must be before 'to'.")
+            return data
+
+    @staticmethod
+    def series_data(vendor_id, series_range, series):
+        return {
+            'vendor_id': vendor_id,
+            'granularity': series_range['granularity'],
+            'from': format_datetime(series_range['from']),
+            'to': format_datetime(series_range['to']),
+            'results': [{**row, 'bucket': format_datetime(row['bucket'])} for row in series],
+        }
 
     def get(self, request, *args, **kwargs):
         vendor_id = self.kwargs.get('vendor_id')
 
-        if vendor_id:
-            vendor = get_object_or_404(Vendor, id=vendor_id)
-            historical_performances = get_historical_performances(vendor)
-
-            if historical_performances.exists():
-                serializer = self.OutputSerializer(historical_performances, many=True, context={'request': request})
-                return Response(serializer.data, status=status.HTTP_200_OK)
-            else:
+        if vendor_id and 'granularity' in request.query_params:
+            serializer = self.RangeSerializer(data=request.query_params)
+            serializer.is_valid(raise_exception=True)
+            series_range = serializer.validated_data
+
+            def load():
+                if not Vendor.objects.filter(id=vendor_id).exists():
+                    return None
+                series = get_performance_series(vendor_id, series_range['granularity'], series_range['from'], series_range['to'])
+                return self.series_data(vendor_id, series_range, series)
+
+            entry = get_or_set_vendor_entry(vendor_id, request_entry_name('performance', request), load)
+            if entry is None:
+                raise Http404
+            return conditional_response(request, *entry)
+        elif vendor_id:
+            expand = parse_expand(request.query_params)
+            rows = historical_performance_vendor_rows if 'vendor' in expand else historical_performance_rows
+
+            def load():
+                historical_performances = get_historical_performances(vendor_id, expand)
+                if not historical_performances.exists():
+                    return None
+                paginator = self.pagination_class(ordering=self.ordering)
+                result_page = paginator.paginate_queryset(rows.values_list(historical_performances), request)
+                return paginator.get_paginated_response(rows.to_dicts(result_page)).data
+
+            entry = get_or_set_vendor_entry(vendor_id, request_entry_name('performance', request), load)
+            if entry is None:
+                get_object_or_404(Vendor, id=vendor_id)
                 return Response({"error": f"No historical performances found for vendor with ID {vendor_id}."}, status=status.HTTP_404_NOT_FOUND)
+            return conditional_response(request, *entry)
         else:
             return Response({"error": "vendor_id not provided in URL."}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -197,7 +498,7 @@ class HistoricalPerformanceApi(APIView):
     def put(self, request, historical_performance_id, *args, **kwargs):
         historical_performance = get_object_or_404(HistoricalPerformance, id=historical_performance_id)
 
-        serializer = self.InputSerializer(data=request.data)
+        serializer = self.InputSerializer(historical_performance, data=request.data)
         serializer.is_valid(raise_exception=True)
         historical_performance = update_historical_performance(historical_performance=historical_performance,
                                                                 **serializer.validated_data)